@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, send_from_directory, current_app
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, send_from_directory, current_app, Response, stream_with_context, make_response, send_file
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_mail import Mail, Message
 from flask_wtf import FlaskForm
@@ -15,6 +15,7 @@ import re
 from pathlib import Path
 import hashlib
 import uuid
+from functools import wraps
 
 # Import local modules with fallbacks
 try:
@@ -83,7 +84,7 @@ except ImportError as e:
     print(f"Failed to import NoteboardManager: {e}")
     # Fallback if shared_noteboard module doesn't exist
     class NoteboardManager:
-        def __init__(self, dm):
+        def __init__(self, dm, email_service=None, notify_window=0, events=None):
             self.dm = dm
         
         def get_user_boards(self, email):
@@ -113,10 +114,22 @@ try:
 except ImportError:
     # Fallback if email_service module doesn't exist
     class EmailService:
-        def __init__(self, mail, dm):
+        def __init__(self, mail, dm, app=None):
             self.mail = mail
             self.dm = dm
         
+        def send_message(self, msg):
+            self.mail.send(msg)
+        
+        digest = None
+        
+        def dispatch(self, msg, template=None):
+            self.mail.send(msg)
+            return True
+        
+        def render(self, template, cache_key=None, **kwargs):
+            return render_template(template, **kwargs)
+        
         def send_reminder_notification(self, reminder, email):
             subject = f"Påminnelse: {reminder['title']}"
             return send_email(email, subject, 'emails/reminder_notification.html', reminder=reminder)
@@ -143,10 +156,29 @@ except ImportError:
                 'recent_emails': email_log[-10:] if email_log else []
             }
 
+from data_versions import UserDataVersions
+from calendar_feed import CalendarFeed
+from reminder_manager import ReminderManager
+from calendar_index import CalendarIndex, parse_window_bound
+from event_stream import EventBus
+from reminder_counters import ReminderCounters
+from compression import Compression
+from asset_manifest import AssetManifest
+from sound_library import SoundLibrary
+from fragment_cache import FragmentCache
+from reminder_dates import normalize_reminder, due_iso, is_canonical, migrate_reminder_datetimes
+
+try:
+    from email_digest import DIGEST_MODES
+except ImportError:
+    DIGEST_MODES = {'immediate': 'Med en gang'}
+
 # Mock APScheduler for testing
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
     if not os.environ.get('TESTING'):
+        # Starts in the process that imports the app. Deploy without --preload so
+        # that is the worker: jobs publish live events to the worker's event_bus.
         scheduler = BackgroundScheduler()
         scheduler.start()
     else:
@@ -177,6 +209,15 @@ app = Flask(__name__)
 config_name = os.environ.get('FLASK_ENV', 'development')
 app.config.from_object(config[config_name])
 
+# Cache compiled templates on disk so cold workers don't recompile them
+if app.config.get('JINJA_BYTECODE_CACHE_DIR'):
+    try:
+        from jinja2 import FileSystemBytecodeCache
+        os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+    except Exception as e:
+        logger.warning(f"Jinja bytecode cache disabled: {e}")
+
 # Custom Jinja2 filters
 def nl2br_filter(text):
     """Convert newlines to HTML break tags"""
@@ -200,6 +241,8 @@ def as_datetime_filter(date_string):
     try:
         if isinstance(date_string, datetime):
             return date_string
+        if is_canonical(date_string):
+            return datetime.fromisoformat(date_string)
         if isinstance(date_string, str):
             # Handle different date formats
             for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S.%f']:
@@ -218,6 +261,9 @@ def format_datetime_filter(date_input, format_string='%d.%m.%Y %H:%M'):
         return 'Ikke satt'
     
     try:
+        # Canonical reminder times (datetime_iso) need no format guessing
+        if is_canonical(date_input):
+            return datetime.fromisoformat(date_input).strftime(format_string)
         # First convert to datetime if needed
         if isinstance(date_input, str):
             # Try to parse string to datetime
@@ -283,6 +329,10 @@ print(f"🔧 format_datetime filter registered: {'format_datetime' in app.jinja_
 # Extensions
 csrf = CSRFProtect(app)
 mail = Mail(app)
+compression = Compression(app)
+assets = AssetManifest(app)
+sound_library = SoundLibrary(os.path.join(app.static_folder, 'sounds'))
+fragments = FragmentCache(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Vennligst logg inn for å få tilgang til denne siden.'
@@ -304,12 +354,12 @@ class DataManager:
     
     def _ensure_data_files(self):
         """Sørg for at alle data-filer eksisterer"""
-        files = ['users', 'reminders', 'shared_reminders', 'notifications', 'email_log', 'shared_noteboards', 'password_reset_requests', 'push_subscriptions']
+        files = ['users', 'reminders', 'shared_reminders', 'notifications', 'email_log', 'shared_noteboards', 'password_reset_requests', 'push_subscriptions', 'email_outbox', 'email_digests', 'email_stats', 'data_versions']
         for filename in files:
             filepath = self.data_dir / f"{filename}.json"
             if not filepath.exists():
                 # users og push_subscriptions skal være dict, resten liste eller dict
-                initial_data = {} if filename in ['users', 'password_reset_requests', 'push_subscriptions'] else ([] if filename in ['reminders', 'shared_reminders', 'notifications', 'email_log'] else {})
+                initial_data = {} if filename in ['users', 'password_reset_requests', 'push_subscriptions'] else ([] if filename in ['reminders', 'shared_reminders', 'notifications', 'email_log', 'email_outbox'] else {})
                 self.save_data(filename, initial_data)
             else:
                 # MIGRERING: Konverter users fra liste til dict hvis nødvendig
@@ -373,8 +423,31 @@ class DataManager:
 dm = DataManager()
 
 # Initialize services after dm is created
-email_service = EmailService(mail, dm)
-noteboard_manager = NoteboardManager(dm)
+email_service = EmailService(mail, dm, app=app)
+event_bus = EventBus(
+    heartbeat=app.config.get('SSE_HEARTBEAT', 15),
+    max_stream_seconds=app.config.get('SSE_MAX_STREAM_SECONDS', 300)
+)
+data_versions = UserDataVersions(dm, on_change=lambda emails: event_bus.publish_many(emails, 'counts'))
+reminder_counters = ReminderCounters(dm)
+reminder_manager = ReminderManager(dm, versions=data_versions, counters=reminder_counters)
+calendar_index = CalendarIndex(dm, reminder_manager, versions=data_versions)
+calendar_feed_service = CalendarFeed(
+    dm, data_versions, app.config.get('CALENDAR_TIMEZONE', 'Europe/Oslo'), shares=reminder_manager
+)
+noteboard_manager = NoteboardManager(
+    dm,
+    email_service=email_service,
+    notify_window=app.config.get('BOARD_NOTIFY_WINDOW', 60),
+    events=event_bus
+)
+
+@app.before_request
+def start_email_outbox():
+    """Start e-post utboksen i prosessen som betjener forespørsler"""
+    outbox = getattr(email_service, 'outbox', None)
+    if outbox is not None:
+        outbox.ensure_started()
 
 # 📧 E-post funksjoner
 def send_email(to, subject, template, **kwargs):
@@ -386,7 +459,7 @@ def send_email(to, subject, template, **kwargs):
             html=render_template(template, **kwargs),
             sender=app.config['MAIL_DEFAULT_SENDER']
         )
-        mail.send(msg)
+        email_service.send_message(msg)
         
         # Logg e-post
         email_log = dm.load_data('email_log')
@@ -432,17 +505,17 @@ def check_reminders_for_notifications():
         with app.app_context():
             now = datetime.now()
             notification_time = now + timedelta(minutes=app.config['NOTIFICATION_ADVANCE_MINUTES'])
+            # Canonical due times compare as strings, so the loop below parses nothing
+            window_start = now.replace(microsecond=0).isoformat()
+            window_end = notification_time.replace(microsecond=0).isoformat()
             
             # Sjekk alle påminnelser
             reminders = dm.load_data('reminders', [])
-            shared_reminders = dm.load_data('shared_reminders', [])
             notifications = dm.load_data('notifications', [])
             
             # Ensure reminders are lists and contain dictionaries
             if not isinstance(reminders, list):
                 reminders = []
-            if not isinstance(shared_reminders, list):
-                shared_reminders = []
             if not isinstance(notifications, list):
                 notifications = []
             
@@ -461,35 +534,27 @@ def check_reminders_for_notifications():
                 if (reminder.get('completed', False) == False and 
                     reminder.get('id') not in sent_notifications):
                     
-                    try:
-                        reminder_dt = datetime.fromisoformat(reminder['datetime'].replace(' ', 'T'))
-                        if now <= reminder_dt <= notification_time:
-                            # Notify the reminder owner
-                            user_id = reminder.get('user_id', '')
-                            if user_id:
-                                all_reminders.append((reminder, user_id))
-                    except (ValueError, KeyError, TypeError) as e:
-                        logger.error(f"Error processing reminder {reminder}: {e}")
+                    due = due_iso(reminder)
+                    if due is None:
+                        logger.error(f"Error processing reminder {reminder.get('id')}: invalid datetime {reminder.get('datetime')!r}")
                         continue
+                    if window_start <= due <= window_end:
+                        # Notify the reminder owner
+                        user_id = reminder.get('user_id', '')
+                        if user_id:
+                            all_reminders.append((reminder, user_id))
             
             # Forbered delte påminnelser
-            for reminder in shared_reminders:
-                if not isinstance(reminder, dict):
-                    continue
-                    
+            for reminder, recipient_email in reminder_manager.all_shared():
                 if (reminder.get('completed', False) == False and 
                     reminder.get('id') not in sent_notifications):
                     
-                    try:
-                        reminder_dt = datetime.fromisoformat(reminder['datetime'].replace(' ', 'T'))
-                        if now <= reminder_dt <= notification_time:
-                            # For shared reminders, shared_with is a single email string
-                            recipient_email = reminder.get('shared_with', '')
-                            if recipient_email:
-                                all_reminders.append((reminder, recipient_email))
-                    except (ValueError, KeyError, TypeError) as e:
-                        logger.error(f"Error processing shared reminder {reminder}: {e}")
+                    due = due_iso(reminder)
+                    if due is None:
+                        logger.error(f"Error processing shared reminder {reminder.get('id')}: invalid datetime {reminder.get('datetime')!r}")
                         continue
+                    if window_start <= due <= window_end and recipient_email:
+                        all_reminders.append((reminder, recipient_email))
             
             # Send notifikasjoner (within app context)
             for reminder, recipient_email in all_reminders:
@@ -513,7 +578,9 @@ def check_reminders_for_notifications():
                         reminder['title'], 
                         reminder['datetime'], 
                         sound=sound,
-                        dm=dm
+                        dm=dm,
+                        priority=reminder.get('priority'),
+                        reminder_id=reminder['id']
                     )
                     logger.info(f"Push notification {'sent' if push_sent else 'failed'} for {reminder['id']}")
                 except Exception as push_err:
@@ -542,6 +609,12 @@ def check_reminders_for_notifications():
                         'push_sent': push_sent,
                         'email_sent': email_sent
                     })
+                    event_bus.publish(recipient_email, 'notification', {
+                        'reminder_id': reminder['id'],
+                        'title': reminder['title'],
+                        'datetime': reminder['datetime'],
+                        'sound': sound
+                    })
             
             # Lagre oppdaterte notifikasjoner
             if all_reminders:
@@ -551,6 +624,27 @@ def check_reminders_for_notifications():
     except Exception as e:
         logger.error(f"Feil ved sjekking av påminnelser: {e}")
 
+def send_email_digests():
+    """Send hourly/daily email digests that are due"""
+    try:
+        if email_service.digest is not None:
+            email_service.digest.flush_due()
+    except Exception as e:
+        logger.error(f"Feil ved sending av e-post sammendrag: {e}")
+
+def sweep_push_subscriptions():
+    """Age out stale push subscriptions in a bounded batch"""
+    try:
+        from push_service import sweep_stale_subscriptions
+        sweep_stale_subscriptions(
+            dm,
+            max_age_days=app.config.get('PUSH_SUBSCRIPTION_MAX_AGE_DAYS', 180),
+            batch_size=app.config.get('PUSH_SWEEP_BATCH_SIZE', 200),
+            probe=app.config.get('PUSH_SWEEP_PROBE', False)
+        )
+    except Exception as e:
+        logger.error(f"Feil ved opprydding av push-abonnementer: {e}")
+
 # 📝 WTForms
 class LoginForm(FlaskForm):
     username = StringField('Brukernavn/E-post', validators=[DataRequired(), Email()])
@@ -636,6 +730,70 @@ if not os.environ.get('TESTING'):
         seconds=app.config['REMINDER_CHECK_INTERVAL'],
         id='reminder_check'
     )
+    scheduler.add_job(
+        func=sweep_push_subscriptions,
+        trigger="interval",
+        seconds=app.config.get('PUSH_SWEEP_INTERVAL', 6 * 3600),
+        id='push_subscription_sweep'
+    )
+    scheduler.add_job(
+        func=send_email_digests,
+        trigger="interval",
+        seconds=app.config.get('EMAIL_DIGEST_CHECK_INTERVAL', 300),
+        id='email_digest'
+    )
+    scheduler.add_job(
+        func=reminder_counters.verify,
+        trigger="interval",
+        seconds=app.config.get('REMINDER_COUNTER_VERIFY_INTERVAL', 3600),
+        id='reminder_counter_verify'
+    )
+    # Gamle kopierte delinger blir til delingslenker (idempotent)
+    try:
+        reminder_manager.migrate_to_links()
+    except Exception as e:
+        logger.error(f"Feil ved migrering av delte påminnelser: {e}")
+    # Kanonisk tidspunkt på påminnelser lagret før datetime_iso fantes (idempotent)
+    try:
+        migrate_reminder_datetimes(dm)
+    except Exception as e:
+        logger.error(f"Feil ved migrering av påminnelsestidspunkt: {e}")
+    try:
+        reminder_counters.rebuild()
+    except Exception as e:
+        logger.error(f"Feil ved oppbygging av påminnelsestellere: {e}")
+
+def user_focus_mode(email):
+    user = User.get_by_email(email)
+    return user.focus_mode if user else 'normal'
+
+def conditional_user_data(view=None, extra=None):
+    """Weak ETag from the user's data version; 304 before the view loads any data
+
+    For JSON endpoints that only read the current user's reminders and
+    shared reminders. Every write path bumps data_versions, so an unchanged
+    version means an unchanged body. When the body also depends on
+    something else, extra(email) returns it and it becomes part of the
+    ETag: @conditional_user_data(extra=user_focus_mode).
+    """
+    if view is None:
+        return lambda view: conditional_user_data(view, extra)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag, _ = data_versions.validators(current_user.email)
+        if extra is not None:
+            etag = f"{etag}-{extra(current_user.email)}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
 
 # 🌐 Routes
 @app.route('/')
@@ -810,40 +968,34 @@ def reset_password(token):
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # Hent data
-    reminders = dm.load_data('reminders')
-    shared_reminders = dm.load_data('shared_reminders')
-    users = dm.load_data('users')
-    
     # Opprett form for å legge til påminnelser
     form = ReminderForm()
     
-    # Filtrer påminnelser (safely handle missing completed field)
-    my_reminders = [r for r in reminders if r.get('user_id') == current_user.email and not r.get('completed', False)]
-    shared_with_me = [r for r in shared_reminders if r.get('shared_with') == current_user.email and not r.get('completed', False)]
-    
-    # Sorter etter dato
-    my_reminders.sort(key=lambda x: x['datetime'])
-    shared_with_me.sort(key=lambda x: x['datetime'])
+    # Første side av hver liste (sortert etter dato); resten hentes ved rulling
+    page_size = app.config.get('DASHBOARD_PAGE_SIZE', 20)
+    my_reminders, my_next_cursor = calendar_index.page(current_user.email, 'my', limit=page_size)
+    shared_with_me, shared_next_cursor = calendar_index.page(current_user.email, 'shared', limit=page_size)
     
     # Hent brukerens fokus-modus
     user = User.get_by_email(current_user.email)
     current_focus_mode = user.focus_mode if user else 'normal'
     
     # Beregn statistikk
-    completed_reminders = [r for r in reminders if r.get('user_id') == current_user.email and r.get('completed', False)]
-    total_reminders = len(my_reminders) + len(completed_reminders)
+    counts = reminder_counters.get(current_user.email)
+    total_reminders = counts['open'] + counts['completed']
     
     stats = {
-        'total': len(my_reminders),
-        'completed': len(completed_reminders),
-        'shared_count': len(shared_with_me),
-        'completion_rate': (len(completed_reminders) / total_reminders * 100) if total_reminders > 0 else 0
+        'total': counts['open'],
+        'completed': counts['completed'],
+        'shared_count': counts['shared_open'],
+        'completion_rate': (counts['completed'] / total_reminders * 100) if total_reminders > 0 else 0
     }
     
     return render_template('dashboard.html', 
                          my_reminders=my_reminders, 
+                         my_next_cursor=my_next_cursor,
                          shared_with_me=shared_with_me,
+                         shared_next_cursor=shared_next_cursor,
                          current_focus_mode=current_focus_mode,
                          stats=stats,
                          form=form)
@@ -855,21 +1007,20 @@ def complete_reminder(reminder_id):
     reminders = dm.load_data('reminders')
     for reminder in reminders:
         if reminder['id'] == reminder_id and reminder['user_id'] == current_user.email:
-            reminder['completed'] = True
-            reminder['completed_at'] = datetime.now().isoformat()
-            dm.save_data('reminders', reminders)
+            if not reminder.get('completed', False):
+                reminder['completed'] = True
+                reminder['completed_at'] = datetime.now().isoformat()
+                with reminder_counters.writing():
+                    dm.save_data('reminders', reminders)
+                    reminder_counters.adjust(current_user.email, open=-1, completed=1)
+                data_versions.bump(current_user.email)
             flash('Påminnelse fullført!', 'success')
             return redirect(url_for('dashboard'))
     
     # Sjekk delte påminnelser
-    shared_reminders = dm.load_data('shared_reminders')
-    for reminder in shared_reminders:
-        if reminder['id'] == reminder_id and reminder['shared_with'] == current_user.email:
-            reminder['completed'] = True
-            reminder['completed_at'] = datetime.now().isoformat()
-            dm.save_data('shared_reminders', shared_reminders)
-            flash('Delt påminnelse fullført!', 'success')
-            return redirect(url_for('dashboard'))
+    if reminder_manager.complete(reminder_id, current_user.email):
+        flash('Delt påminnelse fullført!', 'success')
+        return redirect(url_for('dashboard'))
     
     flash('Påminnelse ikke funnet!', 'error')
     return redirect(url_for('dashboard'))
@@ -878,40 +1029,82 @@ def complete_reminder(reminder_id):
 @login_required
 def delete_reminder(reminder_id):
     reminders = dm.load_data('reminders')
-    original_count = len(reminders)
+    deleted = [r for r in reminders if r['id'] == reminder_id and r['user_id'] == current_user.email]
     
     reminders = [r for r in reminders if not (r['id'] == reminder_id and r['user_id'] == current_user.email)]
     
-    if len(reminders) < original_count:
-        dm.save_data('reminders', reminders)
+    if deleted:
+        with reminder_counters.writing():
+            dm.save_data('reminders', reminders)
+            for reminder in deleted:
+                if reminder.get('completed', False):
+                    reminder_counters.adjust(current_user.email, completed=-1)
+                else:
+                    reminder_counters.adjust(current_user.email, open=-1)
+        data_versions.bump(current_user.email)
+        reminder_manager.unshare_all(reminder_id)
         flash('Påminnelse slettet!', 'success')
     else:
         flash('Påminnelse ikke funnet eller tilhører ikke deg!', 'error')
     
     return redirect(url_for('dashboard'))
 
+@app.route('/api/reminders')
+@login_required
+@conditional_user_data(extra=user_focus_mode)
+def api_reminders():
+    """Side med påminnelser sortert etter dato, med markør (cursor) for neste side
+    
+    Query: list=my|shared, cursor, limit, category, priority,
+    completed=false|true|all (default false).
+    """
+    try:
+        kind = request.args.get('list', 'my')
+        if kind not in ('my', 'shared'):
+            return jsonify({'success': False, 'error': 'Invalid list'}), 400
+        
+        try:
+            limit = min(max(int(request.args.get('limit', app.config.get('DASHBOARD_PAGE_SIZE', 20))), 1), 100)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid limit'}), 400
+        completed = {'false': False, 'true': True, 'all': None}.get(request.args.get('completed', 'false').lower(), False)
+        
+        reminders, next_cursor = calendar_index.page(
+            current_user.email,
+            kind,
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            completed=completed,
+            category=request.args.get('category'),
+            priority=request.args.get('priority')
+        )
+        
+        card_template = 'partials/reminder_card.html' if kind == 'my' else 'partials/shared_reminder_card.html'
+        focus_mode = user_focus_mode(current_user.email)
+        return jsonify({
+            'success': True,
+            'reminders': reminders,
+            'next_cursor': next_cursor,
+            'html': ''.join(fragments.render_card(card_template, reminder, focus_mode=focus_mode) for reminder in reminders)
+        })
+    except Exception as e:
+        logger.error(f"API error listing reminders for {current_user.email}: {e}")
+        return jsonify({'success': False, 'error': 'Failed to list reminders'}), 500
+
 # Add missing API endpoint
 @app.route('/api/reminder-count')
 @login_required
+@conditional_user_data
 def api_reminder_count():
     """API endpoint for reminder counts"""
     try:
-        # Add some basic caching to reduce load
-        cache_key = f"reminder_count_{current_user.email}"
-        
-        reminders = dm.load_data('reminders')
-        shared_reminders = dm.load_data('shared_reminders')
-        
-        # Safely handle the case where completed field might not exist
-        my_count = len([r for r in reminders if r.get('user_id') == current_user.email and not r.get('completed', False)])
-        shared_count = len([r for r in shared_reminders if r.get('shared_with') == current_user.email and not r.get('completed', False)])
-        completed_count = len([r for r in reminders if r.get('user_id') == current_user.email and r.get('completed', False)])
+        counts = reminder_counters.get(current_user.email)
         
         result = {
-            'my_count': my_count,
-            'shared_count': shared_count,
-            'completed_count': completed_count,
-            'total_count': my_count + shared_count,
+            'my_count': counts['open'],
+            'shared_count': counts['shared_open'],
+            'completed_count': counts['completed'],
+            'total_count': counts['open'] + counts['shared_open'],
             'status': 'success',
             'timestamp': datetime.now().isoformat()
         }
@@ -925,6 +1118,20 @@ def api_reminder_count():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/events')
+@login_required
+def api_events():
+    """Server-Sent Events: endrede tellere, nye varsler og tavleoppdateringer"""
+    email = current_user.email
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    response = Response(
+        stream_with_context(event_bus.stream(email, last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let proxies buffer the stream
+    return response
+
 @app.route('/api/update-reminder-datetime', methods=['POST'])
 @login_required
 def api_update_reminder_datetime():
@@ -945,11 +1152,14 @@ def api_update_reminder_datetime():
         for reminder in reminders:
             if reminder['id'] == reminder_id and reminder['user_id'] == current_user.email:
                 reminder['datetime'] = f"{new_date} {new_time}"
+                normalize_reminder(reminder)
                 updated = True
                 break
         
         if updated:
+            # Shares link to the reminder, so recipients see the new time too
             dm.save_data('reminders', reminders)
+            data_versions.bump(current_user.email, *reminder_manager.recipients(reminder_id))
             return jsonify({'success': True})
         else:
             return jsonify({'success': False, 'error': 'Reminder not found or access denied'}), 404
@@ -991,10 +1201,15 @@ def add_reminder():
                 'shared_with': []
             }
             
+            normalize_reminder(new_reminder)
+            
             # Save reminder
             reminders = dm.load_data('reminders')
             reminders.append(new_reminder)
-            dm.save_data('reminders', reminders)
+            with reminder_counters.writing():
+                dm.save_data('reminders', reminders)
+                reminder_counters.adjust(current_user.email, open=1)
+            data_versions.bump(current_user.email)
             
             return jsonify({'success': True, 'reminder_id': reminder_id})
             
@@ -1022,37 +1237,26 @@ def add_reminder():
                     'shared_with': share_with
                 }
                 
+                normalize_reminder(new_reminder)
+                
                 # Lagre påminnelse
                 reminders = dm.load_data('reminders')
                 reminders.append(new_reminder)
-                dm.save_data('reminders', reminders)
+                with reminder_counters.writing():
+                    dm.save_data('reminders', reminders)
+                    reminder_counters.adjust(current_user.email, open=1)
+                data_versions.bump(current_user.email)
                 
-                # Opprett delte påminnelser og send notifikasjoner
+                # Opprett delte påminnelser (én skriving) og send notifikasjoner
                 if share_with:
-                    shared_reminders = dm.load_data('shared_reminders')
-                    
-                    for recipient in share_with:
-                        shared_reminder = {
-                            'id': str(uuid.uuid4()),
-                            'original_id': reminder_id,
-                            'shared_by': current_user.email,
-                            'shared_with': recipient,
-                            'title': form.title.data,
-                            'description': form.description.data,
-                            'datetime': f"{form.date.data} {form.time.data}",
-                            'priority': form.priority.data,
-                            'category': form.category.data,
-                            'sound': request.form.get('sound', 'pristine.mp3'),
-                            'completed': False,
-                            'created': datetime.now().isoformat(),
-                            'is_shared': True
-                        }
-                        shared_reminders.append(shared_reminder)
-                        
-                        # Send e-post notifikasjon om delt påminnelse
-                        send_shared_reminder_notification(shared_reminder, current_user.email, recipient)
-                    
-                    dm.save_data('shared_reminders', shared_reminders)
+                    reminder_manager.share(
+                        new_reminder,
+                        share_with,
+                        current_user.email,
+                        notify=lambda shared, recipient: send_shared_reminder_notification(
+                            shared, current_user.email, recipient
+                        )
+                    )
                     flash(f'Påminnelse "{form.title.data}" opprettet og delt med {len(share_with)} personer!', 'success')
                 else:
                     flash(f'Påminnelse "{form.title.data}" opprettet!', 'success')
@@ -1116,61 +1320,24 @@ def share_reminder():
             flash('Ingen gyldige e-post adresser å sende til', 'error')
             return redirect(url_for('dashboard'))
         
-        # Load shared reminders
-        shared_reminders = dm.load_data('shared_reminders')
-        shared_count = 0
-        
-        # Create shared reminder entries and send notifications
-        for email in valid_emails:
-            # Check if already shared with this email
-            already_shared = False
-            for shared in shared_reminders:
-                if (shared['original_id'] == reminder_id and 
-                    shared['shared_with'] == email):
-                    already_shared = True
-                    break
-            
-            if not already_shared:
-                # Create shared reminder entry
-                shared_reminder = {
-                    'id': str(uuid.uuid4()),
-                    'original_id': reminder_id,
-                    'user_id': reminder_to_share['user_id'],
-                    'shared_by': current_user.email,
-                    'shared_with': email,
-                    'title': reminder_to_share['title'],
-                    'description': reminder_to_share['description'],
-                    'datetime': reminder_to_share['datetime'],
-                    'priority': reminder_to_share['priority'],
-                    'category': reminder_to_share['category'],
-                    'completed': False,
-                    'shared_date': datetime.now().isoformat(),
-                    'personal_message': personal_message
-                }
-                
-                shared_reminders.append(shared_reminder)
-                
-                # Send notification email
-                try:
-                    email_sent = send_shared_reminder_notification(
-                        reminder_to_share, 
-                        current_user.email, 
-                        email
-                    )
-                    if email_sent:
-                        shared_count += 1
-                    else:
-                        flash(f'Kunne ikke sende e-post til {email}', 'warning')
-                except Exception as e:
-                    logger.error(f"Error sending email to {email}: {e}")
-                    flash(f'Feil ved sending av e-post til {email}', 'warning')
-            else:
-                flash(f'Påminnelse allerede delt med {email}', 'info')
+        # Create all shared reminder entries in one write, then queue notifications
+        def notify(shared_view, email):
+            try:
+                if not send_shared_reminder_notification(shared_view, current_user.email, email):
+                    flash(f'Kunne ikke sende e-post til {email}', 'warning')
+            except Exception as e:
+                logger.error(f"Error sending email to {email}: {e}")
+                flash(f'Feil ved sending av e-post til {email}', 'warning')
+        
+        created, already_shared = reminder_manager.share(
+            reminder_to_share, valid_emails, current_user.email,
+            personal_message=personal_message, notify=notify
+        )
+        for email in already_shared:
+            flash(f'Påminnelse allerede delt med {email}', 'info')
         
-        # Save shared reminders
-        if shared_count > 0:
-            dm.save_data('shared_reminders', shared_reminders)
-            flash(f'Påminnelse delt med {shared_count} person(er)', 'success')
+        if created:
+            flash(f'Påminnelse delt med {len(created)} person(er)', 'success')
         else:
             flash('Ingen nye delinger ble opprettet', 'info')
         
@@ -1221,8 +1388,8 @@ def api_share_calendar_event():
         success_count = 0
         for email in emails:
             try:
-                send_calendar_invitation_email(reminder, current_user.email, email, personal_message)
-                success_count += 1
+                if send_calendar_invitation_email(reminder, current_user.email, email, personal_message):
+                    success_count += 1
             except Exception as e:
                 logger.error(f"Failed to send calendar invitation to {email}: {e}")
         
@@ -1241,42 +1408,26 @@ def api_share_calendar_event():
 def send_calendar_invitation_email(reminder, shared_by, recipient_email, personal_message=None):
     """
     Send a calendar invitation (ICS) for a reminder via email.
+    The ICS bytes and HTML body are built once and reused for every recipient.
     """
     from flask_mail import Message
-    import pytz
     from email.utils import formataddr
-    import base64
+    from ical import build_invitation, reminder_version
     
-    # Prepare event details
     event_title = reminder.get('title', 'Påminnelse')
     event_description = reminder.get('description', '')
     event_start = reminder.get('datetime')
-    event_end = reminder.get('datetime')
-    event_category = reminder.get('category', '')
-    event_priority = reminder.get('priority', 'Medium')
     
-    # Parse start/end time
-    try:
-        start_dt = datetime.strptime(event_start, '%Y-%m-%d %H:%M')
-        end_dt = start_dt + timedelta(minutes=30)
-    except Exception:
-        start_dt = datetime.now()
-        end_dt = start_dt + timedelta(minutes=30)
-    
-    # ICS content
-    dtstamp = start_dt.strftime('%Y%m%dT%H%M%SZ')
-    dtstart = start_dt.strftime('%Y%m%dT%H%M%SZ')
-    dtend = end_dt.strftime('%Y%m%dT%H%M%SZ')
-    uid = f"{reminder.get('id')}@smartreminder"
+    ics = build_invitation(reminder, app.config.get('CALENDAR_TIMEZONE', 'Europe/Oslo'))
     
-    ics = f"""BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//SmartReminder//EN\nCALSCALE:GREGORIAN\nBEGIN:VEVENT\nUID:{uid}\nDTSTAMP:{dtstamp}\nDTSTART:{dtstart}\nDTEND:{dtend}\nSUMMARY:{event_title}\nDESCRIPTION:{event_description}\nCATEGORIES:{event_category}\nPRIORITY:{'1' if event_priority=='Høy' else '5' if event_priority=='Medium' else '9'}\nEND:VEVENT\nEND:VCALENDAR"""
-    
-    # Email body
-    html_body = render_template(
+    # Email body (same for all recipients of this share)
+    html_body = email_service.render(
         'emails/calendar_invitation.html',
+        (reminder.get('id'), reminder_version(reminder), shared_by, personal_message or ''),
         reminder=reminder,
         shared_by=shared_by,
-        personal_message=personal_message or ''
+        personal_message=personal_message or '',
+        app_url=app.config.get('APP_URL', '').rstrip('/')
     )
     
     msg = Message(
@@ -1285,16 +1436,16 @@ def send_calendar_invitation_email(reminder, shared_by, recipient_email, persona
         html=html_body
     )
     msg.body = f"{event_title}\n\n{event_description}\n\nTid: {event_start}"
-    msg.sender = formataddr(("SmartReminder", current_app.config.get('MAIL_DEFAULT_SENDER', shared_by)))
+    msg.sender = formataddr(("SmartReminder", current_app.config.get('MAIL_DEFAULT_SENDER') or shared_by))
     
     # Attach ICS
     msg.attach(
         filename="invitasjon.ics",
-        content_type="text/calendar; charset=utf-8; method=REQUEST",
+        content_type="text/calendar; charset=utf-8; method=PUBLISH",
         data=ics
     )
     
-    mail.send(msg)
+    return email_service.dispatch(msg, 'emails/calendar_invitation.html')
 
 # 📝 Noteboard Routes
 @app.route('/noteboards')
@@ -1581,23 +1732,28 @@ def email_settings():
         flash('E-postinnstillinger oppdatert!', 'success')
         return redirect(url_for('email_settings'))
     
-    # Get email statistics
-    email_log = dm.load_data('email_log')
-    total_sent = len([e for e in email_log if e.get('status') == 'sent'])
-    total_failed = len([e for e in email_log if e.get('status') == 'failed'])
-    total_emails = len(email_log)
-    success_rate = round((total_sent / total_emails * 100) if total_emails > 0 else 0)
-    recent_emails = sorted(email_log, key=lambda x: x.get('timestamp', ''), reverse=True)[:10]
-    
-    email_stats = {
-        'total_sent': total_sent,
-        'total_failed': total_failed,
-        'success_rate': success_rate,
-        'recent_emails': recent_emails
-    }
+    # Get email statistics (running counters, independent of log size)
+    email_stats = email_service.get_email_statistics()
     
     return render_template('email_settings.html', email_stats=email_stats, config=app.config)
 
+@app.route('/api/metrics')
+@login_required
+def api_metrics():
+    """Render times per template and cache statistics - restricted to admin only"""
+    if current_user.email != 'helene721@gmail.com':
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    
+    return jsonify({
+        'success': True,
+        'fragment_cache': fragments.get_statistics(),
+        'compression': compression.get_statistics(),
+        'events': event_bus.get_statistics(),
+        'sounds': sound_library.get_statistics(),
+        'email_render': email_service.get_render_statistics(),
+        'email_rate_limit': email_service.get_rate_limit_statistics()
+    })
+
 @app.route('/test-email', methods=['POST'])
 @login_required
 def test_email():
@@ -1629,8 +1785,12 @@ def test_email():
 # Service Worker route
 @app.route('/sw.js')
 def service_worker():
-    """Serve service worker from root path"""
-    return send_from_directory('.', 'sw.js', mimetype='application/javascript')
+    """Serve service worker from root path, with the precache list from the asset manifest"""
+    with open(os.path.join(app.root_path, 'sw.js'), encoding='utf-8') as f:
+        source = f.read()
+    response = Response(assets.render_service_worker(source), mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 # Offline page route
 @app.route('/offline')
@@ -1719,10 +1879,12 @@ def focus_modes():
             users = {}
         
         current_focus_mode = 'normal'
+        current_email_digest = 'immediate'
         
         for user_id, user_data in users.items():
             if user_data.get('email') == current_user.email:
                 current_focus_mode = user_data.get('focus_mode', 'normal')
+                current_email_digest = user_data.get('email_digest', 'immediate')
                 break
         
         logger.info(f"Current focus mode for user {current_user.email}: {current_focus_mode}")
@@ -1768,62 +1930,76 @@ def focus_modes():
         
         return render_template('focus_modes.html', 
                              current_focus_mode=current_focus_mode,
-                             focus_modes=focus_modes_dict)
+                             focus_modes=focus_modes_dict,
+                             current_email_digest=current_email_digest,
+                             email_digest_modes=DIGEST_MODES)
                              
     except Exception as e:
         logger.error(f"Critical error in focus_modes route: {e}", exc_info=True)
         flash('En intern feil oppstod ved lasting av fokusmoduser. Prøv igjen senere.', 'error')
         return redirect(url_for('dashboard'))
 
+@app.route('/email-digest', methods=['POST'])
+@login_required
+def email_digest_settings():
+    """Velg om e-post sendes med en gang, hver time eller daglig"""
+    mode = request.form.get('email_digest', 'immediate')
+    if mode not in DIGEST_MODES or email_service.digest is None:
+        flash('Ugyldig e-postvalg', 'error')
+        return redirect(url_for('focus_modes'))
+    
+    try:
+        if email_service.digest.set_mode(current_user.email, mode):
+            flash(f'E-postvarsler: {DIGEST_MODES[mode]}', 'success')
+        else:
+            flash('Kunne ikke finne brukeren', 'error')
+    except Exception as e:
+        logger.error(f"Feil ved lagring av e-postvalg: {e}")
+        flash('Feil ved lagring av e-postvalg', 'error')
+    return redirect(url_for('focus_modes'))
+
 @app.route('/api/calendar-events')
 @login_required
+@conditional_user_data
 def api_calendar_events():
-    """API endpoint to get all calendar events for the current user (my + shared)"""
+    """API endpoint for calendar events (my + shared) in the start/end window FullCalendar requests"""
     try:
-        # Get all reminders
-        all_reminders = dm.load_data('reminders')
-        shared_reminders = dm.load_data('shared_reminders')
-        
-        # Filter for current user's reminders
-        my_reminders = [r for r in all_reminders if r.get('user_id') == current_user.email]
-        
-        # Filter shared reminders that are shared with current user
-        shared_with_me = [r for r in shared_reminders if r.get('shared_with') == current_user.email]
+        # Only the range FullCalendar is showing (both bounds optional)
+        window_start = parse_window_bound(request.args.get('start'))
+        window_end = parse_window_bound(request.args.get('end'))
         
         events_json = []
-        
-        # Add my reminders
-        for reminder in my_reminders:
-            color = '#dc3545' if reminder['priority'] == 'Høy' else '#fd7e14' if reminder['priority'] == 'Medium' else '#198754'
-            events_json.append({
-                'id': reminder['id'],
-                'title': reminder['title'],
-                'start': reminder['datetime'],
-                'color': color,
-                'extendedProps': {
-                    'type': 'my',
-                    'description': reminder.get('description', ''),
-                    'priority': reminder.get('priority', 'Medium'),
-                    'category': reminder.get('category', 'Annet')
-                }
-            })
-
-        # Add shared reminders
-        for reminder in shared_with_me:
-            color = '#17a2b8'  # Blue color for shared reminders
-            events_json.append({
-                'id': f"shared_{reminder['id']}",
-                'title': f"[Delt] {reminder['title']}",
-                'start': reminder['datetime'],
-                'color': color,
-                'extendedProps': {
-                    'type': 'shared',
-                    'description': reminder.get('description', ''),
-                    'priority': reminder.get('priority', 'Medium'),
-                    'category': reminder.get('category', 'Delt'),
-                    'shared_by': reminder.get('shared_by', 'Ukjent')
-                }
-            })
+        for kind, reminder in calendar_index.between(current_user.email, window_start, window_end):
+            if kind == 'my':
+                priority = reminder.get('priority', 'Medium')
+                color = '#dc3545' if priority == 'Høy' else '#fd7e14' if priority == 'Medium' else '#198754'
+                events_json.append({
+                    'id': reminder['id'],
+                    'title': reminder['title'],
+                    'start': reminder['datetime'],
+                    'color': color,
+                    'extendedProps': {
+                        'type': 'my',
+                        'description': reminder.get('description', ''),
+                        'priority': priority,
+                        'category': reminder.get('category', 'Annet')
+                    }
+                })
+            else:
+                color = '#17a2b8'  # Blue color for shared reminders
+                events_json.append({
+                    'id': f"shared_{reminder['id']}",
+                    'title': f"[Delt] {reminder['title']}",
+                    'start': reminder['datetime'],
+                    'color': color,
+                    'extendedProps': {
+                        'type': 'shared',
+                        'description': reminder.get('description', ''),
+                        'priority': reminder.get('priority', 'Medium'),
+                        'category': reminder.get('category', 'Delt'),
+                        'shared_by': reminder.get('shared_by', 'Ukjent')
+                    }
+                })
         
         return jsonify(events_json)
         
@@ -1831,6 +2007,46 @@ def api_calendar_events():
         logger.error(f"Error loading calendar events: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/calendar/<token>.ics')
+def calendar_feed(token):
+    """Abonnerbar ICS-feed med brukerens påminnelser (for kalenderapper)"""
+    email = calendar_feed_service.email_for_token(token)
+    if not email:
+        abort(404)
+    
+    # Answer unchanged feeds from the version counter alone
+    etag, last_modified = calendar_feed_service.validators(email)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif (not request.if_none_match and last_modified and request.if_modified_since
+          and last_modified <= request.if_modified_since):
+        response = Response(status=304)
+    else:
+        response = Response(
+            stream_with_context(calendar_feed_service.stream(email)),
+            mimetype='text/calendar'
+        )
+        response.headers['Content-Disposition'] = 'inline; filename="smartreminder.ics"'
+    
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/calendar-feed', methods=['GET', 'POST'])
+@login_required
+def api_calendar_feed():
+    """Adressen til brukerens kalenderabonnement (POST lager en ny og stenger den gamle)"""
+    try:
+        token = calendar_feed_service.token_for(current_user.email, reset=request.method == 'POST')
+        if not token:
+            return jsonify({'success': False, 'error': 'Bruker ikke funnet'}), 404
+        return jsonify({'success': True, 'url': url_for('calendar_feed', token=token, _external=True)})
+    except Exception as e:
+        logger.error(f"Error creating calendar feed for {current_user.email}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/send-test-notification', methods=['POST'])
 @csrf.exempt
 @login_required
@@ -1898,27 +2114,36 @@ def subscribe_push_notifications():
         
         subscription = subscription_data['subscription']
         
-        # Store subscription in user data
-        subscriptions = dm.load_data('push_subscriptions', {})
-        user_email = current_user.email
-        
-        if user_email not in subscriptions:
-            subscriptions[user_email] = []
-        
-        # Check if subscription already exists
-        existing = False
-        for sub in subscriptions[user_email]:
-            if sub.get('endpoint') == subscription.get('endpoint'):
-                existing = True
-                break
+        from push_service import subscription_registry, refresh_last_seen
         
-        if not existing:
-            subscription['created_at'] = datetime.now().isoformat()
-            subscriptions[user_email].append(subscription)
-            dm.save_data('push_subscriptions', subscriptions)
-            logger.info(f"New push subscription added for {user_email}")
-        else:
-            logger.info(f"Push subscription already exists for {user_email}")
+        with subscription_registry.lock:
+            # Store subscription in user data
+            subscriptions = dm.load_data('push_subscriptions', {})
+            user_email = current_user.email
+            
+            if user_email not in subscriptions:
+                subscriptions[user_email] = []
+            
+            # Check if subscription already exists
+            existing = False
+            for sub in subscriptions[user_email]:
+                if sub.get('endpoint') == subscription.get('endpoint'):
+                    existing = True
+                    break
+            
+            if not existing:
+                subscription['created_at'] = datetime.now().isoformat()
+                subscription['last_seen'] = subscription['created_at']
+                subscriptions[user_email].append(subscription)
+                dm.save_data('push_subscriptions', subscriptions)
+                subscription_registry.invalidate()
+                logger.info(f"New push subscription added for {user_email}")
+            else:
+                # Re-posted by a browser that still holds it, so it is not stale
+                if refresh_last_seen(sub):
+                    dm.save_data('push_subscriptions', subscriptions)
+                    subscription_registry.invalidate()
+                logger.info(f"Push subscription already exists for {user_email}")
         
         return jsonify({'success': True, 'message': 'Push notifications enabled'})
         
@@ -2014,38 +2239,27 @@ def favicon():
 @app.route('/static/sounds/<filename>')
 def serve_sounds(filename):
     """Serve sound files with proper headers for audio playback"""
+    # Only files in the sound table (mp3/wav in static/sounds) are served
+    sound = sound_library.get(filename)
+    if sound is None:
+        logger.warning(f"Sound file {filename} not found")
+        abort(404)
+
     try:
-        # Security check - only allow audio files
-        if not (filename.endswith('.mp3') or filename.endswith('.wav')):
-            abort(404)
-        
-        # Check if file exists
-        sound_path = Path('static/sounds') / filename
-        if not sound_path.exists():
-            logger.warning(f"Sound file {filename} not found")
-            abort(404)
-        
-        # Determine MIME type based on actual file content
-        if filename.endswith('.mp3'):
-            # Check if it's actually a WAV file with .mp3 extension
-            with open(sound_path, 'rb') as f:
-                header = f.read(4)
-                if header == b'RIFF':
-                    mimetype = 'audio/wav'
-                else:
-                    mimetype = 'audio/mpeg'
-        else:
-            mimetype = 'audio/wav'
-            
-        response = send_from_directory('static/sounds', filename, mimetype=mimetype)
-        # Add headers for better browser compatibility
-        response.headers['Accept-Ranges'] = 'bytes'
-        response.headers['Cache-Control'] = 'public, max-age=3600'
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        return response
-    except Exception as e:
+        # Strong ETag from the content hash; conditional=True answers If-None-Match and Range (206)
+        response = send_file(
+            sound.path,
+            mimetype=sound.mimetype,
+            conditional=True,
+            etag=sound.etag,
+            max_age=app.config.get('SOUND_CACHE_MAX_AGE', 604800)
+        )
+    except OSError as e:
         logger.error(f"Error serving sound file {filename}: {e}")
         abort(404)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
 
 # Flask app startup
 if __name__ == '__main__':
@@ -0,0 +1,161 @@
+"""
+Fingeravtrykk for statiske filer i Smart Påminner Pro
+Innholds-hash i filnavn, static_url() for maler og precache-listen til service workeren
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import fnmatch
+import threading
+import logging
+
+from flask import url_for, request
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.js', '.css')
+EXCLUDE_PATTERNS = ('*_backup.*', DIST_DIR + '/*')
+IMMUTABLE_MAX_AGE = 31536000
+
+# Non-fingerprinted URLs the service worker also precaches
+PRECACHE_PAGES = (
+    '/',
+    '/dashboard',
+    '/offline',
+    '/static/sounds/alert.mp3',
+    '/static/sounds/pristine.mp3',
+    '/static/sounds/ding.mp3',
+    '/static/sounds/chime.mp3',
+    '/static/images/icon-192x192.png',
+    '/static/images/icon-512x512.png',
+    '/static/manifest.json'
+)
+
+# Assets precached before a manifest has been built (development)
+DEV_ASSETS = ('css/style.css', 'js/app.js', 'js/pwa.js', 'js/notification_client.js')
+
+# The single line in sw.js replaced with the generated precache list
+PRECACHE_LINE = re.compile(r'^const PRECACHE = .*;$', re.MULTILINE)
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{10}\.[a-z]+$')
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:10]
+
+
+def build_manifest(static_dir):
+    """Copy JS/CSS to dist/ under content-hashed names and write the manifest
+
+    Returns the manifest: {'version': ..., 'assets': {'js/app.js': 'dist/js/app.<hash>.js'}}.
+    Old hashed copies are removed.
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    assets = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist_dir and d != '__pycache__')
+        for name in sorted(files):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            logical = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            if any(fnmatch.fnmatch(logical, pattern) for pattern in EXCLUDE_PATTERNS):
+                continue
+            stem, ext = os.path.splitext(logical)
+            assets[logical] = f"{DIST_DIR}/{stem}.{content_hash(path)}{ext}"
+
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    for logical, hashed in assets.items():
+        target = os.path.join(static_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(os.path.join(static_dir, logical), target)
+
+    version = hashlib.sha256(json.dumps(assets, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+    manifest = {'version': version, 'assets': assets}
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """Resolves static filenames to their fingerprinted copies
+
+    Reads static/dist/manifest.json written by build_manifest() (reloaded
+    when it changes). Without a build, static_url() falls back to the plain
+    file so development and tests work unchanged.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._manifest = {'version': 'dev', 'assets': {}}
+        self._mtime = None
+        self.path = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.path = os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME)
+        app.jinja_env.globals['static_url'] = self.static_url
+        app.after_request(self.cache_headers)
+        app.extensions['asset_manifest'] = self
+
+    def manifest(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns if self.path else None
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._manifest = {'version': 'dev', 'assets': {}}
+                if mtime is not None:
+                    try:
+                        with open(self.path, encoding='utf-8') as f:
+                            self._manifest = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Feil ved lesing av asset-manifest: {e}")
+            return self._manifest
+
+    def resolve(self, filename):
+        return self.manifest().get('assets', {}).get(filename, filename)
+
+    def static_url(self, filename):
+        """URL for a static file, fingerprinted when the manifest has it"""
+        return url_for('static', filename=self.resolve(filename))
+
+    def cache_headers(self, response):
+        """Hashed files never change, so browsers may keep them for a year"""
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            filename = (request.view_args or {}).get('filename', '')
+            if filename.startswith(DIST_DIR + '/') and HASHED_NAME.search(filename):
+                response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        return response
+
+    def precache(self):
+        """{'version', 'files'} for the service worker"""
+        manifest = self.manifest()
+        assets = manifest.get('assets') or {name: name for name in DEV_ASSETS}
+        files = list(PRECACHE_PAGES)
+        files.extend(url_for('static', filename=hashed) for _, hashed in sorted(assets.items()))
+        return {'version': manifest.get('version', 'dev'), 'files': files}
+
+    def render_service_worker(self, source):
+        """sw.js with its PRECACHE line replaced by the current list"""
+        line = f"const PRECACHE = {json.dumps(self.precache())};"
+        return PRECACHE_LINE.sub(lambda _: line, source, count=1)
+
+
+if __name__ == '__main__':
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    manifest = build_manifest(static_dir)
+    print(f"Bygget {len(manifest['assets'])} fingeravtrykk-filer (versjon {manifest['version']})")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark response compression for typical dashboard and calendar payloads
+
+Renders /dashboard and /api/calendar-events through the Flask test client
+for a synthetic user (temporary data directory, no network), then
+compresses each body with gzip at several levels and brotli (if the
+package is installed). Reports bytes on the wire, compression ratio and
+CPU milliseconds per response, plus what the app's own Compression
+middleware produced for a request with Accept-Encoding: gzip, br.
+
+    python benchmarks/compression.py --reminders 300 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('FLASK_ENV', 'testing')
+os.environ.setdefault('TESTING', 'true')
+
+from compression import brotli, compress
+
+VARIANTS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 4), ('br', 11)]
+
+
+def seed(dm, email, count):
+    dm.save_data('users', {'u1': {'email': email, 'username': 'bench'}})
+    categories = ['Jobb', 'Helse', 'Familie', 'Annet']
+    priorities = ['Høy', 'Medium', 'Lav']
+    dm.save_data('reminders', [
+        {
+            'id': f"bench-{i:05d}",
+            'user_id': email,
+            'title': f"Påminnelse nummer {i}",
+            'description': f"Husk å følge opp sak {i} før møtet" if i % 3 else '',
+            'datetime': f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d} {8 + i % 10:02d}:00",
+            'priority': priorities[i % 3],
+            'category': categories[i % 4],
+            'completed': False,
+            'created': '2026-01-01T08:00:00'
+        }
+        for i in range(count)
+    ])
+
+
+def fetch_payloads(email, count):
+    from app import app, dm
+
+    test_dir = tempfile.mkdtemp()
+    dm.data_dir = Path(test_dir)
+    try:
+        dm._ensure_data_files()
+        seed(dm, email, count)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'u1'
+        urls = {
+            'dashboard': '/dashboard',
+            'calendar_month': '/api/calendar-events?start=2026-03-01&end=2026-04-12',
+            'calendar_all': '/api/calendar-events'
+        }
+        payloads, served = {}, {}
+        for name, url in urls.items():
+            payloads[name] = client.get(url).get_data()
+            response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+            served[name] = {
+                'content_encoding': response.headers.get('Content-Encoding'),
+                'bytes': len(response.get_data())
+            }
+        return payloads, served
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+
+def measure(data, encoding, level, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        compressed = compress(data, encoding, gzip_level=level, brotli_quality=level)
+    cpu_ms = (time.process_time() - started) * 1000 / repeat
+    return {
+        'bytes': len(compressed),
+        'ratio': round(len(compressed) / len(data), 3),
+        'cpu_ms': round(cpu_ms, 3)
+    }
+
+
+def run(args):
+    payloads, served = fetch_payloads('bench@example.com', args.reminders)
+    results = {'reminders': args.reminders, 'brotli_available': brotli is not None, 'payloads': {}}
+    for name, data in payloads.items():
+        entry = {'raw_bytes': len(data), 'served': served[name], 'variants': {}}
+        for encoding, level in VARIANTS:
+            if encoding == 'br' and brotli is None:
+                continue
+            entry['variants'][f"{encoding}-{level}"] = measure(data, encoding, level, args.repeat)
+        results['payloads'][name] = entry
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reminders', type=int, default=300, help='reminders for the synthetic user')
+    parser.add_argument('--repeat', type=int, default=20, help='compressions per variant for CPU timing')
+    run(parser.parse_args(argv))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
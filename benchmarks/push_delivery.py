@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Load test for push delivery against a local mock push service
+
+Starts a local HTTP stand-in for a web push service (configurable latency,
+error rate, 410 Gone and 429 throttling), generates synthetic subscriptions
+with real encryption keys and drives push_service.send_push_notification and
+board-sized send_push_batch fan-out through it.
+
+Reports p50/p95/p99 latency per push, throughput and how errors were handled.
+Use --max-p95-ms / --min-throughput as a regression gate (exit code 1).
+
+    python benchmarks/push_delivery.py --subscriptions 500 --board-size 50
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+# Add the project directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import push_service
+from tests.helpers import JsonDataManager
+
+
+class MockPushService:
+    """Local HTTP push service with configurable latency and failures"""
+
+    def __init__(self, latency_ms=20, jitter_ms=5, error_rate=0.0, gone_rate=0.0, throttle_rate=0.0, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.gone_rate = gone_rate
+        self.gone = set()
+        self.received = 0
+        self.headers_seen = {'TTL': 0, 'Urgency': 0, 'Topic': 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def endpoint(self, index):
+        """Create an endpoint; a gone_rate share of them answer 410"""
+        endpoint = f"{self.url}/push/{index}"
+        if self.random.random() < self.gone_rate:
+            self.gone.add(f"/push/{index}")
+        return endpoint
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                with service._lock:
+                    service.received += 1
+                    for header in service.headers_seen:
+                        if self.headers.get(header) is not None:
+                            service.headers_seen[header] += 1
+                    roll = service.random.random()
+                delay = max(0.0, service.latency_ms + service.random.uniform(-service.jitter_ms, service.jitter_ms))
+                time.sleep(delay / 1000.0)
+
+                if self.path in service.gone:
+                    status = 410
+                elif roll < service.throttle_rate:
+                    status = 429
+                elif roll < service.throttle_rate + service.error_rate:
+                    status = 500
+                else:
+                    status = 201
+                self.send_response(status)
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_keys():
+    """Generate a browser-like p256dh/auth key pair for a subscription"""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_bytes = private_key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {
+        'p256dh': base64.urlsafe_b64encode(public_bytes).decode().rstrip('='),
+        'auth': base64.urlsafe_b64encode(os.urandom(16)).decode().rstrip('=')
+    }
+
+
+def generate_subscriptions(dm, service, count):
+    """Write count synthetic users with one subscription each"""
+    subscriptions = {}
+    for i in range(count):
+        subscriptions[f"bench{i}@example.com"] = [{
+            'endpoint': service.endpoint(i),
+            'keys': make_keys(),
+            'created_at': '2025-01-01T00:00:00'
+        }]
+    dm.save_data('push_subscriptions', subscriptions)
+    dm.save_data('users', {})
+    push_service.subscription_registry.invalidate()
+    return list(subscriptions)
+
+
+class TimedWebpush:
+    """Wrap push_service.webpush to record latency and outcome per push"""
+
+    def __init__(self, real_webpush):
+        self.real_webpush = real_webpush
+        self.latencies = []
+        self.outcomes = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = '2xx'
+        try:
+            return self.real_webpush(*args, **kwargs)
+        except push_service.WebPushException as e:
+            outcome = str(e.response.status_code) if e.response is not None else 'error'
+            raise
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(args):
+    push_logger = logging.getLogger('push_service')
+    log_level = push_logger.level
+    if not args.verbose:
+        push_logger.setLevel(logging.CRITICAL)
+    data_dir = tempfile.mkdtemp(prefix='push_bench_')
+    service = MockPushService(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        gone_rate=args.gone_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed
+    )
+    service.start()
+    dm = JsonDataManager(data_dir)
+    timed = TimedWebpush(push_service.webpush)
+    push_service.webpush = timed
+
+    try:
+        emails = generate_subscriptions(dm, service, args.subscriptions)
+        print(f"Mock push service at {service.url}, {len(emails)} subscriptions")
+
+        if args.mode == 'board':
+            # Board-sized fan-outs through the batch API, as notify_board_update does
+            groups = [emails[i:i + args.board_size] for i in range(0, len(emails), args.board_size)]
+            work = [
+                lambda group=group: push_service.send_push_batch(
+                    group, '📋 Benchmark', '3 notater lagt til av bench', {'board_id': 'bench'}, dm,
+                    ttl=push_service.BOARD_UPDATE_TTL, urgency='low',
+                    topic=push_service.make_topic('board', 'bench')
+                )
+                for group in groups
+            ]
+        else:
+            work = [
+                lambda email=email: int(push_service.send_push_notification(
+                    email, '⏰ Påminnelse', 'Benchmark', {'type': 'reminder'}, dm
+                ))
+                for email in emails
+            ]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            delivered = sum(pool.map(lambda job: job(), work))
+        elapsed = time.perf_counter() - start
+    finally:
+        push_service.webpush = timed.real_webpush
+        push_service.subscription_registry.invalidate()
+        service.stop()
+        push_logger.setLevel(log_level)
+
+    remaining = sum(len(subs) for subs in dm.load_data('push_subscriptions', {}).values())
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    pushes = len(timed.latencies)
+    throughput = pushes / elapsed if elapsed else 0.0
+    report = {
+        'mode': args.mode,
+        'pushes': pushes,
+        'delivered_users': delivered,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(throughput, 1),
+        'p50_ms': round(percentile(timed.latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(timed.latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(timed.latencies, 99) * 1000, 2),
+        'outcomes': timed.outcomes,
+        'gone_endpoints': len(service.gone),
+        'subscriptions_remaining': remaining,
+        'headers_seen': service.headers_seen,
+    }
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    failures = []
+    if remaining != args.subscriptions - len(service.gone):
+        failures.append(f"expected {len(service.gone)} gone subscriptions pruned, {remaining} remain")
+    if args.max_p95_ms is not None and report['p95_ms'] > args.max_p95_ms:
+        failures.append(f"p95 {report['p95_ms']}ms > {args.max_p95_ms}ms")
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        failures.append(f"throughput {throughput:.1f}/s < {args.min_throughput}/s")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Push delivery benchmark passed")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscriptions', type=int, default=200, help='number of synthetic subscriptions')
+    parser.add_argument('--mode', choices=['board', 'single'], default='board',
+                        help='board fan-out via send_push_batch or one send_push_notification per user')
+    parser.add_argument('--board-size', type=int, default=50, help='members per board fan-out')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent senders')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='mock push service latency')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='latency jitter (+/-)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 500 responses')
+    parser.add_argument('--gone-rate', type=float, default=0.05, help='share of endpoints answering 410')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of 429 responses')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='show push_service log output')
+    parser.add_argument('--max-p95-ms', type=float, default=None, help='fail if p95 latency exceeds this')
+    parser.add_argument('--min-throughput', type=float, default=None, help='fail if pushes/s is below this')
+    return run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark reminder datetime handling before and after datetime_iso
+
+Builds a synthetic user with N reminders (default 1,000) and times, for
+reminders as stored before the migration (display string only) and after
+normalize_reminder() (display string plus canonical datetime_iso):
+
+- the format_datetime filter over every reminder, as the dashboard cards use it
+- rendering every reminder card partial (fragment cache bypassed)
+- the scheduler's due-window scan over all reminders
+
+    python benchmarks/reminder_datetimes.py --reminders 1000 --repeat 5
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('FLASK_ENV', 'testing')
+os.environ.setdefault('TESTING', 'true')
+
+from reminder_dates import normalize_reminder, due_iso
+
+
+def make_reminders(count):
+    priorities = ['Høy', 'Medium', 'Lav']
+    return [
+        {
+            'id': f"bench-{i:05d}",
+            'user_id': 'bench@example.com',
+            'title': f"Påminnelse nummer {i}",
+            'description': f"Husk å følge opp sak {i}" if i % 3 else '',
+            'datetime': f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d} {8 + i % 10:02d}:{i % 4 * 15:02d}",
+            'priority': priorities[i % 3],
+            'category': 'Annet',
+            'completed': False
+        }
+        for i in range(count)
+    ]
+
+
+def timed(func, repeat):
+    """Best wall-clock milliseconds of repeat runs"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3)
+
+
+def legacy_scan(reminders, now, end):
+    """The scheduler loop before datetime_iso: parse every display string"""
+    due = []
+    for reminder in reminders:
+        reminder_dt = datetime.fromisoformat(reminder['datetime'].replace(' ', 'T'))
+        if now <= reminder_dt <= end:
+            due.append(reminder)
+    return due
+
+
+def canonical_scan(reminders, now, end):
+    window_start, window_end = now.isoformat(), end.isoformat()
+    return [reminder for reminder in reminders if window_start <= due_iso(reminder) <= window_end]
+
+
+def run(args):
+    from flask import render_template
+    from app import app, format_datetime_filter
+
+    legacy = make_reminders(args.reminders)
+    normalized = [normalize_reminder(copy.deepcopy(reminder)) for reminder in legacy]
+    now = datetime(2026, 6, 1, 8, 0)
+    end = now + timedelta(days=30)
+
+    results = {'reminders': args.reminders, 'ms': {}}
+    with app.test_request_context():
+        cases = {
+            'format_datetime': (
+                lambda: [format_datetime_filter(r['datetime']) for r in legacy],
+                lambda: [format_datetime_filter(r['datetime_iso']) for r in normalized]
+            ),
+            'render_cards': (
+                lambda: [render_template('partials/reminder_card.html', reminder=r) for r in legacy],
+                lambda: [render_template('partials/reminder_card.html', reminder=r) for r in normalized]
+            ),
+            'due_window_scan': (
+                lambda: legacy_scan(legacy, now, end),
+                lambda: canonical_scan(normalized, now, end)
+            )
+        }
+        assert len(legacy_scan(legacy, now, end)) == len(canonical_scan(normalized, now, end))
+        for name, (before, after) in cases.items():
+            before_ms, after_ms = timed(before, args.repeat), timed(after, args.repeat)
+            results['ms'][name] = {
+                'before': before_ms,
+                'after': after_ms,
+                'speedup': round(before_ms / after_ms, 2) if after_ms else None
+            }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reminders', type=int, default=1000, help='reminders for the synthetic user')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case; the best is reported')
+    run(parser.parse_args(argv))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
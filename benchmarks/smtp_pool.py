@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark SMTP connection pooling in EmailService against a local SMTP sink
+
+Starts a minimal threaded SMTP server on localhost (no real delivery) with a
+configurable per-connection handshake cost standing in for TCP + STARTTLS +
+login, then sends the same messages two ways:
+
+- per-message: mail.send(msg), one SMTP session per email (old behaviour)
+- pooled: EmailService.send_message(msg) inside one smtp_session()
+
+and reports messages/s and SMTP sessions opened for each.
+
+    python benchmarks/smtp_pool.py --messages 200 --connect-latency-ms 80
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add the project directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask_mail import Message
+
+from email_service import EmailService
+from tests.helpers import SMTPSink, NullDataManager, make_app
+
+
+def build_messages(count):
+    return [
+        Message(
+            subject=f"Benchmark {i}",
+            recipients=[f"user{i}@example.com"],
+            html=f"<p>Melding {i}</p>",
+            sender='bench@example.com'
+        )
+        for i in range(count)
+    ]
+
+
+def run(args):
+    sink = SMTPSink(args.connect_latency_ms, args.message_latency_ms).start()
+    app, mail = make_app(sink.port)
+    service = EmailService(mail, NullDataManager(), app=app)
+    results = {}
+
+    try:
+        with app.app_context():
+            sessions_before = sink.sessions
+            start = time.perf_counter()
+            for msg in build_messages(args.messages):
+                mail.send(msg)
+            elapsed = time.perf_counter() - start
+            results['per_message'] = {
+                'messages': args.messages,
+                'elapsed_s': round(elapsed, 3),
+                'messages_per_s': round(args.messages / elapsed, 1),
+                'smtp_sessions': sink.sessions - sessions_before
+            }
+
+            sessions_before = sink.sessions
+            start = time.perf_counter()
+            with service.smtp_session():
+                for msg in build_messages(args.messages):
+                    service.send_message(msg)
+            elapsed = time.perf_counter() - start
+            results['pooled'] = {
+                'messages': args.messages,
+                'elapsed_s': round(elapsed, 3),
+                'messages_per_s': round(args.messages / elapsed, 1),
+                'smtp_sessions': sink.sessions - sessions_before
+            }
+        service.pool.close_all()
+    finally:
+        sink.stop()
+
+    results['speedup'] = round(results['pooled']['messages_per_s'] / results['per_message']['messages_per_s'], 2)
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100, help='messages to send per variant')
+    parser.add_argument('--connect-latency-ms', type=float, default=50.0,
+                        help='simulated handshake cost per SMTP session')
+    parser.add_argument('--message-latency-ms', type=float, default=1.0, help='simulated cost per message')
+    run(parser.parse_args(argv))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Kalenderabonnement (ICS-feed) per bruker for Smart Påminner Pro
+"""
+
+import os
+import secrets
+import threading
+import logging
+
+from ical import iter_calendar
+
+logger = logging.getLogger(__name__)
+
+# VEVENTs per chunk written to the client
+CHUNK_EVENTS = 100
+
+
+class CalendarFeed:
+    """Subscribable ICS feed of a user's reminders and reminders shared with them
+
+    Each user gets a secret token stored on the user record; the feed URL
+    /calendar/<token>.ics needs no login so calendar apps can poll it.
+    Validators come from UserDataVersions, so unchanged feeds are answered
+    without loading any reminders.
+    """
+
+    def __init__(self, data_manager, versions, tz_name='Europe/Oslo', shares=None):
+        self.dm = data_manager
+        self.versions = versions
+        self.shares = shares
+        self.tz_name = tz_name
+        self._tokens = {}
+        self._tokens_key = None
+        self._lock = threading.Lock()
+
+    def _source_key(self):
+        """Reload when any process rewrote users.json (a rotated token) or tests swapped data_dir"""
+        data_dir = getattr(self.dm, 'data_dir', None)
+        if data_dir is None:
+            return None
+        try:
+            mtime = os.stat(os.path.join(str(data_dir), 'users.json')).st_mtime_ns
+        except OSError:
+            mtime = None
+        return (id(self.dm), str(data_dir), mtime)
+
+    def _refresh_tokens(self):
+        key = self._source_key()
+        users = self.dm.load_data('users', {})
+        tokens = {}
+        if isinstance(users, dict):
+            for user_data in users.values():
+                if isinstance(user_data, dict) and user_data.get('calendar_token'):
+                    tokens[user_data['calendar_token']] = user_data.get('email')
+        self._tokens, self._tokens_key = tokens, key
+
+    def email_for_token(self, token):
+        with self._lock:
+            key = self._source_key()
+            if key is None or key != self._tokens_key:
+                self._refresh_tokens()
+            return self._tokens.get(token)
+
+    def token_for(self, email, reset=False):
+        """The user's feed token, created on first use (reset=True issues a new one)"""
+        with self._lock:
+            users = self.dm.load_data('users', {})
+            if not isinstance(users, dict):
+                return None
+            for user_data in users.values():
+                if isinstance(user_data, dict) and user_data.get('email') == email:
+                    if reset or not user_data.get('calendar_token'):
+                        user_data['calendar_token'] = secrets.token_urlsafe(24)
+                        self.dm.save_data('users', users)
+                    self._refresh_tokens()
+                    return user_data['calendar_token']
+            return None
+
+    def validators(self, email):
+        return self.versions.validators(email)
+
+    def events(self, email):
+        """Reminder dicts for the feed, in the same selection as /api/calendar-events"""
+        reminders = self.dm.load_data('reminders', [])
+        for reminder in reminders if isinstance(reminders, list) else []:
+            if isinstance(reminder, dict) and reminder.get('user_id') == email:
+                yield reminder
+        if self.shares is not None:
+            shared_reminders = self.shares.shared_with(email, include_completed=True)
+        else:
+            shared_reminders = self.dm.load_data('shared_reminders', [])
+        for reminder in shared_reminders if isinstance(shared_reminders, list) else []:
+            if isinstance(reminder, dict) and reminder.get('shared_with') == email:
+                yield dict(
+                    reminder,
+                    id=f"shared_{reminder.get('id')}",
+                    title=f"[Delt] {reminder.get('title', '')}"
+                )
+
+    def stream(self, email):
+        """Yield the feed as text chunks of CHUNK_EVENTS events"""
+        chunk = []
+        for part in iter_calendar(self.events(email), self.tz_name, name='SmartReminder'):
+            chunk.append(part)
+            if len(chunk) >= CHUNK_EVENTS:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
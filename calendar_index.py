@@ -0,0 +1,180 @@
+"""
+Datoindeks for kalendervisning i Smart Påminner Pro
+Per-bruker sortert liste over påminnelser for raske datovindu-oppslag og sidevisning
+"""
+
+import os
+import json
+import base64
+import binascii
+import threading
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date
+
+from reminder_dates import reminder_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def parse_window_bound(value):
+    """Parse a FullCalendar start/end parameter to a naive local datetime
+
+    FullCalendar sends ISO 8601 with the browser's offset
+    ('2026-10-26T00:00:00+01:00') or a plain date. Reminder times are
+    stored as local wall-clock time, so the offset is dropped.
+    Returns None for a missing or invalid value.
+    """
+    if not value:
+        return None
+    value = value.strip().replace(' ', '+')  # '+' in an unencoded query arrives as a space
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = datetime.combine(date.fromisoformat(value[:10]), datetime.min.time())
+        except ValueError:
+            return None
+    return parsed.replace(tzinfo=None)
+
+
+def encode_cursor(key):
+    """Opaque cursor for a (datetime, id) sort key"""
+    raw = json.dumps([key[0].isoformat(), key[1]], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(datetime, id) from encode_cursor(); None for a missing or invalid cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        when, reminder_id = json.loads(raw)
+        return datetime.fromisoformat(when), str(reminder_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+class CalendarIndex:
+    """Datetime-sorted index of each user's own and shared reminders
+
+    Entries are sorted by (datetime, id). between(email, start, end)
+    bisects into them so only reminders inside the visible calendar range
+    are returned; page() serves the dashboard lists with a stable
+    (datetime, id) cursor, from separate open and completed lists so
+    neither is scanned for the other. With versions (UserDataVersions) a
+    user's index is rebuilt only when that user's data version changed;
+    without it, when reminders.json or shared_reminders.json changed.
+    """
+
+    def __init__(self, data_manager, shares, versions=None, max_users=500):
+        self.dm = data_manager
+        self.shares = shares
+        self.versions = versions
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def _source_key(self, email):
+        data_dir = getattr(self.dm, 'data_dir', None)
+        if data_dir is None:
+            return None
+        key = [id(self.dm), str(data_dir)]
+        if self.versions is not None:
+            # Every write path bumps the version of each user whose reminders changed
+            key.append(self.versions.validators(email)[0])
+            return tuple(key)
+        for collection in ('reminders', 'shared_reminders'):
+            try:
+                key.append(os.stat(os.path.join(str(data_dir), f"{collection}.json")).st_mtime_ns)
+            except OSError:
+                key.append(None)
+        return tuple(key)
+
+    def _build(self, email):
+        entries = []
+        reminders = self.dm.load_data('reminders', [])
+        for reminder in reminders if isinstance(reminders, list) else []:
+            if isinstance(reminder, dict) and reminder.get('user_id') == email:
+                entries.append(('my', reminder))
+        for reminder in self.shares.shared_with(email, include_completed=True):
+            entries.append(('shared', reminder))
+
+        timed = []
+        for kind, reminder in entries:
+            when = reminder_datetime(reminder)
+            if when is None:
+                logger.warning(f"Ugyldig dato på påminnelse {reminder.get('id')}: {reminder.get('datetime')!r}")
+                continue
+            timed.append(((when, str(reminder.get('id'))), kind, reminder))
+        timed.sort(key=lambda entry: entry[0])
+
+        lists = {}
+        for name in ('all', 'my', 'shared'):
+            for completed in (None, False, True):
+                selected = [
+                    entry for entry in timed
+                    if (name == 'all' or entry[1] == name)
+                    and (completed is None or bool(entry[2].get('completed', False)) == completed)
+                ]
+                lists[name, completed] = (
+                    [entry[0] for entry in selected], [(kind, reminder) for _, kind, reminder in selected]
+                )
+        return lists
+
+    def _index_for(self, email, name='all', completed=None):
+        """(sort keys, (kind, reminder) items) for 'all', 'my' or 'shared'
+
+        completed is None (both), False (open only) or True (completed only).
+        """
+        key = self._source_key(email)
+        with self._lock:
+            cached = self._indexes.get(email)
+            if cached is not None and key is not None and cached[0] == key:
+                return cached[1][name, completed]
+        lists = self._build(email)
+        with self._lock:
+            if len(self._indexes) >= self.max_users and email not in self._indexes:
+                self._indexes.pop(next(iter(self._indexes)))
+            self._indexes[email] = (key, lists)
+        return lists[name, completed]
+
+    def between(self, email, start=None, end=None):
+        """(kind, reminder) pairs with start <= datetime < end, in time order
+
+        kind is 'my' or 'shared'. Either bound may be None for an open end.
+        """
+        keys, items = self._index_for(email)
+        lo = bisect_left(keys, (start,)) if start is not None else 0
+        hi = bisect_left(keys, (end,)) if end is not None else len(keys)
+        return items[lo:max(lo, hi)]
+
+    def page(self, email, kind='my', cursor=None, limit=20, completed=False, category=None, priority=None):
+        """One page of a dashboard list, in (datetime, id) order
+
+        kind is 'my' or 'shared'; completed is False (open only), True
+        (completed only) or None (both). Returns (reminders, next_cursor);
+        next_cursor is None on the last page.
+        """
+        keys, items = self._index_for(email, kind, completed)
+        after = decode_cursor(cursor)
+        position = bisect_right(keys, after) if after is not None else 0
+
+        result = []
+        last_key = None
+        while position < len(keys) and len(result) < limit:
+            reminder = items[position][1]
+            if ((not category or reminder.get('category') == category)
+                    and (not priority or reminder.get('priority') == priority)):
+                result.append(reminder)
+                last_key = keys[position]
+            position += 1
+
+        # Only hand out a cursor if something matching could follow
+        next_cursor = encode_cursor(last_key) if last_key is not None and position < len(keys) else None
+        return result, next_cursor
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
@@ -38,5 +38,16 @@ def clean_push_subscriptions():
     print("7. Wait 2 minutes for the test notification")
     print("\n💡 The notification should now include sound!")
 
+def sweep_stale_push_subscriptions(max_age_days=180):
+    """Remove only subscriptions not seen working for max_age_days (same as the scheduled sweeper)"""
+    from push_service import sweep_stale_subscriptions
+    
+    print(f"🧹 Removing push subscriptions not seen for {max_age_days} days...")
+    result = sweep_stale_subscriptions(dm, max_age_days=max_age_days, batch_size=float('inf'))
+    print(f"✅ Examined {result['examined']}, removed {result['removed']}, stamped {result['stamped']}")
+
 if __name__ == "__main__":
-    clean_push_subscriptions()
+    if '--stale' in sys.argv:
+        sweep_stale_push_subscriptions()
+    else:
+        clean_push_subscriptions()
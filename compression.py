@@ -0,0 +1,187 @@
+"""
+Komprimering av svar for Smart Påminner Pro
+gzip, og brotli når pakken er installert, valgt etter Accept-Encoding
+"""
+
+import os
+import gzip
+import time
+import threading
+import logging
+import mimetypes
+
+from flask import request, send_file, current_app
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/calendar', 'text/javascript',
+    'application/json', 'application/javascript', 'application/manifest+json',
+    'image/svg+xml'
+}
+
+# Pre-compressed siblings of static files, in order of preference
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.html', '.json', '.svg', '.txt')
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings, available):
+    """Best encoding the client accepts (highest q, then our preference order)"""
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+class Compression:
+    """Compress HTML/JSON responses and serve pre-compressed static files
+
+    Responses are compressed in after_request when the client accepts
+    gzip or br, the body is at least min_size bytes and the mimetype is
+    in COMPRESSIBLE_TYPES. Streamed and file responses (SSE, ICS feed,
+    send_file) are left alone. For the static endpoint, a .br/.gz sibling
+    written by precompress_static() is sent directly instead of
+    compressing on every request.
+    """
+
+    def __init__(self, app=None, min_size=500, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._lock = threading.Lock()
+        self.stats = {'compressed': 0, 'precompressed': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_ms': 0.0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        app.before_request(self.serve_precompressed)
+        app.after_request(self.compress_response)
+        app.extensions['compression'] = self
+
+    def serve_precompressed(self):
+        """Send static/<file>.br or .gz when it exists and is up to date"""
+        if request.endpoint != 'static' or request.method not in ('GET', 'HEAD'):
+            return None
+        filename = (request.view_args or {}).get('filename')
+        original = safe_join(current_app.static_folder, filename) if filename else None
+        if not original or not os.path.isfile(original):
+            return None
+
+        # Highest client quality first; sorted() keeps our preference on ties
+        for name, suffix in sorted(PRECOMPRESSED_SUFFIXES, key=lambda entry: -request.accept_encodings[entry[0]]):
+            if request.accept_encodings[name] <= 0:
+                continue
+            candidate = original + suffix
+            try:
+                if os.stat(candidate).st_mtime < os.stat(original).st_mtime:
+                    continue
+            except OSError:
+                continue
+            response = send_file(
+                candidate,
+                mimetype=mimetypes.guess_type(original)[0] or 'application/octet-stream',
+                conditional=True,
+                max_age=current_app.get_send_file_max_age(filename)
+            )
+            response.headers['Content-Encoding'] = name
+            response.vary.add('Accept-Encoding')
+            with self._lock:
+                self.stats['precompressed'] += 1
+            return response
+        return None
+
+    def compress_response(self, response):
+        if response.mimetype in COMPRESSIBLE_TYPES:
+            response.vary.add('Accept-Encoding')
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings, available_encodings())
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        started = time.perf_counter()
+        try:
+            compressed = compress(data, encoding, self.gzip_level, self.brotli_quality)
+        except Exception as e:
+            logger.error(f"Feil ved komprimering av svar ({encoding}): {e}")
+            return response
+        cpu_ms = (time.perf_counter() - started) * 1000
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ, so a strong ETag no longer applies
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        with self._lock:
+            self.stats['compressed'] += 1
+            self.stats['bytes_in'] += len(data)
+            self.stats['bytes_out'] += len(compressed)
+            self.stats['cpu_ms'] += cpu_ms
+        return response
+
+    def get_statistics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['cpu_ms'] = round(stats['cpu_ms'], 1)
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        stats['encodings'] = list(available_encodings())
+        return stats
+
+
+def precompress_static(folder, min_size=500, gzip_level=9, brotli_quality=11):
+    """Write .gz (and .br) next to static text files that changed; returns files written"""
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in available_encodings():
+                target = path + ('.br' if encoding == 'br' else '.gz')
+                if os.path.exists(target) and os.stat(target).st_mtime >= os.stat(path).st_mtime:
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compress(data, encoding, gzip_level, brotli_quality))
+                written += 1
+    return written
+
+
+if __name__ == '__main__':
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"Komprimerte {precompress_static(static_dir)} statiske filer i {static_dir}")
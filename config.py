@@ -3,6 +3,7 @@ Configuration for Smart Påminner Pro
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Try to load environment variables
@@ -24,10 +25,72 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or os.environ.get('MAIL_USERNAME')
+    MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE') or 2)
+    MAIL_POOL_IDLE_TIMEOUT = int(os.environ.get('MAIL_POOL_IDLE_TIMEOUT') or 60)  # seconds
+    
+    # Outgoing mail is queued in data/email_outbox.json and sent by worker threads (0 = send inline)
+    MAIL_OUTBOX_WORKERS = int(os.environ.get('MAIL_OUTBOX_WORKERS') or 2)
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('MAIL_OUTBOX_MAX_ATTEMPTS') or 3)
+    MAIL_OUTBOX_RETRY_DELAY = int(os.environ.get('MAIL_OUTBOX_RETRY_DELAY') or 30)  # seconds, grows per attempt
+    
+    # Outgoing mail rate limits, messages per minute (0 = off). Sends wait for a token instead of failing.
+    MAIL_RATE_PER_MINUTE = int(os.environ.get('MAIL_RATE_PER_MINUTE') or 30)
+    MAIL_RATE_BURST = int(os.environ.get('MAIL_RATE_BURST') or 10)
+    MAIL_DOMAIN_RATE_PER_MINUTE = int(os.environ.get('MAIL_DOMAIN_RATE_PER_MINUTE') or 20)
+    MAIL_DOMAIN_RATE_BURST = int(os.environ.get('MAIL_DOMAIN_RATE_BURST') or 5)
+    MAIL_DOMAIN_RATE_LIMITS = os.environ.get('MAIL_DOMAIN_RATE_LIMITS', '')  # e.g. "gmail.com:20,outlook.com:10"
+    
+    # Rendered email bodies shared between recipients of the same message
+    MAIL_RENDER_CACHE_SIZE = int(os.environ.get('MAIL_RENDER_CACHE_SIZE') or 128)
+    MAIL_RENDER_CACHE_TTL = int(os.environ.get('MAIL_RENDER_CACHE_TTL') or 300)  # seconds
+    
+    # Hourly/daily email digests (users choose under Fokusmoduser)
+    EMAIL_DIGEST_HOUR = int(os.environ.get('EMAIL_DIGEST_HOUR') or 7)  # daily digest hour, local time
+    EMAIL_DIGEST_MAX_EVENTS = int(os.environ.get('EMAIL_DIGEST_MAX_EVENTS') or 200)
+    EMAIL_DIGEST_CHECK_INTERVAL = int(os.environ.get('EMAIL_DIGEST_CHECK_INTERVAL') or 300)
+    
+    # Compiled Jinja templates are cached on disk so new workers skip compilation (empty = off)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get(
+        'JINJA_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'smartreminder_jinja_cache')
+    )
+    
+    # Public base URL used in links from emails sent outside a request
+    APP_URL = os.environ.get('APP_URL') or 'https://smartremind-production.up.railway.app'
+    
+    # Time zone reminder times are entered in (used for calendar invitations and feeds)
+    CALENDAR_TIMEZONE = os.environ.get('CALENDAR_TIMEZONE') or 'Europe/Oslo'
+    
+    # Response compression (gzip, plus brotli if the package is installed)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL') or 6)
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY') or 4)
+    
+    # Rendered reminder and note cards kept in memory (LRU, per worker)
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES') or 2000)
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES') or 4 * 1024 * 1024)
+    
+    # Sound files are revalidated by ETag after this many seconds
+    SOUND_CACHE_MAX_AGE = int(os.environ.get('SOUND_CACHE_MAX_AGE') or 604800)
     
     # App settings
     REMINDER_CHECK_INTERVAL = int(os.environ.get('REMINDER_CHECK_INTERVAL') or 300)
     NOTIFICATION_ADVANCE_MINUTES = int(os.environ.get('NOTIFICATION_ADVANCE_MINUTES') or 15)
+    DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE') or 20)
+    REMINDER_COUNTER_VERIFY_INTERVAL = int(os.environ.get('REMINDER_COUNTER_VERIFY_INTERVAL') or 3600)
+    
+    # Board update notifications are merged per board within this window (seconds)
+    BOARD_NOTIFY_WINDOW = int(os.environ.get('BOARD_NOTIFY_WINDOW') or 60)
+    
+    # Live updates (Server-Sent Events): heartbeat and how long one stream stays open (seconds).
+    # Served by the gevent worker, where an open stream is a greenlet, not a thread.
+    SSE_HEARTBEAT = int(os.environ.get('SSE_HEARTBEAT') or 15)
+    SSE_MAX_STREAM_SECONDS = int(os.environ.get('SSE_MAX_STREAM_SECONDS') or 300)
+    
+    # Push subscription sweeper
+    PUSH_SWEEP_INTERVAL = int(os.environ.get('PUSH_SWEEP_INTERVAL') or 6 * 3600)
+    PUSH_SUBSCRIPTION_MAX_AGE_DAYS = int(os.environ.get('PUSH_SUBSCRIPTION_MAX_AGE_DAYS') or 180)
+    PUSH_SWEEP_BATCH_SIZE = int(os.environ.get('PUSH_SWEEP_BATCH_SIZE') or 200)
+    PUSH_SWEEP_PROBE = os.environ.get('PUSH_SWEEP_PROBE', 'false').lower() in ['true', '1', 'yes']
     
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
@@ -49,6 +112,10 @@ class TestingConfig(Config):
     SECRET_KEY = 'test-secret-key'
     REMINDER_CHECK_INTERVAL = 30  # Shorter interval for testing
     NOTIFICATION_ADVANCE_MINUTES = 5
+    BOARD_NOTIFY_WINDOW = 0  # Deliver board updates immediately in tests
+    MAIL_OUTBOX_WORKERS = 0  # Send mail inline in tests
+    MAIL_RATE_PER_MINUTE = 0
+    MAIL_DOMAIN_RATE_PER_MINUTE = 0
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -0,0 +1,105 @@
+"""
+Dataversjoner per bruker for Smart Påminner Pro
+En teller som økes ved hver endring i en brukers påminnelser eller delte påminnelser
+"""
+
+import os
+import uuid
+import hashlib
+import threading
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataVersions:
+    """Per-user version counters, persisted in the data_versions collection
+
+    Write paths call bump(email, ...) for every user whose reminder data
+    changed; readers use get()/validators() to build ETags and
+    Last-Modified without loading reminders. on_change(emails) is called
+    after each bump, e.g. to push live updates. The random epoch changes if
+    the collection is ever reset, so old ETags can never match new data.
+    """
+
+    def __init__(self, data_manager, on_change=None):
+        self.dm = data_manager
+        self.on_change = on_change
+        self.collection = 'data_versions'
+        self._lock = threading.RLock()
+        self._cache = None
+        self._cache_key = None
+
+    def _source_key(self):
+        """Reload when another process wrote the file or tests swapped data_dir"""
+        data_dir = getattr(self.dm, 'data_dir', None)
+        if data_dir is None:
+            return (id(self.dm),)
+        try:
+            mtime = os.stat(os.path.join(str(data_dir), f"{self.collection}.json")).st_mtime_ns
+        except OSError:
+            mtime = None
+        return (id(self.dm), str(data_dir), mtime)
+
+    def _load(self):
+        key = self._source_key()
+        if self._cache is None or key != self._cache_key or len(key) == 1:
+            data = self.dm.load_data(self.collection, {})
+            if not isinstance(data, dict) or 'users' not in data:
+                data = {'epoch': uuid.uuid4().hex[:8], 'users': {}}
+                try:
+                    self.dm.save_data(self.collection, data)
+                    key = self._source_key()
+                except Exception as e:
+                    logger.error(f"Feil ved lagring av dataversjoner: {e}")
+            self._cache, self._cache_key = data, key
+        return self._cache
+
+    def get(self, email):
+        """(version, updated_at in UTC) for a user; (0, None) if never written"""
+        with self._lock:
+            entry = self._load()['users'].get(email)
+        if not entry:
+            return 0, None
+        try:
+            return entry['version'], datetime.fromisoformat(entry['updated_at'])
+        except (KeyError, TypeError, ValueError):
+            return entry.get('version', 0), None
+
+    def validators(self, email):
+        """(etag, last_modified) for a user's data; etag is unquoted
+
+        The etag includes a digest of the email: users at the same version
+        must not share one, or a browser used by two people would answer
+        one user's request with the other's cached response.
+        """
+        with self._lock:
+            epoch = self._load()['epoch']
+        version, updated_at = self.get(email)
+        user_tag = hashlib.sha1((email or '').encode('utf-8')).hexdigest()[:12]
+        return f"{epoch}-{user_tag}-{version}", updated_at
+
+    def bump(self, *emails):
+        """Mark the given users' reminder data as changed"""
+        emails = {email for email in emails if email}
+        if not emails:
+            return
+        try:
+            with self._lock:
+                data = self._load()
+                now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+                for email in emails:
+                    entry = data['users'].setdefault(email, {'version': 0})
+                    entry['version'] += 1
+                    entry['updated_at'] = now
+                self.dm.save_data(self.collection, data)
+                self._cache_key = self._source_key()
+        except Exception as e:
+            logger.error(f"Feil ved oppdatering av dataversjon: {e}")
+            return
+        if self.on_change:
+            try:
+                self.on_change(emails)
+            except Exception as e:
+                logger.error(f"Feil ved varsling om endrede data: {e}")
@@ -0,0 +1,161 @@
+"""
+E-post sammendrag for Smart Påminner Pro
+Samler hendelser per bruker og sender én e-post per time eller dag
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+DIGEST_MODES = {
+    'immediate': 'Med en gang',
+    'hourly': 'Sammendrag hver time',
+    'daily': 'Daglig sammendrag'
+}
+
+def next_digest_time(mode, since, daily_hour=7):
+    """When a digest holding an event from `since` is due"""
+    if mode == 'hourly':
+        return since.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    due = since.replace(hour=daily_hour, minute=0, second=0, microsecond=0)
+    if due <= since:
+        due += timedelta(days=1)
+    return due
+
+
+class EmailDigest:
+    """Per-user buffer of email events for users who chose hourly/daily digests
+
+    Events are persisted in the email_digests collection (email -> list of
+    events) so a restart does not lose them. flush_due() is called from the
+    scheduler and sends one digest per user whose cadence has come round.
+    """
+
+    def __init__(self, data_manager, send_digest, daily_hour=7, max_events=200, mode_ttl=30):
+        self.dm = data_manager
+        self.send_digest = send_digest
+        self.daily_hour = daily_hour
+        self.max_events = max_events
+        self.mode_ttl = mode_ttl
+        self.collection = 'email_digests'
+        self._lock = threading.RLock()
+        self._modes = None
+        self._modes_loaded = 0.0
+
+    def _load_modes(self):
+        """email -> digest mode from users.json, cached for mode_ttl seconds"""
+        with self._lock:
+            if self._modes is None or time.monotonic() - self._modes_loaded > self.mode_ttl:
+                users = self.dm.load_data('users', {})
+                modes = {}
+                if isinstance(users, dict):
+                    for user_data in users.values():
+                        if isinstance(user_data, dict) and user_data.get('email'):
+                            modes[user_data['email']] = user_data.get('email_digest', 'immediate')
+                self._modes = modes
+                self._modes_loaded = time.monotonic()
+            return self._modes
+
+    def get_mode(self, email):
+        mode = self._load_modes().get(email, 'immediate')
+        return mode if mode in DIGEST_MODES else 'immediate'
+
+    def set_mode(self, email, mode):
+        """Save a user's digest preference; pending events go out on the next flush"""
+        if mode not in DIGEST_MODES:
+            raise ValueError(f"Ugyldig e-postmodus: {mode}")
+        with self._lock:
+            users = self.dm.load_data('users', {})
+            if not isinstance(users, dict):
+                return False
+            for user_data in users.values():
+                if isinstance(user_data, dict) and user_data.get('email') == email:
+                    user_data['email_digest'] = mode
+                    self.dm.save_data('users', users)
+                    self._modes = None
+                    return True
+            return False
+
+    def add(self, email, event):
+        """Buffer an event for email; returns False if the user wants it immediately"""
+        mode = self.get_mode(email)
+        if mode == 'immediate':
+            return False
+        event = dict(event)
+        event.setdefault('time', datetime.now().isoformat())
+        try:
+            with self._lock:
+                buffers = self.dm.load_data(self.collection, {})
+                if not isinstance(buffers, dict):
+                    buffers = {}
+                events = buffers.setdefault(email, [])
+                events.append(event)
+                if len(events) > self.max_events:
+                    del events[:len(events) - self.max_events]
+                self.dm.save_data(self.collection, buffers)
+            return True
+        except Exception as e:
+            logger.error(f"Feil ved lagring av sammendrag for {email}: {e}")
+            return False
+
+    def pending(self, email=None):
+        buffers = self.dm.load_data(self.collection, {})
+        if not isinstance(buffers, dict):
+            return 0
+        if email is not None:
+            return len(buffers.get(email, []))
+        return sum(len(events) for events in buffers.values())
+
+    def flush_due(self, now=None, force=False):
+        """Send digests whose hour/day has come; returns the number sent"""
+        now = now or datetime.now()
+        with self._lock:
+            buffers = self.dm.load_data(self.collection, {})
+            if not isinstance(buffers, dict) or not buffers:
+                return 0
+            due = {}
+            for email, events in list(buffers.items()):
+                if not events:
+                    buffers.pop(email)
+                    continue
+                mode = self.get_mode(email)
+                try:
+                    oldest = datetime.fromisoformat(events[0]['time'])
+                except (KeyError, TypeError, ValueError):
+                    oldest = now
+                # A user who switched back to immediate gets what is left at once
+                if force or mode == 'immediate' or now >= next_digest_time(mode, oldest, self.daily_hour):
+                    due[email] = (mode, buffers.pop(email))
+            if not due:
+                return 0
+            self.dm.save_data(self.collection, buffers)
+
+        sent = 0
+        failed = {}
+        for email, (mode, events) in due.items():
+            try:
+                ok = self.send_digest(email, events, mode)
+            except Exception as e:
+                logger.error(f"Feil ved sending av sammendrag til {email}: {e}")
+                ok = False
+            if ok:
+                sent += 1
+            else:
+                failed[email] = events
+
+        if failed:
+            # Put events back in front of anything buffered meanwhile
+            with self._lock:
+                buffers = self.dm.load_data(self.collection, {})
+                if not isinstance(buffers, dict):
+                    buffers = {}
+                for email, events in failed.items():
+                    buffers[email] = (events + buffers.get(email, []))[-self.max_events:]
+                self.dm.save_data(self.collection, buffers)
+
+        if sent:
+            logger.info(f"Sendt {sent} e-post sammendrag")
+        return sent
@@ -0,0 +1,243 @@
+"""
+E-post utboks for Smart Påminner Pro
+Persistent kø for utgående e-post, sendt av bakgrunnsarbeidere
+"""
+
+import os
+import base64
+import queue
+import threading
+import time
+import uuid
+import logging
+from datetime import datetime
+
+from flask_mail import Message
+
+logger = logging.getLogger(__name__)
+
+def message_to_dict(msg):
+    """Serialize a rendered Flask-Mail Message so it can be persisted"""
+    attachments = []
+    for attachment in msg.attachments:
+        data = attachment.data
+        if isinstance(data, bytes):
+            data, encoding = base64.b64encode(data).decode('ascii'), 'base64'
+        else:
+            encoding = 'text'
+        attachments.append({
+            'filename': attachment.filename,
+            'content_type': attachment.content_type,
+            'data': data,
+            'encoding': encoding
+        })
+    return {
+        'subject': msg.subject,
+        'recipients': list(msg.recipients),
+        'sender': msg.sender,
+        'html': msg.html,
+        'body': msg.body,
+        'attachments': attachments
+    }
+
+def dict_to_message(data):
+    """Rebuild a Flask-Mail Message from message_to_dict() output"""
+    sender = data.get('sender')
+    msg = Message(
+        subject=data.get('subject'),
+        recipients=data.get('recipients', []),
+        html=data.get('html'),
+        body=data.get('body'),
+        sender=tuple(sender) if isinstance(sender, list) else sender
+    )
+    for attachment in data.get('attachments', []):
+        payload = attachment['data']
+        if attachment.get('encoding') == 'base64':
+            payload = base64.b64decode(payload)
+        msg.attach(
+            filename=attachment.get('filename'),
+            content_type=attachment.get('content_type'),
+            data=payload
+        )
+    return msg
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class EmailOutbox:
+    """Persistent utboks med arbeidertråder
+
+    Messages are rendered by the caller, stored in the email_outbox collection
+    and sent by a small pool of worker threads, so request handlers only do
+    local work. Entries stay in storage until they are sent or have failed
+    max_attempts times; entries left by a previous process are resent when
+    the outbox starts. deliver(entry) sends one entry and raises on failure;
+    on_status(entry, status, error) is called with 'sent' or 'failed'.
+    """
+
+    def __init__(self, data_manager, deliver, on_status=None, workers=2, max_attempts=3, retry_delay=30):
+        self.dm = data_manager
+        self.deliver = deliver
+        self.on_status = on_status
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.collection = 'email_outbox'
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._entries = {}
+        self._threads = []
+        self._pid = None
+        self._owner = None
+
+    def ensure_started(self):
+        """Start workers in this process (after a fork the old threads are gone)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._owner = {'pid': self._pid, 'token': uuid.uuid4().hex}
+            self._queue = queue.Queue()
+            self._entries = {}
+            self._recover()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"email-outbox-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _recover(self):
+        """Load entries left behind by a process that is no longer running"""
+        stored = self.dm.load_data(self.collection, [])
+        if not isinstance(stored, list):
+            stored = []
+        recovered = 0
+        for entry in stored:
+            owner = entry.get('owner') or {}
+            pid = owner.get('pid')
+            if pid and pid != self._pid and _pid_alive(pid):
+                continue  # Another live process owns it
+            entry['owner'] = self._owner
+            entry['status'] = 'queued'
+            self._entries[entry['id']] = entry
+            self._queue.put(entry['id'])
+            recovered += 1
+        if recovered:
+            logger.info(f"E-post utboks: gjenopptar {recovered} meldinger")
+            self._persist()
+
+    def _persist(self):
+        """Write this process' entries, keeping entries owned by other live processes"""
+        stored = self.dm.load_data(self.collection, [])
+        if not isinstance(stored, list):
+            stored = []
+        others = [
+            entry for entry in stored
+            if entry.get('id') not in self._entries
+            and (entry.get('owner') or {}).get('pid') not in (None, self._pid)
+            and _pid_alive(entry['owner']['pid'])
+        ]
+        self.dm.save_data(self.collection, others + list(self._entries.values()))
+
+    def enqueue(self, message, template=None, meta=None):
+        """Store a serialized message and hand it to the workers; returns the entry"""
+        self.ensure_started()
+        now = datetime.now().isoformat()
+        entry = {
+            'id': str(uuid.uuid4()),
+            'message': message,
+            'template': template,
+            'meta': meta or {},
+            'status': 'queued',
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now,
+            'error': None,
+            'owner': self._owner
+        }
+        with self._lock:
+            self._entries[entry['id']] = entry
+            self._persist()
+        self._queue.put(entry['id'])
+        return entry
+
+    def _worker(self):
+        while True:
+            entry_id = self._queue.get()
+            try:
+                if entry_id is None:
+                    return
+                self._process(entry_id)
+            except Exception as e:
+                logger.error(f"E-post utboks: uventet feil: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _process(self, entry_id):
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return
+            entry['status'] = 'sending'
+            entry['attempts'] += 1
+
+        try:
+            self.deliver(entry)
+        except Exception as e:
+            self._failed(entry, str(e))
+            return
+
+        with self._lock:
+            entry['status'] = 'sent'
+            self._entries.pop(entry_id, None)
+            self._persist()
+        self._notify(entry, 'sent')
+
+    def _failed(self, entry, error):
+        with self._lock:
+            entry['error'] = error
+            entry['updated_at'] = datetime.now().isoformat()
+            if entry['attempts'] < self.max_attempts:
+                entry['status'] = 'retry'
+                self._persist()
+                delay = self.retry_delay * entry['attempts']
+                logger.warning(f"E-post {entry['id']} feilet ({error}), prøver igjen om {delay}s")
+                timer = threading.Timer(delay, self._queue.put, args=(entry['id'],))
+                timer.daemon = True
+                timer.start()
+                return
+            entry['status'] = 'failed'
+            self._entries.pop(entry['id'], None)
+            self._persist()
+        logger.error(f"E-post {entry['id']} feilet etter {entry['attempts']} forsøk: {error}")
+        self._notify(entry, 'failed', error)
+
+    def _notify(self, entry, status, error=None):
+        if self.on_status:
+            try:
+                self.on_status(entry, status, error)
+            except Exception as e:
+                logger.error(f"E-post utboks: feil ved statusoppdatering: {e}")
+
+    def pending(self):
+        """Number of messages not yet sent or given up on"""
+        with self._lock:
+            return len(self._entries)
+
+    def wait_idle(self, timeout=10):
+        """Block until the queue is drained (used by tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
@@ -0,0 +1,128 @@
+"""
+Ratebegrensning for utgående e-post
+Token buckets globalt og per mottakerdomene, så SMTP-leverandøren ikke blokkerer oss
+"""
+
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_domain_rates(value):
+    """Parse 'gmail.com:20,outlook.com:10' (messages per minute) into a dict"""
+    rates = {}
+    for part in (value or '').split(','):
+        domain, _, rate = part.strip().partition(':')
+        if domain and rate:
+            try:
+                rates[domain.strip().lower()] = float(rate)
+            except ValueError:
+                logger.warning(f"Ugyldig e-post ratebegrensning: {part}")
+    return rates
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until one token is available (0 if available now)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class EmailRateLimiter:
+    """Paces sends against a global bucket and one bucket per recipient domain
+
+    acquire() blocks until every bucket a message needs has a token and
+    then takes them all at once, so the outbox drains at the provider's
+    pace instead of getting throttled. Rates are messages per minute;
+    0 disables that limit.
+    """
+
+    def __init__(self, per_minute=60, burst=10, domain_per_minute=0, domain_burst=5,
+                 domain_overrides=None, clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.global_bucket = TokenBucket(per_minute / 60.0, burst, clock) if per_minute else None
+        self.domain_per_minute = domain_per_minute
+        self.domain_burst = domain_burst
+        self.domain_overrides = domain_overrides or {}
+        self.domain_buckets = {}
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waited': 0, 'total_wait': 0.0, 'max_wait': 0.0, 'waiting': 0}
+        self.domain_waits = {}
+
+    def _bucket_for(self, domain):
+        if domain not in self.domain_buckets:
+            per_minute = self.domain_overrides.get(domain, self.domain_per_minute)
+            self.domain_buckets[domain] = (
+                TokenBucket(per_minute / 60.0, self.domain_burst, self.clock) if per_minute else None
+            )
+        return self.domain_buckets[domain]
+
+    def acquire(self, recipients):
+        """Block until the message may be sent; returns seconds waited (0 if not throttled)"""
+        domains = sorted({r.rsplit('@', 1)[-1].lower() for r in recipients if r and '@' in r})
+        start = self.clock()
+        limited_by = None
+        with self._lock:
+            self.stats['waiting'] += 1
+        try:
+            while True:
+                with self._lock:
+                    buckets = [('*', self.global_bucket)] + [(d, self._bucket_for(d)) for d in domains]
+                    buckets = [(name, bucket) for name, bucket in buckets if bucket is not None]
+                    wait, limiting = 0.0, None
+                    for name, bucket in buckets:
+                        bucket_wait = bucket.wait_time()
+                        if bucket_wait > wait:
+                            wait, limiting = bucket_wait, name
+                    if wait <= 0:
+                        for _, bucket in buckets:
+                            bucket.consume()
+                        break
+                    limited_by = limiting
+                self.sleep(wait)
+        finally:
+            with self._lock:
+                self.stats['waiting'] -= 1
+
+        waited = self.clock() - start
+        with self._lock:
+            self.stats['acquired'] += 1
+            if limited_by is not None:
+                self.stats['waited'] += 1
+                self.stats['total_wait'] += waited
+                self.stats['max_wait'] = max(self.stats['max_wait'], waited)
+                if limited_by != '*':
+                    self.domain_waits[limited_by] = self.domain_waits.get(limited_by, 0) + 1
+        if waited > 1:
+            logger.info(f"E-post ventet {waited:.1f}s på ratebegrensning ({limited_by})")
+        return waited if limited_by is not None else 0.0
+
+    def get_statistics(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['avg_wait'] = round(stats['total_wait'] / stats['waited'], 3) if stats['waited'] else 0
+            stats['total_wait'] = round(stats['total_wait'], 3)
+            stats['max_wait'] = round(stats['max_wait'], 3)
+            stats['throttled_domains'] = dict(self.domain_waits)
+            return stats
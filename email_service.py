@@ -3,22 +3,255 @@ E-post service for Smart Påminner Pro
 Håndterer alle typer e-post notifikasjoner
 """
 
-from flask import render_template, url_for, current_app
+from flask import render_template, url_for, current_app, has_app_context
 from flask_mail import Message
+from markupsafe import escape
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+import atexit
+import hashlib
+import json
+import smtplib
+import threading
+import time
 import logging
 
+from email_outbox import EmailOutbox, message_to_dict, dict_to_message
+from email_digest import EmailDigest, DIGEST_MODES
+from email_rate_limit import EmailRateLimiter, parse_domain_rates
+from email_stats import EmailStatistics
+
 logger = logging.getLogger(__name__)
 
+# Errors that mean the SMTP session is unusable and worth one reconnect
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+# Template variables that differ per recipient; everything else is shared
+RECIPIENT_FIELDS = ('recipient', 'recipient_email')
+RECIPIENT_PLACEHOLDER = '\x00{}\x00'
+
+def fingerprint(*parts):
+    """Stable key for render cache entries built from JSON-like values"""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class RenderedTemplateCache:
+    """LRU cache for rendered shared email bodies
+
+    Bodies are rendered with per-recipient fields as placeholders, so one
+    render serves every recipient of the same message. Entries expire after
+    ttl seconds so edited content is never served for long.
+    """
+
+    def __init__(self, max_entries=128, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            html, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (html, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SMTPConnectionPool:
+    """Gjenbruk av SMTP-tilkoblinger
+
+    Keeps up to max_size open Flask-Mail connections so each message does not
+    pay for a new SMTP + STARTTLS + login handshake. Connections idle longer
+    than idle_timeout are closed on the next acquire instead of being reused.
+    """
+    
+    def __init__(self, mail, max_size=2, idle_timeout=60):
+        self.mail = mail
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, last_used)
+        self.opened = 0
+    
+    def _open(self):
+        connection = self.mail.connect()
+        connection.__enter__()
+        self.opened += 1
+        return connection
+    
+    def _close(self, connection):
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            pass
+    
+    def acquire(self):
+        """Get an open connection, reusing an idle one if still fresh"""
+        now = time.monotonic()
+        stale = []
+        connection = None
+        with self._lock:
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    connection = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            self._close(candidate)
+        return connection or self._open()
+    
+    def release(self, connection):
+        """Return a healthy connection to the pool"""
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self._close(connection)
+    
+    def discard(self, connection):
+        """Close a connection that failed instead of returning it"""
+        self._close(connection)
+    
+    def close_all(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
 class EmailService:
     """Sentral e-post service for alle notifikasjoner"""
     
-    def __init__(self, mail, data_manager):
+    def __init__(self, mail, data_manager, app=None):
         self.mail = mail
         self.dm = data_manager
+        self.app = app
+        config = app.config if app is not None else {}
+        self.pool = SMTPConnectionPool(
+            mail,
+            max_size=config.get('MAIL_POOL_SIZE', 2),
+            idle_timeout=config.get('MAIL_POOL_IDLE_TIMEOUT', 60)
+        )
+        self._pinned = threading.local()
+        self._log_lock = threading.Lock()
+        self.stats = EmailStatistics(data_manager, recent_size=config.get('EMAIL_STATS_RECENT', 50))
+        atexit.register(self.pool.close_all)
+        
+        # Pace SMTP sends so provider throttling doesn't fail whole bursts
+        self.rate_limiter = EmailRateLimiter(
+            per_minute=config.get('MAIL_RATE_PER_MINUTE', 0),
+            burst=config.get('MAIL_RATE_BURST', 10),
+            domain_per_minute=config.get('MAIL_DOMAIN_RATE_PER_MINUTE', 0),
+            domain_burst=config.get('MAIL_DOMAIN_RATE_BURST', 5),
+            domain_overrides=parse_domain_rates(config.get('MAIL_DOMAIN_RATE_LIMITS', ''))
+        )
+        
+        self.render_cache = RenderedTemplateCache(
+            max_entries=config.get('MAIL_RENDER_CACHE_SIZE', 128),
+            ttl=config.get('MAIL_RENDER_CACHE_TTL', 300)
+        )
+        self._render_stats = {}
+        self._render_lock = threading.Lock()
+        
+        # Users on hourly/daily digests get their events buffered here
+        self.digest = EmailDigest(
+            data_manager,
+            self.send_digest,
+            daily_hour=config.get('EMAIL_DIGEST_HOUR', 7),
+            max_events=config.get('EMAIL_DIGEST_MAX_EVENTS', 200)
+        )
+        
+        # Send through the persistent outbox when workers are configured
+        self.outbox = None
+        workers = config.get('MAIL_OUTBOX_WORKERS', 0)
+        if workers:
+            self.outbox = EmailOutbox(
+                data_manager,
+                self._deliver_outbox_entry,
+                on_status=self._on_outbox_status,
+                workers=workers,
+                max_attempts=config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 3),
+                retry_delay=config.get('MAIL_OUTBOX_RETRY_DELAY', 30)
+            )
+    
+    @contextmanager
+    def smtp_session(self):
+        """Send every message in the block over one SMTP connection"""
+        if self.outbox is not None or getattr(self._pinned, 'connection', None) is not None:
+            yield
+            return
+        with self._context():
+            try:
+                self._pinned.connection = self.pool.acquire()
+            except Exception as e:
+                # Each send reconnects and logs its own failure
+                logger.error(f"Kunne ikke åpne SMTP-tilkobling: {e}")
+                self._pinned.connection = None
+            try:
+                yield
+            finally:
+                connection, self._pinned.connection = self._pinned.connection, None
+                if connection is not None:
+                    self.pool.release(connection)
+    
+    def send_message(self, msg):
+        """Send a Message over a pooled connection, reconnecting once if it dropped"""
+        self.rate_limiter.acquire(msg.send_to)
+        with self._context():
+            for attempt in range(2):
+                pinned = getattr(self._pinned, 'connection', None)
+                connection = pinned or self.pool.acquire()
+                try:
+                    connection.send(msg)
+                except CONNECTION_ERRORS:
+                    self.pool.discard(connection)
+                    if pinned is not None:
+                        self._pinned.connection = None
+                    if attempt:
+                        raise
+                    logger.info("SMTP-tilkobling brutt, kobler til på nytt")
+                    continue
+                except Exception:
+                    if pinned is None:
+                        self.pool.release(connection)
+                    raise
+                if pinned is None:
+                    self.pool.release(connection)
+                return
     
-    def _send_email(self, to, subject, template, **kwargs):
+    def _context(self):
+        """App context for sending outside a request (e.g. from timer threads)"""
+        if self.app is not None and not has_app_context():
+            return self.app.app_context()
+        return nullcontext()
+    
+    def _send_email(self, to, subject, template, cache_key=None, **kwargs):
         """Intern metode for å sende e-post"""
+        with self._context():
+            return self._send_email_in_context(to, subject, template, cache_key, **kwargs)
+    
+    def _send_email_in_context(self, to, subject, template, cache_key=None, **kwargs):
         try:
             # Ensure 'to' is a list
             recipients = [to] if isinstance(to, str) else to
@@ -26,44 +259,166 @@ class EmailService:
             msg = Message(
                 subject=subject,
                 recipients=recipients,
-                html=render_template(template, **kwargs),
+                html=self.render(template, cache_key, **kwargs),
                 sender=current_app.config.get('MAIL_DEFAULT_SENDER')
             )
+        except Exception as e:
+            # Log failed email
+            self._log_email(to, subject, 'failed', template, str(e))
+            logger.error(f"Feil ved sending av e-post til {to}: {e}")
+            return False
+        
+        return self.dispatch(msg, template)
+    
+    def render(self, template, cache_key=None, **kwargs):
+        """Render an email body, reusing the shared part for the same cache_key
+
+        Recipient fields are rendered as placeholders and filled in afterwards,
+        so templates must output them directly ({{ recipient }}).
+        """
+        recipient_values = {field: kwargs.pop(field) for field in RECIPIENT_FIELDS if field in kwargs}
+        
+        key = (template, cache_key) if cache_key is not None else None
+        html = self.render_cache.get(key) if key is not None else None
+        if html is None:
+            shared = dict(kwargs)
+            shared.update({field: RECIPIENT_PLACEHOLDER.format(field) for field in recipient_values})
+            start = time.perf_counter()
+            html = render_template(template, **shared)
+            self._record_render(template, time.perf_counter() - start)
+            if key is not None:
+                self.render_cache.put(key, html)
+        else:
+            self._record_render(template, None)
+        
+        for field, value in recipient_values.items():
+            html = html.replace(RECIPIENT_PLACEHOLDER.format(field), str(escape(value or '')))
+        return html
+    
+    def _record_render(self, template, elapsed):
+        """Track render count/time per template (elapsed None = cache hit)"""
+        with self._render_lock:
+            stats = self._render_stats.setdefault(
+                template, {'renders': 0, 'cache_hits': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            )
+            if elapsed is None:
+                stats['cache_hits'] += 1
+                return
+            ms = elapsed * 1000
+            stats['renders'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+    
+    def get_render_statistics(self):
+        """Render metrics per template since startup"""
+        with self._render_lock:
+            return {
+                template: {
+                    'renders': stats['renders'],
+                    'cache_hits': stats['cache_hits'],
+                    'avg_ms': round(stats['total_ms'] / stats['renders'], 2) if stats['renders'] else 0,
+                    'max_ms': round(stats['max_ms'], 2)
+                }
+                for template, stats in self._render_stats.items()
+            }
+    
+    def get_rate_limit_statistics(self):
+        """Wait time from rate limiting and how much mail is still queued"""
+        stats = self.rate_limiter.get_statistics()
+        stats['backlog'] = self.outbox.pending() if self.outbox is not None else 0
+        return stats
+    
+    def dispatch(self, msg, template=None):
+        """Queue a rendered message in the outbox, or send it now if there is none"""
+        recipient = msg.recipients[0] if msg.recipients else None
+        try:
+            if self.outbox is not None:
+                entry = self.outbox.enqueue(message_to_dict(msg), template)
+                self._log_email(recipient, msg.subject, 'queued', template, outbox_id=entry['id'])
+                return True
             
-            self.mail.send(msg)
+            self.send_message(msg)
             
             # Log successful email
-            self._log_email(recipients[0], subject, 'sent', template)
-            logger.info(f"E-post sendt til {recipients[0]}: {subject}")
+            self._log_email(recipient, msg.subject, 'sent', template)
+            logger.info(f"E-post sendt til {recipient}: {msg.subject}")
             return True
             
         except Exception as e:
             # Log failed email
-            self._log_email(to, subject, 'failed', template, str(e))
-            logger.error(f"Feil ved sending av e-post til {to}: {e}")
+            self._log_email(recipient, msg.subject, 'failed', template, str(e))
+            logger.error(f"Feil ved sending av e-post til {recipient}: {e}")
             return False
     
-    def _log_email(self, recipient, subject, status, template, error=None):
+    def _deliver_outbox_entry(self, entry):
+        """Send one outbox entry (runs on an outbox worker thread)"""
+        with self._context():
+            self.send_message(dict_to_message(entry['message']))
+    
+    def _on_outbox_status(self, entry, status, error=None):
+        """Record the final outbox status in the email log"""
+        recipients = entry['message'].get('recipients') or [None]
+        if status == 'sent':
+            logger.info(f"E-post sendt til {recipients[0]}: {entry['message'].get('subject')}")
+        self._update_email_log(entry['id'], status, error)
+    
+    def _log_email(self, recipient, subject, status, template, error=None, outbox_id=None):
         """Logg e-post aktivitet"""
         try:
-            email_log = self.dm.load_data('email_log')
-            log_entry = {
-                'recipient': recipient,
-                'subject': subject,
-                'template': template,
-                'status': status,
-                'timestamp': datetime.now().isoformat(),
-                'error': error
-            }
-            email_log.append(log_entry)
-            self.dm.save_data('email_log', email_log)
+            with self._log_lock:
+                email_log = self.dm.load_data('email_log')
+                log_entry = {
+                    'recipient': recipient,
+                    'subject': subject,
+                    'template': template,
+                    'status': status,
+                    'timestamp': datetime.now().isoformat(),
+                    'error': error
+                }
+                if outbox_id:
+                    log_entry['outbox_id'] = outbox_id
+                email_log.append(log_entry)
+                self.dm.save_data('email_log', email_log)
+                self.stats.record(log_entry)
         except Exception as e:
             logger.error(f"Feil ved logging av e-post: {e}")
     
+    def _update_email_log(self, outbox_id, status, error=None):
+        """Oppdater status for en e-post i køen"""
+        try:
+            with self._log_lock:
+                email_log = self.dm.load_data('email_log')
+                # Queued entries are recent, so search from the end
+                for log_entry in reversed(email_log):
+                    if log_entry.get('outbox_id') == outbox_id:
+                        old_status = log_entry.get('status')
+                        log_entry['status'] = status
+                        log_entry['error'] = error
+                        log_entry['completed_at'] = datetime.now().isoformat()
+                        self.dm.save_data('email_log', email_log)
+                        self.stats.transition(log_entry, old_status)
+                        return
+        except Exception as e:
+            logger.error(f"Feil ved oppdatering av e-post logg: {e}")
+    
+    def _app_url(self):
+        """Public base URL from config, since mail may be sent outside a request"""
+        with self._context():
+            app_url = current_app.config.get('APP_URL', 'https://smartremind-production.up.railway.app')
+        return app_url.rstrip('/')
+    
     def send_reminder_notification(self, reminder, recipient_email):
         """Send påminnelse-notifikasjon"""
         subject = f"🔔 Påminnelse: {reminder['title']}"
         
+        if self.digest.add(recipient_email, {
+            'type': 'reminder',
+            'title': reminder['title'],
+            'text': f"{reminder.get('datetime', '')} · {reminder.get('priority') or 'Medium'}",
+            'url': f"{self._app_url()}/dashboard"
+        }):
+            return True
+        
         return self._send_email(
             to=recipient_email,
             subject=subject,
@@ -80,6 +435,7 @@ class EmailService:
             to=recipient_email,
             subject=subject,
             template='emails/shared_reminder.html',
+            cache_key=fingerprint(reminder, shared_by),
             reminder=reminder,
             shared_by=shared_by,
             recipient=recipient_email
@@ -103,33 +459,74 @@ class EmailService:
             join_url=join_url
         )
     
-    def send_noteboard_update(self, board, update_type, updated_by, recipient_emails, note=None):
-        """Send oppdatering om tavle-endringer"""
+    def send_noteboard_update(self, board, update_type, updated_by, recipient_emails, note=None, update_time=None,
+                              summary=None, update_count=1, authors=None):
+        """Send oppdatering om tavle-endringer
+
+        update_type is the raw type of the (latest) update, which the
+        template matches on; summary and authors describe a coalesced batch
+        of update_count updates.
+        """
         subject = f"📋 Oppdatering på tavle: {board.title}"
         
-        # Create board URL
-        with current_app.app_context():
-            board_url = url_for('view_board', board_id=board.board_id, _external=True)
+        board_url = f"{self._app_url()}/board/{board.board_id}"
+        update_time = update_time or datetime.now()
+        summary = summary or update_type
+        authors = authors or [updated_by]
+        author_names = ', '.join(author.split('@')[0] for author in authors)
+        # Same body for every member; render it once
+        cache_key = fingerprint(board.board_id, board.title, update_type, summary, update_count, authors, note, update_time)
         
         success_count = 0
-        for recipient_email in recipient_emails:
-            if recipient_email != updated_by:  # Don't send to the person who made the update
-                if self._send_email(
-                    to=recipient_email,
-                    subject=subject,
-                    template='emails/noteboard_update.html',
-                    board=board,
-                    update_type=update_type,
-                    updated_by=updated_by,
-                    update_time=datetime.now(),
-                    recipient_email=recipient_email,
-                    board_url=board_url,
-                    note=note
-                ):
-                    success_count += 1
+        with self.smtp_session():
+            for recipient_email in recipient_emails:
+                if recipient_email != updated_by:  # Don't send to the person who made the update
+                    if self.digest.add(recipient_email, {
+                        'type': 'board_update',
+                        'title': board.title,
+                        'text': f"{summary} ({author_names})",
+                        'url': board_url,
+                        'time': update_time.isoformat()
+                    }):
+                        success_count += 1
+                    elif self._send_email(
+                        to=recipient_email,
+                        subject=subject,
+                        template='emails/noteboard_update.html',
+                        cache_key=cache_key,
+                        board=board,
+                        update_type=update_type,
+                        update_count=update_count,
+                        summary=summary,
+                        updated_by=updated_by,
+                        author_names=author_names,
+                        update_time=update_time,
+                        recipient_email=recipient_email,
+                        board_url=board_url,
+                        note=note,
+                        note_content=note
+                    ):
+                        success_count += 1
         
         return success_count
     
+    def send_digest(self, recipient_email, events, mode):
+        """Send one e-post med alle hendelser samlet siden forrige sammendrag"""
+        label = 'daglig' if mode == 'daily' else 'timens'
+        subject = f"📬 Ditt {label} sammendrag: {len(events)} hendelser"
+        
+        return self._send_email(
+            to=recipient_email,
+            subject=subject,
+            template='emails/digest.html',
+            events=events,
+            reminders=[e for e in events if e.get('type') == 'reminder'],
+            board_updates=[e for e in events if e.get('type') == 'board_update'],
+            mode_label=DIGEST_MODES.get(mode, mode),
+            app_url=self._app_url(),
+            recipient=recipient_email
+        )
+    
     def send_test_email(self, recipient_email):
         """Send test-e-post for å verifisere konfigurasjon"""
         subject = "✉️ Test e-post fra Smart Påminner Pro"
@@ -145,27 +542,23 @@ class EmailService:
         )
     
     def get_email_statistics(self):
-        """Hent e-post statistikk"""
+        """Hent e-post statistikk (fra løpende tellere, ikke hele loggen)"""
         try:
-            email_log = self.dm.load_data('email_log')
-            
-            total_sent = len([e for e in email_log if e['status'] == 'sent'])
-            total_failed = len([e for e in email_log if e['status'] == 'failed'])
-            
-            # Count by template type
-            template_stats = {}
-            for entry in email_log:
-                template = entry.get('template', 'unknown')
-                if template not in template_stats:
-                    template_stats[template] = {'sent': 0, 'failed': 0}
-                template_stats[template][entry['status']] += 1
+            snapshot = self.stats.snapshot()
+            totals = snapshot['totals']
+            total_sent = totals.get('sent', 0)
+            total_failed = totals.get('failed', 0)
             
             return {
                 'total_sent': total_sent,
                 'total_failed': total_failed,
-                'success_rate': (total_sent / (total_sent + total_failed) * 100) if (total_sent + total_failed) > 0 else 0,
-                'by_template': template_stats,
-                'recent_emails': email_log[-10:]  # Last 10 emails
+                'total_queued': totals.get('queued', 0),
+                'success_rate': round(total_sent / (total_sent + total_failed) * 100, 1) if (total_sent + total_failed) > 0 else 0,
+                'by_template': snapshot['by_template'],
+                'by_day': snapshot['by_day'],
+                'recent_emails': snapshot['recent'][:10],  # Last 10 emails, newest first
+                'render': self.get_render_statistics(),
+                'rate_limit': self.get_rate_limit_statistics()
             }
         
         except Exception as e:
@@ -173,7 +566,11 @@ class EmailService:
             return {
                 'total_sent': 0,
                 'total_failed': 0,
+                'total_queued': 0,
                 'success_rate': 0,
                 'by_template': {},
-                'recent_emails': []
+                'by_day': {},
+                'recent_emails': [],
+                'render': self.get_render_statistics(),
+                'rate_limit': self.get_rate_limit_statistics()
             }
@@ -0,0 +1,118 @@
+"""
+E-post statistikk for Smart Påminner Pro
+Løpende tellere og de siste e-postene, oppdatert ved hver logging
+"""
+
+import threading
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+STATS_VERSION = 1
+RECENT_FIELDS = ('recipient', 'subject', 'template', 'status', 'timestamp', 'error', 'outbox_id')
+
+
+class EmailStatistics:
+    """Running email counters persisted in the email_stats collection
+
+    Counts per status, per template and per day are adjusted on every
+    email log write, and the newest entries are kept in a bounded ring
+    buffer, so reading statistics never touches email_log. The counters are
+    rebuilt from email_log once if they are missing or from an older format.
+    """
+
+    def __init__(self, data_manager, recent_size=50, keep_days=90):
+        self.dm = data_manager
+        self.recent_size = recent_size
+        self.keep_days = keep_days
+        self.collection = 'email_stats'
+        self._lock = threading.RLock()
+
+    def _empty(self):
+        return {'version': STATS_VERSION, 'totals': {}, 'by_template': {}, 'by_day': {}, 'recent': []}
+
+    def _load(self):
+        """Returns (stats, rebuilt); a fresh rebuild already includes the latest log write"""
+        stats = self.dm.load_data(self.collection, {})
+        if not isinstance(stats, dict) or stats.get('version') != STATS_VERSION:
+            return self.rebuild(), True
+        return stats, False
+
+    def rebuild(self):
+        """Recount everything from email_log (one-off, O(log size))"""
+        with self._lock:
+            stats = self._empty()
+            email_log = self.dm.load_data('email_log', [])
+            for entry in email_log if isinstance(email_log, list) else []:
+                if isinstance(entry, dict):
+                    self._count(stats, entry, entry.get('status', 'unknown'), 1)
+                    self._push_recent(stats, entry)
+            self._prune_days(stats)
+            self.dm.save_data(self.collection, stats)
+            logger.info(f"E-post statistikk bygget fra {len(email_log)} loggføringer")
+            return stats
+
+    def _count(self, stats, entry, status, delta):
+        template = entry.get('template') or 'unknown'
+        day = (entry.get('timestamp') or datetime.now().isoformat())[:10]
+        for counters in (
+            stats['totals'],
+            stats['by_template'].setdefault(template, {}),
+            stats['by_day'].setdefault(day, {})
+        ):
+            counters[status] = max(0, counters.get(status, 0) + delta)
+
+    def _push_recent(self, stats, entry):
+        stats['recent'].append({field: entry.get(field) for field in RECENT_FIELDS})
+        if len(stats['recent']) > self.recent_size:
+            del stats['recent'][:len(stats['recent']) - self.recent_size]
+
+    def _prune_days(self, stats):
+        cutoff = (datetime.now() - timedelta(days=self.keep_days)).date().isoformat()
+        for day in [day for day in stats['by_day'] if day < cutoff]:
+            del stats['by_day'][day]
+
+    def record(self, entry):
+        """Count a new email log entry (call after it is saved to email_log)"""
+        try:
+            with self._lock:
+                stats, rebuilt = self._load()
+                if rebuilt:
+                    return
+                self._count(stats, entry, entry.get('status', 'unknown'), 1)
+                self._push_recent(stats, entry)
+                self._prune_days(stats)
+                self.dm.save_data(self.collection, stats)
+        except Exception as e:
+            logger.error(f"Feil ved oppdatering av e-post statistikk: {e}")
+
+    def transition(self, entry, old_status):
+        """Move a logged email from old_status to entry['status'] (e.g. queued -> sent)"""
+        try:
+            with self._lock:
+                stats, rebuilt = self._load()
+                if rebuilt:
+                    return
+                self._count(stats, entry, old_status, -1)
+                self._count(stats, entry, entry.get('status', 'unknown'), 1)
+                outbox_id = entry.get('outbox_id')
+                for recent in reversed(stats['recent']):
+                    if outbox_id and recent.get('outbox_id') == outbox_id:
+                        recent['status'] = entry.get('status')
+                        recent['error'] = entry.get('error')
+                        break
+                self.dm.save_data(self.collection, stats)
+        except Exception as e:
+            logger.error(f"Feil ved oppdatering av e-post statistikk: {e}")
+
+    def snapshot(self):
+        """Current counters and recent entries (newest first)"""
+        with self._lock:
+            stats, _ = self._load()
+        return {
+            'totals': stats['totals'],
+            'by_template': stats['by_template'],
+            'by_day': stats['by_day'],
+            'recent': list(reversed(stats['recent']))
+        }
@@ -0,0 +1,140 @@
+"""
+Live hendelser (Server-Sent Events) for Smart Påminner Pro
+Enkel pub/sub i prosessen fra skrivestiene til åpne nettleserfaner
+"""
+
+import json
+import time
+import uuid
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event_id, event, data):
+    """One SSE message"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class EventBus:
+    """Per-user event history with blocking waits for SSE streams
+
+    Write paths call publish(email, event, data). Each user has a sequence
+    number and a short history, so a reconnecting EventSource that sends
+    Last-Event-ID gets what it missed. A connection without Last-Event-ID
+    (a freshly loaded page) starts at the current sequence number. Event
+    ids are '<epoch>-<seq>'; if the epoch differs (process restarted) or
+    the history no longer reaches back far enough, the stream sends a
+    'resync' event and the page reloads its data instead.
+
+    Streams wait on a threading.Condition, which the gevent worker
+    monkeypatches, so an idle client costs a greenlet rather than an OS
+    thread. The bus lives in one process: the app runs a single worker,
+    and the scheduler jobs that publish run in that same worker.
+    """
+
+    def __init__(self, history=50, heartbeat=15, max_stream_seconds=300, retry_ms=5000, clock=time.monotonic):
+        self.history = history
+        self.heartbeat = heartbeat
+        self.max_stream_seconds = max_stream_seconds
+        self.retry_ms = retry_ms
+        self.clock = clock
+        self.epoch = uuid.uuid4().hex[:8]
+        self._cond = threading.Condition()
+        self._users = {}
+        self.published = 0
+        self.streams = 0
+
+    def publish(self, email, event, data=None):
+        """Queue an event for every open stream of a user; returns its id"""
+        if not email:
+            return None
+        with self._cond:
+            seq, events = self._users.get(email, (0, None))
+            if events is None:
+                events = deque(maxlen=self.history)
+            seq += 1
+            events.append((seq, event, data or {}))
+            self._users[email] = (seq, events)
+            self.published += 1
+            self._cond.notify_all()
+        return f"{self.epoch}-{seq}"
+
+    def publish_many(self, emails, event, data=None):
+        for email in set(emails):
+            self.publish(email, event, data)
+
+    def _parse_last_id(self, last_event_id):
+        """Sequence number from a Last-Event-ID; None means resync needed"""
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _since(self, email, seq):
+        """(events after seq, latest seq, gap) for a user; call with the lock held"""
+        latest, events = self._users.get(email, (0, ()))
+        if seq > latest:
+            return [], latest, True
+        missed = [entry for entry in events if entry[0] > seq]
+        gap = bool(missed) and missed[0][0] != seq + 1
+        return missed, latest, gap
+
+    def stream(self, email, last_event_id=None):
+        """Yield SSE text for a user until max_stream_seconds has passed"""
+        deadline = self.clock() + self.max_stream_seconds
+        with self._cond:
+            self.streams += 1
+        try:
+            if not last_event_id:
+                # A new page already loaded current data: start from now, replay nothing.
+                # The id line lets the browser resume from here when it reconnects.
+                with self._cond:
+                    seq = self._users.get(email, (0, ()))[0]
+                yield f"retry: {self.retry_ms}\nid: {self.epoch}-{seq}\n\n"
+            else:
+                seq = self._parse_last_id(last_event_id)
+                yield f"retry: {self.retry_ms}\n\n"
+            if seq is None:
+                with self._cond:
+                    seq = self._users.get(email, (0, ()))[0]
+                yield format_event(f"{self.epoch}-{seq}", 'resync', {})
+
+            while True:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return
+                with self._cond:
+                    wake_at = self.clock() + min(self.heartbeat, remaining)
+                    missed, latest, gap = self._since(email, seq)
+                    # Other users' events wake us too; keep waiting until ours or the heartbeat
+                    while not missed and not gap:
+                        left = wake_at - self.clock()
+                        if left <= 0:
+                            break
+                        self._cond.wait(left)
+                        missed, latest, gap = self._since(email, seq)
+
+                if gap:
+                    seq = latest
+                    yield format_event(f"{self.epoch}-{seq}", 'resync', {})
+                elif missed:
+                    for event_seq, event, data in missed:
+                        yield format_event(f"{self.epoch}-{event_seq}", event, data)
+                    seq = missed[-1][0]
+                else:
+                    yield ": ping\n\n"
+        finally:
+            with self._cond:
+                self.streams -= 1
+
+    def get_statistics(self):
+        with self._cond:
+            return {
+                'open_streams': self.streams,
+                'published': self.published,
+                'users': len(self._users)
+            }
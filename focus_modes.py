@@ -6,6 +6,8 @@ Ulike moduser for forskjellige brukerbehov
 from datetime import datetime, timedelta
 import json
 
+from reminder_dates import reminder_datetime
+
 class FocusMode:
     """Base class for focus modes"""
     
@@ -80,7 +82,9 @@ class ADHDMode(FocusMode):
         
         for reminder in reminders:
             try:
-                reminder_time = datetime.fromisoformat(reminder['datetime'].replace(' ', 'T'))
+                reminder_time = reminder_datetime(reminder)
+                if reminder_time is None:
+                    raise ValueError(reminder.get('datetime'))
                 time_diff = reminder_time - now
                 
                 # Legg til urgency level
@@ -0,0 +1,161 @@
+"""
+Fragmentbuffer for maler i Smart Påminner Pro
+Ferdig rendrede påminnelses- og notatkort, pluss rendringstid per mal
+"""
+
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+from flask import render_template, template_rendered, before_render_template
+from jinja2 import pass_context
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+
+def record_version(record):
+    """Version of a reminder or note: digest of its stored fields
+
+    Not every write path bumps an updated-at field (a note move only
+    changes its position), so the content itself is the version.
+    """
+    payload = json.dumps(record, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class RenderMetrics:
+    """Render count and time per template, from Flask's template signals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._templates = {}
+
+    def connect(self, app):
+        before_render_template.connect(self._started, app)
+        template_rendered.connect(self._finished, app)
+
+    def _started(self, sender, template, context, **extra):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append((template, time.perf_counter()))
+
+    def _finished(self, sender, template, context, **extra):
+        stack = getattr(self._local, 'stack', None)
+        # A template that raised never reports back; drop its entry too
+        while stack:
+            started_template, started = stack.pop()
+            if started_template is template:
+                self.record(template.name, (time.perf_counter() - started) * 1000)
+                return
+
+    def record(self, name, ms):
+        with self._lock:
+            entry = self._templates.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+
+    def get_statistics(self):
+        """{template: {count, avg_ms, max_ms, total_ms}}, slowest in total first"""
+        with self._lock:
+            items = sorted(self._templates.items(), key=lambda item: -item[1]['total_ms'])
+            return {
+                name: {
+                    'count': entry['count'],
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                    'total_ms': round(entry['total_ms'], 1)
+                }
+                for name, entry in items
+            }
+
+
+class FragmentCache:
+    """LRU cache of rendered card partials
+
+    Templates call render_card('partials/reminder_card.html', reminder).
+    The key is the partial, the record id, record_version() of the record,
+    the page's focus mode and any extra variables, so a changed reminder
+    or note gets a new key and only that card is rendered again. Entries
+    are evicted least recently used first when either max_entries or
+    max_bytes is exceeded.
+    """
+
+    def __init__(self, app=None, max_entries=2000, max_bytes=4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.metrics = RenderMetrics()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', self.max_bytes)
+
+        @pass_context
+        def render_card(context, template, record, name='reminder', **extra):
+            return self.render_card(template, record, name, focus_mode=context.get('current_focus_mode'), **extra)
+
+        app.jinja_env.globals['render_card'] = render_card
+        self.metrics.connect(app)
+        app.extensions['fragment_cache'] = self
+
+    def render_card(self, template, record, name='reminder', focus_mode=None, **extra):
+        """Rendered partial for one record, from the cache when unchanged"""
+        key = (
+            template,
+            str(record.get('id')),
+            record_version(record),
+            focus_mode,
+            tuple(sorted(extra.items()))
+        )
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return html
+            self.stats['misses'] += 1
+
+        html = Markup(render_template(template, current_focus_mode=focus_mode, **{name: record}, **extra))
+        self._store(key, html)
+        return html
+
+    def _store(self, key, html):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = html
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_statistics(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['templates'] = self.metrics.get_statistics()
+        return stats
@@ -0,0 +1,186 @@
+"""
+iCalendar (RFC 5545) for Smart Påminner Pro
+Bygger korrekt escapede VEVENTs for påminnelser, med cache per påminnelse og versjon
+"""
+
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+PRODID = '-//SmartReminder//SmartReminder//NO'
+DEFAULT_DURATION = timedelta(minutes=30)
+PRIORITY_MAP = {'Høy': 1, 'high': 1, 'Medium': 5, 'normal': 5, 'Lav': 9, 'low': 9}
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+# Fields that change what a reminder's VEVENT looks like
+EVENT_FIELDS = ('title', 'description', 'datetime', 'category', 'priority', 'updated_at')
+
+def escape_text(value):
+    """Escape a TEXT value (backslash, semicolon, comma and newlines)"""
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+        .replace('\r', '\\n')
+    )
+
+def fold_line(line):
+    """Fold a content line at 75 octets without splitting UTF-8 characters"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    current, size, limit = [], 0, 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            parts.append(''.join(current))
+            current, size, limit = [], 0, 74  # Continuation lines start with a space
+        current.append(char)
+        size += char_size
+    parts.append(''.join(current))
+    return '\r\n '.join(parts)
+
+def parse_reminder_datetime(value):
+    """Parse the stored 'YYYY-MM-DD HH:MM' (or ISO) reminder time; None if invalid"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and len(value) == 19 and value[10] == 'T':
+        # Canonical 'datetime_iso' written by reminder_dates.normalize_reminder()
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(str(value or '')[:19], fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+
+def to_utc(local_dt, tz_name):
+    """Local wall-clock time in tz_name -> aware UTC datetime"""
+    if local_dt.tzinfo is None:
+        tz = None
+        if ZoneInfo is not None:
+            try:
+                tz = ZoneInfo(tz_name)
+            except Exception:
+                logger.warning(f"Ukjent tidssone {tz_name}, bruker systemets lokale tid")
+        local_dt = local_dt.replace(tzinfo=tz) if tz else local_dt.astimezone()
+    return local_dt.astimezone(timezone.utc)
+
+def format_utc(dt):
+    return dt.strftime('%Y%m%dT%H%M%SZ')
+
+def reminder_version(reminder):
+    """Version of a reminder's calendar data: explicit 'version' or a hash of its event fields"""
+    if reminder.get('version') is not None:
+        return str(reminder['version'])
+    raw = '\x1f'.join(str(reminder.get(field, '')) for field in EVENT_FIELDS)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def vevent_lines(reminder, tz_name='Europe/Oslo', duration=DEFAULT_DURATION, dtstamp=None):
+    """Content lines (unfolded) for one reminder, or [] if it has no valid time"""
+    start = parse_reminder_datetime(reminder.get('datetime_iso') or reminder.get('datetime'))
+    if start is None:
+        return []
+    start_utc = to_utc(start, tz_name)
+    if dtstamp is None:
+        # Derived from the record, so the same version always serializes identically
+        changed = parse_reminder_datetime(reminder.get('updated_at') or reminder.get('created_at'))
+        dtstamp = to_utc(changed, tz_name) if changed else start_utc
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{escape_text(reminder.get('id'))}@smartreminder",
+        f"DTSTAMP:{format_utc(dtstamp)}",
+        f"DTSTART:{format_utc(start_utc)}",
+        f"DTEND:{format_utc(start_utc + duration)}",
+        f"SUMMARY:{escape_text(reminder.get('title') or 'Påminnelse')}",
+    ]
+    if reminder.get('description'):
+        lines.append(f"DESCRIPTION:{escape_text(reminder['description'])}")
+    if reminder.get('category'):
+        lines.append(f"CATEGORIES:{escape_text(reminder['category'])}")
+    lines.append(f"PRIORITY:{PRIORITY_MAP.get(reminder.get('priority'), 5)}")
+    lines.append('END:VEVENT')
+    return lines
+
+def calendar_header(method=None, name=None):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', f"PRODID:{PRODID}", 'CALSCALE:GREGORIAN']
+    if method:
+        lines.append(f"METHOD:{method}")
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+    return lines
+
+def serialize(lines):
+    """Fold and join content lines with CRLF"""
+    return ''.join(fold_line(line) + '\r\n' for line in lines)
+
+
+class ICSCache:
+    """LRU of serialized VEVENT blocks keyed by (reminder id, version, timezone)"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def vevent(self, reminder, tz_name='Europe/Oslo'):
+        """Serialized VEVENT text for a reminder, built once per version"""
+        key = (reminder.get('id'), reminder_version(reminder), tz_name)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        text = serialize(vevent_lines(reminder, tz_name))
+        with self._lock:
+            self._entries[key] = text
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+ics_cache = ICSCache()
+
+def build_invitation(reminder, tz_name='Europe/Oslo'):
+    """ICS bytes for sharing one reminder; identical for every recipient"""
+    body = serialize(calendar_header(method='PUBLISH')) + ics_cache.vevent(reminder, tz_name) + 'END:VCALENDAR\r\n'
+    return body.encode('utf-8')
+
+def iter_calendar(reminders, tz_name='Europe/Oslo', name=None):
+    """Yield a full VCALENDAR piece by piece (for exports and feeds)"""
+    yield serialize(calendar_header(method='PUBLISH', name=name))
+    for reminder in reminders:
+        yield ics_cache.vevent(reminder, tz_name)
+    yield 'END:VCALENDAR\r\n'
+
+def build_calendar(reminders, tz_name='Europe/Oslo', name=None):
+    """ICS bytes for many reminders (bulk export)"""
+    return ''.join(iter_calendar(reminders, tz_name, name)).encode('utf-8')
@@ -4,6 +4,9 @@ Handles web push notifications for mobile devices
 """
 
 import json
+import os
+import hashlib
+import threading
 import requests
 from pywebpush import webpush, WebPushException
 import logging
@@ -16,14 +19,82 @@ VAPID_PRIVATE_KEY = "JXUuiYEy2DZEKAGzBcONdE66nBV2D5THNUaXoC2uU5w"
 VAPID_PUBLIC_KEY = "BAabd3LWGSSiENrLJiL8NvpIgDQTPxzngysuFEeYsM8CevuSfnPwUaaneXYtJ4r6508R7Nl6VUG_Dw9v3cYH-tY"
 VAPID_CLAIMS = {"sub": "mailto:admin@smartreminder.com"}
 
-def send_push_notification(user_email, title, body, data=None, dm=None):
-    """Send push notification to user with enhanced mobile support"""
-    if not dm:
-        logger.error("DataManager not provided to send_push_notification")
-        return False
-        
+# Delivery headers (RFC 8030): how long the push service keeps undelivered
+# messages, how eagerly devices should wake, and collapse keys for updates
+DEFAULT_TTL = 24 * 3600
+BOARD_UPDATE_TTL = 6 * 3600
+REMINDER_TTL_GRACE = 3600
+MIN_TTL = 60
+
+# Deliveries and re-subscribes refresh a subscription's last_seen at most this often
+LAST_SEEN_RESOLUTION_DAYS = 1
+
+PRIORITY_URGENCY = {
+    'Høy': 'high',
+    'high': 'high',
+    'Medium': 'normal',
+    'normal': 'normal',
+    'Lav': 'low',
+    'low': 'low',
+}
+
+def urgency_for_priority(priority):
+    """Map reminder priority (Høy/Medium/Lav) to a push Urgency value"""
+    return PRIORITY_URGENCY.get(priority, 'normal')
+
+def make_topic(*parts):
+    """Build a push Topic (max 32 URL-safe chars) so newer messages replace pending ones"""
+    key = ':'.join(str(part) for part in parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:32]
+
+def reminder_ttl(reminder_time, now=None):
+    """TTL that keeps a reminder push until shortly after the reminder is due"""
+    now = now or datetime.now()
     try:
-        # Load push subscriptions, handle both dict and list formats
+        due = datetime.fromisoformat(str(reminder_time).replace(' ', 'T'))
+    except ValueError:
+        return DEFAULT_TTL
+    seconds = int((due - now).total_seconds()) + REMINDER_TTL_GRACE
+    return max(MIN_TTL, min(seconds, DEFAULT_TTL * 7))
+
+def _push_headers(urgency=None, topic=None):
+    headers = {}
+    if urgency:
+        headers['Urgency'] = urgency
+    if topic:
+        headers['Topic'] = topic
+    return headers
+
+class SubscriptionRegistry:
+    """In-memory email -> push subscriptions map backed by push_subscriptions.json
+
+    The snapshot is loaded once and reused until a write path calls
+    invalidate() or the backing files change on disk, so fan-out to many
+    recipients does not touch the filesystem per recipient.
+    """
+
+    def __init__(self):
+        # Held while reading or rewriting push_subscriptions.json so concurrent
+        # senders never cache a half-written file
+        self.lock = threading.RLock()
+        self._source = None
+        self._subscriptions = {}
+        self._sounds = {}
+
+    def _source_key(self, dm):
+        """Identify the data snapshot (data dir + file mtimes) the cache was built from"""
+        data_dir = getattr(dm, 'data_dir', None)
+        if data_dir is None:
+            return (id(dm),)
+        mtimes = []
+        for collection in ('push_subscriptions', 'users'):
+            try:
+                mtimes.append(os.stat(os.path.join(str(data_dir), f"{collection}.json")).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return (id(dm), str(data_dir), tuple(mtimes))
+
+    def _load(self, dm):
         subscriptions_data = dm.load_data('push_subscriptions', {})
         
         # Handle the case where subscriptions_data might be a list instead of dict
@@ -34,94 +105,233 @@ def send_push_notification(user_email, title, body, data=None, dm=None):
             logger.error("Push subscriptions data is not in expected format")
             subscriptions_data = {}
         
-        user_subscriptions = subscriptions_data.get(user_email, [])
+        subscriptions = {}
+        for email, user_subscriptions in subscriptions_data.items():
+            if not isinstance(user_subscriptions, list):
+                logger.warning(f"User subscriptions for {email} is not a list, converting")
+                user_subscriptions = []
+            subscriptions[email] = user_subscriptions
         
-        # Ensure user_subscriptions is a list
+        # Users are keyed by id, so index sound preferences by both key and email
+        users_data = dm.load_data('users', {})
+        sounds = {}
+        if isinstance(users_data, dict):
+            for key, user_data in users_data.items():
+                if isinstance(user_data, dict) and user_data.get('notification_sound'):
+                    sounds[key] = user_data['notification_sound']
+                    if user_data.get('email'):
+                        sounds[user_data['email']] = user_data['notification_sound']
+        
+        self._subscriptions = subscriptions
+        self._sounds = sounds
+
+    def refresh(self, dm):
+        """Reload the snapshot if it was invalidated or the backing files changed"""
+        with self.lock:
+            key = self._source_key(dm)
+            if key != self._source:
+                self._load(dm)
+                self._source = key
+
+    def invalidate(self):
+        """Drop the snapshot; the next lookup reloads from storage"""
+        with self.lock:
+            self._source = None
+
+    def get_subscriptions(self, user_email):
+        """Get a copy of the cached subscriptions for a user"""
+        with self.lock:
+            return list(self._subscriptions.get(user_email, []))
+
+    def get_sound(self, user_email, default='pristine.mp3'):
+        """Get the cached notification sound preference for a user"""
+        with self.lock:
+            return self._sounds.get(user_email, default)
+
+
+# Shared registry used by all send paths
+subscription_registry = SubscriptionRegistry()
+
+def _build_payload(title, body, notification_data):
+    """Build the mobile-optimized notification payload as a JSON string"""
+    payload = {
+        "title": title,
+        "body": body,
+        "icon": "/static/images/icon-192x192.png",
+        "badge": "/static/images/badge-96x96.png",
+        "tag": "smartreminder-notification",
+        "renotify": True,
+        "requireInteraction": True,  # Keep notification visible until user interacts
+        "sound": notification_data['sound'],
+        "vibrate": [200, 100, 200, 100, 200],  # Enhanced vibration pattern
+        "data": notification_data,
+        "actions": [
+            {
+                "action": "open",
+                "title": "Åpne app",
+                "icon": "/static/images/icon-192x192.png"
+            },
+            {
+                "action": "close", 
+                "title": "Lukk",
+                "icon": "/static/images/icon-192x192.png"
+            }
+        ]
+    }
+    
+    # Add priority handling for mobile
+    if notification_data.get('priority') == 'high':
+        payload['vibrate'] = [300, 100, 300, 100, 300]
+        payload['requireInteraction'] = True
+    
+    return json.dumps(payload)
+
+def refresh_last_seen(subscription, now=None):
+    """Stamp last_seen if it is missing or older than LAST_SEEN_RESOLUTION_DAYS
+
+    Returns True if the subscription changed and needs saving, so
+    re-subscribes and deliveries write at most about once a day.
+    """
+    now = now or datetime.now()
+    age = _subscription_age_days(subscription, now)
+    if age is not None and age < LAST_SEEN_RESOLUTION_DAYS:
+        return False
+    subscription['last_seen'] = now.isoformat()
+    return True
+
+def prune_subscriptions(removals, dm, seen=None):
+    """Remove subscriptions by endpoint for several users in a single write
+
+    removals maps user email -> set of endpoints to drop; seen maps user
+    email -> endpoints that just accepted a push, whose last_seen is
+    refreshed in the same write. Returns the number of subscriptions removed.
+    """
+    if not removals and not seen:
+        return 0
+    
+    with subscription_registry.lock:
+        return _prune_subscriptions_locked(removals or {}, seen or {}, dm)
+
+def _prune_subscriptions_locked(removals, seen, dm):
+    subscriptions_data = dm.load_data('push_subscriptions', {})
+    if not isinstance(subscriptions_data, dict):
+        return 0
+    
+    removed = 0
+    touched = 0
+    now = datetime.now()
+    for user_email in set(removals) | set(seen):
+        user_subscriptions = subscriptions_data.get(user_email)
         if not isinstance(user_subscriptions, list):
-            logger.warning(f"User subscriptions for {user_email} is not a list, converting")
-            user_subscriptions = []
-        
+            continue
+        endpoints = removals.get(user_email, ())
+        kept = [sub for sub in user_subscriptions if sub.get('endpoint') not in endpoints]
+        removed += len(user_subscriptions) - len(kept)
+        for sub in kept:
+            if sub.get('endpoint') in seen.get(user_email, ()) and refresh_last_seen(sub, now):
+                touched += 1
+        subscriptions_data[user_email] = kept
+    
+    if removed or touched:
+        dm.save_data('push_subscriptions', subscriptions_data)
+        subscription_registry.invalidate()
+    if removed:
+        logger.info(f"Removed {removed} invalid push subscriptions for {len(removals)} users")
+    return removed
+
+def send_push_batch(user_emails, title, body, data=None, dm=None, ttl=None, urgency=None, topic=None):
+    """Send the same notification to several users
+
+    Subscriptions come from the in-memory registry and the JSON payload is
+    encoded once per distinct sound, so the delivery loop does no file reads.
+    ttl, urgency and topic set the push delivery headers; urgency defaults
+    from data['priority'] and ttl to DEFAULT_TTL. Messages sharing a topic
+    replace each other while still pending on the push service.
+    Returns the number of users that received at least one push.
+    """
+    if not dm:
+        logger.error("DataManager not provided to send_push_batch")
+        return 0
+    
+    try:
+        subscription_registry.refresh(dm)
+    except Exception as e:
+        logger.error(f"Error loading push subscriptions: {e}")
+        return 0
+    
+    if urgency is None:
+        urgency = urgency_for_priority((data or {}).get('priority'))
+    if ttl is None:
+        ttl = DEFAULT_TTL
+    headers = _push_headers(urgency, topic)
+    
+    payloads = {}
+    delivered = 0
+    removals = {}
+    seen = {}
+    now = datetime.now()
+    
+    for user_email in user_emails:
+        user_subscriptions = subscription_registry.get_subscriptions(user_email)
         if not user_subscriptions:
             logger.info(f"No push subscriptions found for user {user_email}")
-            return False
-        
-        # Get user preferences for sound
-        users_data = dm.load_data('users', {})
-        user_data = users_data.get(user_email, {})
-        default_sound = user_data.get('notification_sound', 'pristine.mp3')
+            continue
         
-        # Use provided data or create empty dict
-        notification_data = data or {}
-        
-        # Add sound parameter if not already present
-        if 'sound' not in notification_data:
-            notification_data['sound'] = default_sound
-        
-        # Enhanced mobile-optimized notification payload
-        notification_payload = {
-            "title": title,
-            "body": body,
-            "icon": "/static/images/icon-192x192.png",
-            "badge": "/static/images/badge-96x96.png",
-            "tag": "smartreminder-notification",
-            "renotify": True,
-            "requireInteraction": True,  # Keep notification visible until user interacts
-            "sound": notification_data.get('sound', default_sound),
-            "vibrate": [200, 100, 200, 100, 200],  # Enhanced vibration pattern
-            "data": notification_data,
-            "actions": [
-                {
-                    "action": "open",
-                    "title": "Åpne app",
-                    "icon": "/static/images/icon-192x192.png"
-                },
-                {
-                    "action": "close", 
-                    "title": "Lukk",
-                    "icon": "/static/images/icon-192x192.png"
-                }
-            ]
-        }
-        
-        # Add priority handling for mobile
-        if notification_data.get('priority') == 'high':
-            notification_payload['vibrate'] = [300, 100, 300, 100, 300]
-            notification_payload['requireInteraction'] = True
+        # Sound falls back to the user's preference, so payloads differ only by sound
+        sound = (data or {}).get('sound') or subscription_registry.get_sound(user_email)
+        payload = payloads.get(sound)
+        if payload is None:
+            notification_data = dict(data or {})
+            notification_data['sound'] = sound
+            payload = payloads[sound] = _build_payload(title, body, notification_data)
         
         success_count = 0
-        invalid_subscriptions = []
         
         for subscription in user_subscriptions:
             try:
-                response = webpush(
+                webpush(
                     subscription_info=subscription,
-                    data=json.dumps(notification_payload),
+                    data=payload,
                     vapid_private_key=VAPID_PRIVATE_KEY,
-                    vapid_claims=VAPID_CLAIMS
+                    vapid_claims=VAPID_CLAIMS,
+                    ttl=ttl,
+                    headers=dict(headers)
                 )
                 success_count += 1
                 logger.info(f"Push notification sent successfully to {user_email}")
+                age = _subscription_age_days(subscription, now)
+                if age is None or age >= LAST_SEEN_RESOLUTION_DAYS:
+                    seen.setdefault(user_email, set()).add(subscription.get('endpoint'))
                 
             except WebPushException as e:
                 logger.error(f"Failed to send push notification to {user_email}: {e}")
                 # Mark subscription for removal if it's invalid
-                if e.response and e.response.status_code in [410, 404]:
-                    invalid_subscriptions.append(subscription)
+                if e.response is not None and e.response.status_code in [410, 404]:
+                    removals.setdefault(user_email, set()).add(subscription.get('endpoint'))
             except Exception as e:
                 logger.error(f"Unexpected error sending push notification: {e}")
         
-        # Remove invalid subscriptions
-        if invalid_subscriptions:
-            for invalid_sub in invalid_subscriptions:
-                if invalid_sub in user_subscriptions:
-                    user_subscriptions.remove(invalid_sub)
-            
-            subscriptions_data[user_email] = user_subscriptions
-            dm.save_data('push_subscriptions', subscriptions_data)
-            logger.info(f"Removed {len(invalid_subscriptions)} invalid subscriptions for {user_email}")
-        
-        return success_count > 0
+        if success_count > 0:
+            delivered += 1
+    
+    # Apply all removals and last_seen refreshes collected during the batch in one write
+    if removals or seen:
+        try:
+            prune_subscriptions(removals, dm, seen=seen)
+        except Exception as e:
+            logger.error(f"Error updating push subscriptions: {e}")
+    
+    return delivered
+
+def send_push_notification(user_email, title, body, data=None, dm=None, ttl=None, urgency=None, topic=None):
+    """Send push notification to user with enhanced mobile support"""
+    if not dm:
+        logger.error("DataManager not provided to send_push_notification")
+        return False
         
+    try:
+        return send_push_batch([user_email], title, body, data, dm,
+                               ttl=ttl, urgency=urgency, topic=topic) > 0
     except Exception as e:
         logger.error(f"Error sending push notification to {user_email}: {e}")
         return False
@@ -155,11 +365,13 @@ def send_board_notification(board_id, action, content, exclude_user=None, dm=Non
             "url": f"/board/{board_id}"
         }
         
-        success_count = 0
-        for member in board.get('members', []):
-            if member != exclude_user:
-                if send_push_notification(member, title, body, notification_data, dm):
-                    success_count += 1
+        recipients = [member for member in board.get('members', []) if member != exclude_user]
+        success_count = send_push_batch(
+            recipients, title, body, notification_data, dm,
+            ttl=BOARD_UPDATE_TTL,
+            urgency='low',
+            topic=make_topic('board', board_id)
+        )
         
         logger.info(f"Sent board notifications to {success_count} members for board {board_id}")
         return success_count > 0
@@ -168,7 +380,8 @@ def send_board_notification(board_id, action, content, exclude_user=None, dm=Non
         logger.error(f"Error sending board notification for {board_id}: {e}")
         return False
 
-def send_reminder_notification(user_email, reminder_title, reminder_time, sound=None, dm=None):
+def send_reminder_notification(user_email, reminder_title, reminder_time, sound=None, dm=None,
+                               priority=None, reminder_id=None):
     """Send notification for upcoming reminder"""
     if not dm:
         return False
@@ -187,7 +400,12 @@ def send_reminder_notification(user_email, reminder_title, reminder_time, sound=
     if sound:
         notification_data["sound"] = sound
     
-    return send_push_notification(user_email, title, body, notification_data, dm)
+    return send_push_notification(
+        user_email, title, body, notification_data, dm,
+        ttl=reminder_ttl(reminder_time),
+        urgency=urgency_for_priority(priority),
+        topic=make_topic('reminder', reminder_id or reminder_title)
+    )
 
 def subscribe_user_to_push(user_email, subscription_data, dm=None):
     """Subscribe user to push notifications"""
@@ -195,41 +413,183 @@ def subscribe_user_to_push(user_email, subscription_data, dm=None):
         return False
         
     try:
-        subscriptions = dm.load_data('push_subscriptions')
-        
-        if user_email not in subscriptions:
-            subscriptions[user_email] = []
-        
-        # Check if subscription already exists
-        existing = False
-        for sub in subscriptions[user_email]:
-            if sub.get('endpoint') == subscription_data.get('endpoint'):
-                existing = True
-                break
-        
-        if not existing:
-            # Add timestamp to subscription
-            subscription_data['subscribed_at'] = datetime.now().isoformat()
-            subscriptions[user_email].append(subscription_data)
-            dm.save_data('push_subscriptions', subscriptions)
-            logger.info(f"Added push subscription for {user_email}")
-            return True
-        else:
-            logger.info(f"Push subscription already exists for {user_email}")
-            return True
+        with subscription_registry.lock:
+            subscriptions = dm.load_data('push_subscriptions')
+            
+            if user_email not in subscriptions:
+                subscriptions[user_email] = []
+            
+            # Check if subscription already exists
+            existing = False
+            for sub in subscriptions[user_email]:
+                if sub.get('endpoint') == subscription_data.get('endpoint'):
+                    existing = True
+                    break
             
+            if not existing:
+                # Add timestamp to subscription
+                subscription_data['subscribed_at'] = datetime.now().isoformat()
+                subscription_data['last_seen'] = subscription_data['subscribed_at']
+                subscriptions[user_email].append(subscription_data)
+                dm.save_data('push_subscriptions', subscriptions)
+                subscription_registry.invalidate()
+                logger.info(f"Added push subscription for {user_email}")
+                return True
+            else:
+                # The browser still holds it, so it is not stale
+                if refresh_last_seen(sub):
+                    dm.save_data('push_subscriptions', subscriptions)
+                    subscription_registry.invalidate()
+                logger.info(f"Push subscription already exists for {user_email}")
+                return True
+        
     except Exception as e:
         logger.error(f"Error subscribing user {user_email} to push notifications: {e}")
         return False
 
+def _subscription_age_days(subscription, now):
+    """Days since the subscription was last seen working, or None if never stamped"""
+    stamp = subscription.get('last_seen')
+    if not stamp:
+        return None
+    try:
+        return (now - datetime.fromisoformat(stamp)).total_seconds() / 86400
+    except (TypeError, ValueError):
+        return None
+
+# Email the next sweep resumes after, so each run covers a bounded slice
+_sweep_cursor = {'after': None}
+
+def sweep_stale_subscriptions(dm, max_age_days=180, batch_size=200, probe=False):
+    """Age out push subscriptions that have not been seen working for a long time
+
+    Age is measured from last_seen, which subscribing again and every
+    successful delivery refresh. Each run examines at most batch_size
+    subscriptions, resuming where the previous run stopped. Subscriptions
+    not seen for max_age_days are removed; with probe=True they are first
+    sent a zero-TTL probe and kept if the push service still accepts them.
+    Probes run without the registry lock, so senders are not blocked on
+    the network. Subscriptions without last_seen are stamped so they can
+    age out later. All changes are written once per run.
+    Returns a dict with examined/removed/stamped counts.
+    """
+    result = {'examined': 0, 'removed': 0, 'stamped': 0}
+    if not dm:
+        return result
+    
+    now = datetime.now()
+    with subscription_registry.lock:
+        subscriptions_data = dm.load_data('push_subscriptions', {})
+        if not isinstance(subscriptions_data, dict) or not subscriptions_data:
+            return result
+        stale, unstamped = _select_sweep_batch(subscriptions_data, now, max_age_days, batch_size, result)
+    
+    alive = set()
+    if probe:
+        alive = {(email, sub.get('endpoint')) for email, sub in stale if _probe_subscription(sub)}
+    
+    with subscription_registry.lock:
+        return _apply_sweep(dm, now, max_age_days, {(email, sub.get('endpoint')) for email, sub in stale},
+                            unstamped, alive, result)
+
+def _select_sweep_batch(subscriptions_data, now, max_age_days, batch_size, result):
+    """(stale (email, subscription) pairs, unstamped (email, endpoint) keys) for this run"""
+    emails = sorted(subscriptions_data)
+    after = _sweep_cursor['after']
+    if after is not None:
+        # Resume after the cursor and wrap around to the start
+        emails = [e for e in emails if e > after] + [e for e in emails if e <= after]
+    
+    stale, unstamped = [], set()
+    last_email = None
+    for user_email in emails:
+        user_subscriptions = subscriptions_data.get(user_email)
+        if not isinstance(user_subscriptions, list):
+            continue
+        if result['examined'] and result['examined'] + len(user_subscriptions) > batch_size:
+            break
+        
+        for subscription in user_subscriptions:
+            result['examined'] += 1
+            age = _subscription_age_days(subscription, now)
+            if age is None:
+                unstamped.add((user_email, subscription.get('endpoint')))
+            elif age > max_age_days:
+                stale.append((user_email, subscription))
+        last_email = user_email
+    
+    _sweep_cursor['after'] = last_email
+    return stale, unstamped
+
+def _apply_sweep(dm, now, max_age_days, stale, unstamped, alive, result):
+    """Re-read the file and apply a sweep; call with the registry lock held
+
+    A subscription refreshed by a delivery or re-subscribe while the
+    probes ran is no longer stale and is kept.
+    """
+    subscriptions_data = dm.load_data('push_subscriptions', {})
+    if not isinstance(subscriptions_data, dict):
+        return result
+    
+    changed = False
+    for user_email in {email for email, _ in stale | unstamped}:
+        user_subscriptions = subscriptions_data.get(user_email)
+        if not isinstance(user_subscriptions, list):
+            continue
+        kept = []
+        for subscription in user_subscriptions:
+            key = (user_email, subscription.get('endpoint'))
+            age = _subscription_age_days(subscription, now)
+            if key in unstamped and age is None:
+                subscription['last_seen'] = now.isoformat()
+                result['stamped'] += 1
+                changed = True
+            elif key in stale and age is not None and age > max_age_days:
+                if key in alive:
+                    # Still accepted by the push service, so restart its age
+                    subscription['last_seen'] = now.isoformat()
+                    changed = True
+                else:
+                    result['removed'] += 1
+                    changed = True
+                    continue
+            kept.append(subscription)
+        subscriptions_data[user_email] = kept
+    
+    if changed:
+        dm.save_data('push_subscriptions', subscriptions_data)
+        subscription_registry.invalidate()
+        logger.info(f"Push subscription sweep: {result}")
+    return result
+
+def _probe_subscription(subscription):
+    """Check whether the push service still accepts a subscription"""
+    try:
+        webpush(
+            subscription_info=subscription,
+            data=json.dumps({"type": "probe"}),
+            vapid_private_key=VAPID_PRIVATE_KEY,
+            vapid_claims=VAPID_CLAIMS,
+            ttl=0
+        )
+        return True
+    except WebPushException as e:
+        if e.response is not None and e.response.status_code in [410, 404]:
+            return False
+        # Transient failure, keep it for the next sweep
+        return True
+    except Exception as e:
+        logger.error(f"Unexpected error probing push subscription: {e}")
+        return True
+
 def get_user_subscriptions(user_email, dm=None):
     """Get all push subscriptions for a user"""
     if not dm:
         return []
         
     try:
-        subscriptions = dm.load_data('push_subscriptions')
-        return subscriptions.get(user_email, [])
+        subscription_registry.refresh(dm)
+        return subscription_registry.get_subscriptions(user_email)
     except Exception as e:
         logger.error(f"Error getting subscriptions for {user_email}: {e}")
         return []
@@ -240,21 +600,23 @@ def unsubscribe_user_from_push(user_email, endpoint, dm=None):
         return False
         
     try:
-        subscriptions = dm.load_data('push_subscriptions')
-        user_subs = subscriptions.get(user_email, [])
-        
-        # Remove subscription with matching endpoint
-        updated_subs = [sub for sub in user_subs if sub.get('endpoint') != endpoint]
-        
-        if len(updated_subs) != len(user_subs):
-            subscriptions[user_email] = updated_subs
-            dm.save_data('push_subscriptions', subscriptions)
-            logger.info(f"Removed push subscription for {user_email}")
-            return True
-        else:
-            logger.warning(f"No matching subscription found for {user_email}")
-            return False
+        with subscription_registry.lock:
+            subscriptions = dm.load_data('push_subscriptions')
+            user_subs = subscriptions.get(user_email, [])
+            
+            # Remove subscription with matching endpoint
+            updated_subs = [sub for sub in user_subs if sub.get('endpoint') != endpoint]
             
+            if len(updated_subs) != len(user_subs):
+                subscriptions[user_email] = updated_subs
+                dm.save_data('push_subscriptions', subscriptions)
+                subscription_registry.invalidate()
+                logger.info(f"Removed push subscription for {user_email}")
+                return True
+            else:
+                logger.warning(f"No matching subscription found for {user_email}")
+                return False
+        
     except Exception as e:
         logger.error(f"Error unsubscribing user {user_email}: {e}")
         return False
@@ -0,0 +1,127 @@
+"""
+Tellere per bruker for Smart Påminner Pro
+Åpne, fullførte og delte påminnelser, oppdatert av skrivestiene
+"""
+
+import os
+import threading
+import logging
+from contextlib import contextmanager
+
+from reminder_manager import ReminderManager
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('open', 'completed', 'shared_open')
+
+
+class ReminderCounters:
+    """Per-user reminder counts kept in memory and adjusted on every write
+
+    Write paths save and call adjust(email, open=..., completed=...,
+    shared_open=...) inside `with counters.writing():`, so the count endpoints are dictionary lookups. The counts
+    are rebuilt from reminders and shared_reminders on first use and
+    whenever either file changed without an adjust() (another process,
+    tests swapping data_dir). verify() recounts from storage and logs any
+    drift; it runs on a schedule.
+    """
+
+    def __init__(self, data_manager):
+        self.dm = data_manager
+        self._lock = threading.RLock()
+        self._counts = None
+        self._key = None
+
+    def _source_key(self):
+        data_dir = getattr(self.dm, 'data_dir', None)
+        if data_dir is None:
+            return None
+        key = [id(self.dm), str(data_dir)]
+        for collection in ('reminders', 'shared_reminders'):
+            try:
+                key.append(os.stat(os.path.join(str(data_dir), f"{collection}.json")).st_mtime_ns)
+            except OSError:
+                key.append(None)
+        return tuple(key)
+
+    def _count_all(self):
+        """{email: counts} from storage, O(reminders + shares)"""
+        counts = {}
+        reminders = self.dm.load_data('reminders', [])
+        by_id = {}
+        for reminder in reminders if isinstance(reminders, list) else []:
+            if not isinstance(reminder, dict):
+                continue
+            by_id[reminder.get('id')] = reminder
+            email = reminder.get('user_id')
+            if email:
+                entry = counts.setdefault(email, dict.fromkeys(COUNTER_FIELDS, 0))
+                entry['completed' if reminder.get('completed', False) else 'open'] += 1
+
+        links = self.dm.load_data('shared_reminders', [])
+        for link in links if isinstance(links, list) else []:
+            if not isinstance(link, dict) or link.get('completed', False) or not link.get('shared_with'):
+                continue
+            # Same rule as ReminderManager.shared_with(): only shares that still resolve
+            if ReminderManager.join(link, by_id.get(link.get('original_id'))) is not None:
+                counts.setdefault(link['shared_with'], dict.fromkeys(COUNTER_FIELDS, 0))['shared_open'] += 1
+        return counts
+
+    def rebuild(self):
+        with self._lock:
+            self._counts = self._count_all()
+            self._key = self._source_key()
+            return self._counts
+
+    def _current(self):
+        key = self._source_key()
+        if self._counts is None or key is None or key != self._key:
+            return self.rebuild()
+        return self._counts
+
+    def get(self, email):
+        """{'open', 'completed', 'shared_open'} for a user"""
+        with self._lock:
+            return dict(self._current().get(email) or dict.fromkeys(COUNTER_FIELDS, 0))
+
+    @contextmanager
+    def writing(self):
+        """Hold the counts across a save and its adjust() calls
+
+        Without it a get() between the save and adjust() rebuilds from the
+        saved file, and adjust() then counts the write a second time.
+        Counts that were already stale when the write started are dropped
+        and rebuilt on the next read rather than adjusted.
+        """
+        with self._lock:
+            if self._counts is not None and self._source_key() != self._key:
+                self._counts = None
+            yield self
+
+    def adjust(self, email, **deltas):
+        """Apply a write's effect on a user's counts (after the save, inside writing())"""
+        if not email:
+            return
+        with self._lock:
+            if self._counts is None:
+                return  # Built from storage on first read
+            entry = self._counts.setdefault(email, dict.fromkeys(COUNTER_FIELDS, 0))
+            for field, delta in deltas.items():
+                entry[field] = max(0, entry.get(field, 0) + delta)
+            self._key = self._source_key()
+
+    def verify(self):
+        """Recount from storage; returns the users whose counts had drifted"""
+        with self._lock:
+            expected = self._count_all()
+            drifted = []
+            if self._counts is not None:
+                empty = dict.fromkeys(COUNTER_FIELDS, 0)
+                for email in set(expected) | set(self._counts):
+                    if expected.get(email, empty) != self._counts.get(email, empty):
+                        drifted.append(email)
+            if drifted:
+                logger.warning(f"Påminnelsestellere avvek for {len(drifted)} brukere, bygget på nytt")
+            self._counts = expected
+            self._key = self._source_key()
+            return drifted
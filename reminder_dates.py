@@ -0,0 +1,77 @@
+"""
+Tidspunkt for påminnelser i Smart Påminner Pro
+Kanonisk ISO-verdi lagret ved skriving, så lesere slipper å tolke visningsteksten
+"""
+
+import logging
+from datetime import datetime
+
+from ical import parse_reminder_datetime
+
+logger = logging.getLogger(__name__)
+
+# Canonical due time stored next to the display string 'datetime'
+CANONICAL_FIELD = 'datetime_iso'
+
+
+def canonical_datetime(value):
+    """'YYYY-MM-DDTHH:MM:SS' (local wall-clock time) for a stored value; None if invalid
+
+    Fixed width, so canonical values sort and compare as plain strings.
+    """
+    parsed = parse_reminder_datetime(value)
+    if parsed is None:
+        return None
+    return parsed.replace(tzinfo=None, microsecond=0).isoformat()
+
+
+def is_canonical(value):
+    return isinstance(value, str) and len(value) == 19 and value[10] == 'T'
+
+
+def normalize_reminder(reminder):
+    """Set the canonical field from reminder['datetime']; call on every write"""
+    iso = canonical_datetime(reminder.get('datetime'))
+    if iso is None:
+        reminder.pop(CANONICAL_FIELD, None)
+    else:
+        reminder[CANONICAL_FIELD] = iso
+    return reminder
+
+
+def due_iso(reminder):
+    """Canonical due time of a reminder, parsing only records written before the migration"""
+    value = reminder.get(CANONICAL_FIELD)
+    if is_canonical(value):
+        return value
+    return canonical_datetime(reminder.get('datetime'))
+
+
+def reminder_datetime(reminder):
+    """Due time as a naive datetime, or None"""
+    iso = due_iso(reminder)
+    return datetime.fromisoformat(iso) if iso else None
+
+
+def migrate_reminder_datetimes(data_manager):
+    """Store the canonical field on every reminder; returns the number updated
+
+    Safe to run on every start: the file is only written when a value was
+    missing or no longer matched its display string.
+    """
+    reminders = data_manager.load_data('reminders', [])
+    if not isinstance(reminders, list):
+        return 0
+
+    updated = 0
+    for reminder in reminders:
+        if not isinstance(reminder, dict):
+            continue
+        before = reminder.get(CANONICAL_FIELD)
+        if normalize_reminder(reminder).get(CANONICAL_FIELD) != before:
+            updated += 1
+
+    if updated:
+        data_manager.save_data('reminders', reminders)
+        logger.info(f"Kanonisk tidspunkt lagret på {updated} påminnelser")
+    return updated
@@ -0,0 +1,273 @@
+"""
+Påminnelser og deling for Smart Påminner Pro
+Datalag for delte påminnelser med indeks for duplikatsjekk
+"""
+
+import os
+import uuid
+import threading
+import logging
+from contextlib import nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Fields read from the source reminder when a share link is joined
+SOURCE_FIELDS = ('user_id', 'title', 'description', 'datetime', 'datetime_iso', 'priority', 'category', 'sound')
+
+# Link fields that differ per recipient; left out of the view passed to notify()
+RECIPIENT_LINK_FIELDS = ('id', 'shared_with', 'completed', 'completed_at')
+
+
+class ReminderManager:
+    """Data layer for sharing reminders
+
+    shared_reminders holds share links, not copies: original_id,
+    shared_by, shared_with and the recipient's own completed state. Reads
+    join each link to its source reminder through an id index, so an edit
+    or reschedule of the source is one write and shows up for everyone.
+    Older records that still carry copied fields are read the same way;
+    the source wins where it exists.
+
+    Keeps an (original_id, shared_with) index over shared_reminders so
+    "already shared?" is a set lookup, and writes every new share of one
+    reminder in a single save. Both indexes are rebuilt only when their
+    file changed behind our back (another process, or tests swapping
+    data_dir).
+    """
+
+    def __init__(self, data_manager, versions=None, counters=None):
+        self.dm = data_manager
+        self.versions = versions
+        self.counters = counters
+        self._lock = threading.RLock()
+        self._share_index = None
+        self._index_key = None
+        self._reminder_index = None
+        self._reminder_index_key = None
+
+    def _counting(self):
+        """counters.writing() around a save and its adjust() calls"""
+        return self.counters.writing() if self.counters is not None else nullcontext()
+
+    def _source_key(self, collection):
+        data_dir = getattr(self.dm, 'data_dir', None)
+        if data_dir is None:
+            return None
+        try:
+            mtime = os.stat(os.path.join(str(data_dir), f"{collection}.json")).st_mtime_ns
+        except OSError:
+            mtime = None
+        return (id(self.dm), str(data_dir), mtime)
+
+    def _index_for(self, shared_reminders):
+        """(original_id, shared_with) set, rebuilt from shared_reminders if stale"""
+        key = self._source_key('shared_reminders')
+        if self._share_index is None or key is None or key != self._index_key:
+            self._share_index = {
+                (shared.get('original_id'), shared.get('shared_with'))
+                for shared in shared_reminders if isinstance(shared, dict)
+            }
+            self._index_key = key
+        return self._share_index
+
+    def _reminders_by_id(self):
+        """{id: reminder} over reminders, rebuilt if the file changed"""
+        key = self._source_key('reminders')
+        if self._reminder_index is None or key is None or key != self._reminder_index_key:
+            reminders = self.dm.load_data('reminders', [])
+            self._reminder_index = {
+                reminder.get('id'): reminder
+                for reminder in (reminders if isinstance(reminders, list) else [])
+                if isinstance(reminder, dict)
+            }
+            self._reminder_index_key = key
+        return self._reminder_index
+
+    @staticmethod
+    def join(link, source):
+        """Reminder view for a share link; None if neither carries the reminder"""
+        if source is None:
+            # Legacy copied record whose source is gone still has its own fields
+            return dict(link) if link.get('title') and link.get('datetime') else None
+        view = dict(link)
+        for field in SOURCE_FIELDS:
+            if field in source:
+                view[field] = source[field]
+        view['completed'] = link.get('completed', False)
+        return view
+
+    def shared_with(self, email, include_completed=False):
+        """Joined reminders shared with a user"""
+        with self._lock:
+            links = self.dm.load_data('shared_reminders', [])
+            by_id = self._reminders_by_id()
+        result = []
+        for link in links if isinstance(links, list) else []:
+            if not isinstance(link, dict) or link.get('shared_with') != email:
+                continue
+            if not include_completed and link.get('completed', False):
+                continue
+            view = self.join(link, by_id.get(link.get('original_id')))
+            if view is not None:
+                result.append(view)
+        return result
+
+    def all_shared(self):
+        """(view, recipient) for every share link that still resolves"""
+        with self._lock:
+            links = self.dm.load_data('shared_reminders', [])
+            by_id = self._reminders_by_id()
+        for link in links if isinstance(links, list) else []:
+            if not isinstance(link, dict):
+                continue
+            view = self.join(link, by_id.get(link.get('original_id')))
+            if view is not None:
+                yield view, link.get('shared_with', '')
+
+    def recipients(self, original_id):
+        """Emails a reminder is shared with"""
+        with self._lock:
+            links = self.dm.load_data('shared_reminders', [])
+        return [
+            link.get('shared_with') for link in (links if isinstance(links, list) else [])
+            if isinstance(link, dict) and link.get('original_id') == original_id
+        ]
+
+    def complete(self, link_id, email):
+        """Mark a share as completed for its recipient; False if not found"""
+        with self._lock, self._counting():
+            links = self.dm.load_data('shared_reminders', [])
+            for link in links if isinstance(links, list) else []:
+                if isinstance(link, dict) and link.get('id') == link_id and link.get('shared_with') == email:
+                    if link.get('completed', False):
+                        return True  # Already completed, nothing to write
+                    link['completed'] = True
+                    link['completed_at'] = datetime.now().isoformat()
+                    self.dm.save_data('shared_reminders', links)
+                    self._index_key = self._source_key('shared_reminders')
+                    break
+            else:
+                return False
+            if self.counters is not None:
+                self.counters.adjust(email, shared_open=-1)
+        if self.versions is not None:
+            self.versions.bump(email)
+        return True
+
+    def unshare_all(self, original_id):
+        """Remove every share link of a deleted reminder; returns the recipients"""
+        with self._lock, self._counting():
+            links = self.dm.load_data('shared_reminders', [])
+            if not isinstance(links, list):
+                return []
+            kept = [link for link in links if not (isinstance(link, dict) and link.get('original_id') == original_id)]
+            if len(kept) == len(links):
+                return []
+            removed_links = [link for link in links if isinstance(link, dict) and link.get('original_id') == original_id]
+            removed = [link.get('shared_with') for link in removed_links]
+            self.dm.save_data('shared_reminders', kept)
+            self._share_index = None
+            if self.counters is not None:
+                for link in removed_links:
+                    if not link.get('completed', False):
+                        self.counters.adjust(link.get('shared_with'), shared_open=-1)
+        if self.versions is not None:
+            self.versions.bump(*removed)
+        return removed
+
+    def migrate_to_links(self):
+        """Strip copied reminder fields from records whose source still exists
+
+        Returns the number of records rewritten. Records whose source is
+        gone keep their copy so nobody loses a reminder.
+        """
+        with self._lock:
+            links = self.dm.load_data('shared_reminders', [])
+            by_id = self._reminders_by_id()
+            migrated = 0
+            for link in links if isinstance(links, list) else []:
+                if not isinstance(link, dict) or link.get('original_id') not in by_id:
+                    continue
+                copied = [field for field in SOURCE_FIELDS if field in link]
+                for field in copied:
+                    del link[field]
+                migrated += bool(copied)
+            if migrated:
+                self.dm.save_data('shared_reminders', links)
+                self._index_key = self._source_key('shared_reminders')
+                logger.info(f"Migrerte {migrated} delte påminnelser til delingslenker")
+        return migrated
+
+    def is_shared_with(self, original_id, email):
+        with self._lock:
+            shared_reminders = None
+            if self._share_index is None or self._source_key('shared_reminders') != self._index_key:
+                shared_reminders = self.dm.load_data('shared_reminders', [])
+            return (original_id, email) in self._index_for(shared_reminders or [])
+
+    def share(self, reminder, recipients, shared_by, personal_message='', notify=None):
+        """Share a reminder with many recipients in one write
+
+        Returns (created, already_shared): the new share links and the
+        recipients that already had this reminder. notify(view, recipient)
+        is called for each new share after the write, e.g. to queue the
+        notification email. The view is the reminder joined with the
+        share's common fields (shared_by, personal_message) and is the same
+        for every recipient, so the email render cache serves them all.
+        """
+        recipients = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+        created, already_shared = [], []
+        now = datetime.now().isoformat()
+
+        with self._lock, self._counting():
+            shared_reminders = self.dm.load_data('shared_reminders', [])
+            if not isinstance(shared_reminders, list):
+                shared_reminders = []
+            index = self._index_for(shared_reminders)
+
+            for recipient in recipients:
+                if (reminder['id'], recipient) in index:
+                    already_shared.append(recipient)
+                    continue
+                shared_reminder = {
+                    'id': str(uuid.uuid4()),
+                    'original_id': reminder['id'],
+                    'shared_by': shared_by,
+                    'shared_with': recipient,
+                    'completed': False,
+                    'created': now,
+                    'shared_date': now,
+                    'personal_message': personal_message,
+                    'is_shared': True
+                }
+                created.append(shared_reminder)
+                index.add((reminder['id'], recipient))
+
+            if created:
+                shared_reminders.extend(created)
+                try:
+                    self.dm.save_data('shared_reminders', shared_reminders)
+                except Exception:
+                    self._share_index = None  # Index no longer matches storage
+                    raise
+                self._index_key = self._source_key('shared_reminders')
+                if self.counters is not None:
+                    for shared_reminder in created:
+                        self.counters.adjust(shared_reminder['shared_with'], shared_open=1)
+
+        if created and self.versions is not None:
+            self.versions.bump(*(shared['shared_with'] for shared in created))
+
+        if notify and created:
+            common = {k: v for k, v in created[0].items() if k not in RECIPIENT_LINK_FIELDS}
+            view = self.join(common, reminder)
+            for shared_reminder in created:
+                try:
+                    notify(view, shared_reminder['shared_with'])
+                except Exception as e:
+                    logger.error(f"Feil ved varsling om delt påminnelse til {shared_reminder['shared_with']}: {e}")
+
+        if created:
+            logger.info(f"Påminnelse {reminder['id']} delt med {len(created)} mottakere")
+        return created, already_shared
@@ -5,6 +5,8 @@ Delte tavler hvor brukere kan samarbeide
 
 import uuid
 import json
+import atexit
+import threading
 from datetime import datetime
 from pathlib import Path
 
@@ -95,9 +97,13 @@ class SharedNoteboard:
 class NoteboardManager:
     """Håndterer alle delte tavler"""
     
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, email_service=None, notify_window=0, events=None):
         self.dm = data_manager
+        self.email_service = email_service
+        self.events = events
         self.boards_file = 'shared_noteboards'
+        self._coalescer = BoardUpdateCoalescer(notify_window, self._deliver_board_updates)
+        atexit.register(self._coalescer.flush)
         self._ensure_data_file()
     
     def _ensure_data_file(self):
@@ -225,63 +231,189 @@ class NoteboardManager:
         return None
     
     def notify_board_update(self, board_id, update_type, updated_by, note_content=None):
+        """Queue a board update; members get one summary per notify window"""
+        if self.events is not None:
+            # Open boards reload right away; only email/push are coalesced
+            try:
+                board = self.get_board_by_id(board_id)
+                if board:
+                    self.events.publish_many(
+                        [member for member in board.members if member != updated_by],
+                        'board',
+                        {'board_id': board_id, 'update_type': update_type, 'updated_by': updated_by}
+                    )
+            except Exception as e:
+                print(f"Error publishing board update event: {e}")
+        try:
+            self._coalescer.add(board_id, {
+                'update_type': update_type,
+                'updated_by': updated_by,
+                'note_content': note_content,
+                'time': datetime.now()
+            })
+            return True
+        except Exception as e:
+            print(f"Error queueing board update notification: {e}")
+            return False
+    
+    def flush_board_updates(self):
+        """Send all queued board updates now"""
+        self._coalescer.flush()
+    
+    def _deliver_board_updates(self, board_id, events):
         """Send email and push notifications to board members about updates"""
         try:
-            from email_service import send_email
             board = self.get_board_by_id(board_id)
             if not board:
                 return False
             
-            # Get all members except the one who made the update
-            recipients = [member for member in board.members if member != updated_by]
+            # Each member gets a summary of the updates made by others
+            groups = {}
+            for member in board.members:
+                member_events = [e for e in events if e['updated_by'] != member]
+                if member_events:
+                    summary = summarize_board_updates(member_events)
+                    groups.setdefault(summary, (member_events, []))[1].append(member)
             
-            if not recipients:
+            if not groups:
                 return True  # No one to notify
             
-            # Prepare email content
-            subject = f"Oppdatering på tavlen '{board.title}'"
-            
-            # Send push notifications first (faster)
-            try:
-                from push_service import send_push_notification
-                for recipient in recipients:
-                    send_push_notification(
-                        user_email=recipient,
+            for summary, (group_events, recipients) in groups.items():
+                latest = group_events[-1]
+                note_content = latest['note_content'] if len(group_events) == 1 else None
+                authors = list(dict.fromkeys(e['updated_by'] for e in group_events))
+                
+                # Send push notifications first (faster)
+                try:
+                    from push_service import send_push_batch, make_topic, BOARD_UPDATE_TTL
+                    send_push_batch(
+                        recipients,
                         title=f"📋 {board.title}",
-                        body=f"{update_type} av {updated_by.split('@')[0]}",
+                        body=summary,
                         data={
                             'board_id': board_id,
                             'board_title': board.title,
-                            'update_type': update_type
+                            'update_type': latest['update_type'],
+                            'update_count': len(group_events),
+                            'url': f"/board/{board_id}"
                         },
-                        dm=self.dm
+                        dm=self.dm,
+                        ttl=BOARD_UPDATE_TTL,
+                        urgency='low',
+                        topic=make_topic('board', board_id)
                     )
-            except Exception as e:
-                print(f"Failed to send push notifications: {e}")
-            
-            # Send email notifications
-            for recipient in recipients:
-                try:
-                    email_data = {
-                        'recipient': recipient,
-                        'subject': subject,
-                        'template': 'emails/noteboard_update.html',
-                        'context': {
-                            'board': board,
-                            'update_type': update_type,
-                            'updated_by': updated_by,
-                            'note_content': note_content,
-                            'update_time': datetime.now(),
-                            'app_url': 'https://smartremind-production.up.railway.app',
-                            'board_url': f'https://smartremind-production.up.railway.app/board/{board.board_id}'
-                        }
-                    }
-                    send_email(email_data)
                 except Exception as e:
-                    print(f"Failed to send notification to {recipient}: {e}")
-                    continue
+                    print(f"Failed to send push notifications: {e}")
+                
+                # Send email notifications
+                if self.email_service:
+                    try:
+                        self.email_service.send_noteboard_update(
+                            board,
+                            latest['update_type'],
+                            latest['updated_by'],
+                            recipients,
+                            note=note_content,
+                            update_time=latest['time'],
+                            summary=summarize_board_updates(group_events, with_authors=False),
+                            update_count=len(group_events),
+                            authors=authors
+                        )
+                    except Exception as e:
+                        print(f"Failed to send board update emails: {e}")
             
             return True
         except Exception as e:
             print(f"Error sending board update notifications: {e}")
             return False
+
+
+# Norwegian singular/plural labels for summarized board updates
+UPDATE_SUMMARY_LABELS = {
+    'Nytt notat lagt til': ('notat lagt til', 'notater lagt til'),
+    'Notat oppdatert': ('notat oppdatert', 'notater oppdatert'),
+    'Notat slettet': ('notat slettet', 'notater slettet'),
+}
+
+def summarize_board_updates(events, with_authors=True):
+    """Summarize updates, e.g. "3 notater lagt til av kari, 1 notat slettet av ola"
+
+    with_authors=False counts per update type only ("3 notater lagt til,
+    1 notat slettet"), for places that list the authors separately.
+    """
+    if len(events) == 1:
+        event = events[0]
+        if not with_authors:
+            return event['update_type']
+        return f"{event['update_type']} av {event['updated_by'].split('@')[0]}"
+    
+    counts = {}
+    for event in events:
+        author = event['updated_by'].split('@')[0] if with_authors else None
+        key = (event['update_type'], author)
+        counts[key] = counts.get(key, 0) + 1
+    
+    parts = []
+    for (update_type, author), count in counts.items():
+        labels = UPDATE_SUMMARY_LABELS.get(update_type)
+        if labels:
+            label = labels[0] if count == 1 else labels[1]
+            part = f"{count} {label}"
+        else:
+            part = f"{count}× {update_type}"
+        parts.append(f"{part} av {author}" if author else part)
+    return ', '.join(parts)
+
+
+class BoardUpdateCoalescer:
+    """Samler tavle-oppdateringer per tavle innenfor et tidsvindu
+
+    The first update for a board starts a timer; everything queued for that
+    board until it fires is delivered together. A window of 0 delivers
+    immediately.
+    """
+    
+    def __init__(self, window, deliver):
+        self.window = window
+        self.deliver = deliver
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timers = {}
+    
+    def add(self, board_id, event):
+        """Queue an update event for a board"""
+        if self.window <= 0:
+            self.deliver(board_id, [event])
+            return
+        
+        with self._lock:
+            self._pending.setdefault(board_id, []).append(event)
+            if board_id not in self._timers:
+                timer = threading.Timer(self.window, self.flush, args=(board_id,))
+                timer.daemon = True
+                self._timers[board_id] = timer
+                timer.start()
+    
+    def flush(self, board_id=None):
+        """Deliver queued events for one board, or all boards"""
+        with self._lock:
+            board_ids = [board_id] if board_id is not None else list(self._pending)
+            batches = []
+            for bid in board_ids:
+                timer = self._timers.pop(bid, None)
+                if timer is not None and timer is not threading.current_thread():
+                    timer.cancel()
+                events = self._pending.pop(bid, None)
+                if events:
+                    batches.append((bid, events))
+        
+        for bid, events in batches:
+            try:
+                self.deliver(bid, events)
+            except Exception as e:
+                print(f"Error delivering board updates for {bid}: {e}")
+    
+    def pending_count(self, board_id):
+        """Number of queued events for a board"""
+        with self._lock:
+            return len(self._pending.get(board_id, []))
@@ -0,0 +1,118 @@
+"""
+Lydfiler for Smart Påminner Pro
+Tabell over lydfiler med MIME-type, størrelse og innholds-hash, bygget ved oppstart
+"""
+
+import os
+import hashlib
+import threading
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+SOUND_EXTENSIONS = ('.mp3', '.wav')
+
+SoundFile = namedtuple('SoundFile', ['path', 'mimetype', 'size', 'etag', 'mtime_ns'])
+
+
+def detect_mimetype(header, filename):
+    """MIME type from the first bytes; several .mp3 files here are really WAV"""
+    if header[:4] == b'RIFF':
+        return 'audio/wav'
+    if header[:3] == b'ID3' or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'audio/mpeg'
+    if header[:4] == b'OggS':
+        return 'audio/ogg'
+    return 'audio/wav' if filename.endswith('.wav') else 'audio/mpeg'
+
+
+def read_sound_file(path, filename):
+    """SoundFile for one file: reads it once for the header and the hash"""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        header = f.read(16)
+        digest.update(header)
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return SoundFile(
+        path=path,
+        mimetype=detect_mimetype(header, filename),
+        size=stat.st_size,
+        etag=digest.hexdigest()[:20],
+        mtime_ns=stat.st_mtime_ns
+    )
+
+
+class SoundLibrary:
+    """Metadata for the files in static/sounds
+
+    The table is built once at startup. get() only stats the directory and
+    the requested file: a changed directory (files added or removed) or a
+    changed file (mtime or size) is re-read, everything else is answered
+    from memory. The route uses the stored MIME type and hash as a strong
+    ETag, so a request reads nothing but the payload.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._files = {}
+        self._dir_mtime = None
+        self.refresh()
+
+    def _dir_stat(self):
+        try:
+            return os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Rebuild the table from the folder; returns the number of sound files"""
+        files = {}
+        dir_mtime = self._dir_stat()
+        if dir_mtime is not None:
+            for filename in sorted(os.listdir(self.folder)):
+                if not filename.endswith(SOUND_EXTENSIONS):
+                    continue
+                path = os.path.join(self.folder, filename)
+                try:
+                    files[filename] = read_sound_file(path, filename)
+                except OSError as e:
+                    logger.error(f"Kunne ikke lese lydfil {filename}: {e}")
+        with self._lock:
+            self._files = files
+            self._dir_mtime = dir_mtime
+        logger.info(f"Lydtabell bygget med {len(files)} filer")
+        return len(files)
+
+    def get(self, filename):
+        """SoundFile for a file in the folder, or None"""
+        if self._dir_stat() != self._dir_mtime:
+            self.refresh()
+        with self._lock:
+            entry = self._files.get(filename)
+        if entry is None:
+            return None
+
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            self.refresh()
+            return None
+        if stat.st_mtime_ns != entry.mtime_ns or stat.st_size != entry.size:
+            try:
+                entry = read_sound_file(entry.path, filename)
+            except OSError:
+                return None
+            with self._lock:
+                self._files[filename] = entry
+        return entry
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': sum(entry.size for entry in self._files.values())
+            }
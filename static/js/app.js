@@ -401,7 +401,46 @@ function checkPendingSounds() {
     console.log('🔍 Checking for pending notification sounds...');
 }
 
+// Live updates over Server-Sent Events (one shared connection per page)
+let liveEventSource = null;
+const liveEventHandlers = {};
+
+// Register a handler for a live event ('counts', 'notification', 'board', 'resync').
+// Returns false if the browser has no EventSource, so the caller can keep polling.
+function onLiveEvent(type, handler) {
+    if (!window.EventSource) {
+        return false;
+    }
+    if (!liveEventHandlers[type]) {
+        liveEventHandlers[type] = [];
+        if (liveEventSource) {
+            liveEventSource.addEventListener(type, dispatchLiveEvent);
+        }
+    }
+    liveEventHandlers[type].push(handler);
+    
+    if (!liveEventSource) {
+        // EventSource reconnects by itself and sends Last-Event-ID
+        liveEventSource = new EventSource('/api/events');
+        Object.keys(liveEventHandlers).forEach(name => {
+            liveEventSource.addEventListener(name, dispatchLiveEvent);
+        });
+    }
+    return true;
+}
+
+function dispatchLiveEvent(event) {
+    let data = {};
+    try {
+        data = JSON.parse(event.data || '{}');
+    } catch (error) {
+        console.error('❌ Invalid live event data:', error);
+    }
+    (liveEventHandlers[event.type] || []).forEach(handler => handler(data));
+}
+
 // Global functions for window
+window.onLiveEvent = onLiveEvent;
 window.requestPushPermission = requestPushPermission;
 window.testNotificationSound = testNotificationSound;
 window.playNotificationSound = playNotificationSound;
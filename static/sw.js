@@ -42,6 +42,11 @@ self.addEventListener('activate', event => {
 self.addEventListener('push', event => {
     const data = event.data.json();
     
+    // Liveness probes from the subscription sweeper are not shown
+    if (data.type === 'probe') {
+        return;
+    }
+    
     // Set up notification options
     const options = {
         body: data.body,
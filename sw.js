@@ -1,24 +1,9 @@
 // Service Worker for SmartReminder
-const CACHE_NAME = 'smartreminder-v2';
+// Files to cache: /sw.js replaces this line with the list from the asset manifest (asset_manifest.py)
+const PRECACHE = {"version": "dev", "files": ["/", "/dashboard", "/offline", "/static/css/style.css", "/static/js/app.js", "/static/js/pwa.js", "/static/js/notification_client.js"]};
+const CACHE_NAME = `smartreminder-${PRECACHE.version}`;
 const OFFLINE_URL = '/offline';
-
-// Files to cache
-const CACHE_FILES = [
-    '/',
-    '/dashboard',
-    '/static/css/style.css',
-    '/static/js/app.js',
-    '/static/js/pwa.js',
-    '/static/js/notification_client.js',
-    '/static/sounds/alert.mp3',
-    '/static/sounds/pristine.mp3',
-    '/static/sounds/ding.mp3',
-    '/static/sounds/chime.mp3',
-    '/static/images/icon-192x192.png',
-    '/static/images/icon-512x512.png',
-    '/static/manifest.json',
-    '/offline'
-];
+const CACHE_FILES = PRECACHE.files;
 
 // Install Service Worker
 self.addEventListener('install', event => {
@@ -69,6 +54,11 @@ self.addEventListener('activate', event => {
 self.addEventListener('push', event => {
     const data = event.data.json();
     
+    // Liveness probes from the subscription sweeper are not shown
+    if (data.type === 'probe') {
+        return;
+    }
+    
     // Set up notification options
     const options = {
         body: data.body,
@@ -0,0 +1,129 @@
+"""
+Shared test helpers for Smart Påminner Pro
+Used by the unit tests and the benchmarks in benchmarks/
+"""
+
+import json
+import socketserver
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+from flask_mail import Mail
+
+
+class JsonDataManager:
+    """Minimal JSON-file data manager (same interface as app.DataManager)"""
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self._lock = threading.Lock()
+
+    def load_data(self, filename, default=None):
+        try:
+            with open(self.data_dir / f"{filename}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default if default is not None else {}
+
+    def save_data(self, filename, data):
+        with self._lock:
+            with open(self.data_dir / f"{filename}.json", 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+
+
+class SMTPSink:
+    """Local SMTP server that accepts and counts messages"""
+
+    def __init__(self, connect_latency_ms=0.0, message_latency_ms=0.0):
+        self.connect_latency_ms = connect_latency_ms
+        self.message_latency_ms = message_latency_ms
+        self.sessions = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def _handler(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode('ascii') + b'\r\n')
+                self.wfile.flush()
+
+            def handle(self):
+                with sink._lock:
+                    sink.sessions += 1
+                # Stand-in for TCP + STARTTLS + AUTH round trips
+                time.sleep(sink.connect_latency_ms / 1000.0)
+                self.reply('220 localhost SMTP sink')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode('utf-8', 'replace').strip().upper()
+                    if command.startswith('EHLO'):
+                        self.reply('250-localhost')
+                        self.reply('250 8BITMIME')
+                    elif command.startswith('HELO'):
+                        self.reply('250 localhost')
+                    elif command.startswith('DATA'):
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        while self.rfile.readline() not in (b'.\r\n', b''):
+                            pass
+                        time.sleep(sink.message_latency_ms / 1000.0)
+                        with sink._lock:
+                            sink.messages += 1
+                        self.reply('250 OK')
+                    elif command.startswith('QUIT'):
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        # MAIL, RCPT, RSET, NOOP
+                        self.reply('250 OK')
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class NullDataManager:
+    """Data manager that keeps the email log in memory"""
+
+    def __init__(self):
+        self.data_dir = Path(tempfile.gettempdir())
+        self.data = {}
+
+    def load_data(self, filename, default=None):
+        return self.data.get(filename, default if default is not None else [])
+
+    def save_data(self, filename, data):
+        self.data[filename] = data
+
+
+def make_app(port):
+    app = Flask(__name__, template_folder=str(Path(__file__).parent.parent / 'templates'))
+    app.config.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=port,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_DEFAULT_SENDER='bench@example.com',
+        MAIL_SUPPRESS_SEND=False,
+        TESTING=False
+    )
+    return app, Mail(app)
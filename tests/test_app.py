@@ -106,5 +106,43 @@ class SmartReminderTestCase(unittest.TestCase):
         response = self.app.get('/nonexistent-page')
         self.assertEqual(response.status_code, 404)
 
+
+class AdminMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        dm.data_dir = Path(self.test_dir)
+        dm._ensure_data_files()
+        dm.save_data('users', {'admin': {'email': 'helene721@gmail.com', 'username': 'helene'}})
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+            sess['_fresh'] = True
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_email_render_statistics_are_shown(self):
+        """Test email render times reach /api/metrics and the email settings page"""
+        from app import email_service
+        email_service._record_render('emails/metrics_probe.html', 0.004)
+        metrics = self.client.get('/api/metrics').get_json()
+        self.assertEqual(metrics['email_render']['emails/metrics_probe.html']['renders'], 1)
+
+        page = self.client.get('/email-settings').get_data(as_text=True)
+        self.assertIn('Rendringstid per mal', page)
+        self.assertIn('emails/metrics_probe.html', page)
+
+    def test_email_rate_limit_statistics_are_shown(self):
+        """Test rate-limit waits and the outbox backlog reach /api/metrics and the email settings page"""
+        metrics = self.client.get('/api/metrics').get_json()
+        for field in ('backlog', 'waited', 'avg_wait', 'max_wait', 'throttled_domains'):
+            self.assertIn(field, metrics['email_rate_limit'])
+
+        page = self.client.get('/email-settings').get_data(as_text=True)
+        self.assertIn('Sendetakt', page)
+        self.assertIn('Venter i utboks', page)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
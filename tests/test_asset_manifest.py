@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from flask import Flask, render_template_string
+
+from asset_manifest import AssetManifest, build_manifest
+
+
+class AssetManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.static_dir, 'js'))
+        self.write('js/app.js', 'console.log("v1");')
+        self.write('js/app_backup.js', 'console.log("gammel");')
+
+        self.app = Flask(__name__, static_folder=self.static_dir, static_url_path='/static')
+        self.assets = AssetManifest(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        with open(os.path.join(self.static_dir, name), 'w') as f:
+            f.write(content)
+
+    def render(self, source):
+        with self.app.test_request_context():
+            return render_template_string(source)
+
+    def test_plain_urls_without_build(self):
+        """Test static_url() falls back to the plain file before a build"""
+        self.assertEqual(self.render("{{ static_url('js/app.js') }}"), '/static/js/app.js')
+        response = self.client.get('/static/js/app.js')
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+    def test_hashed_urls_are_immutable(self):
+        """Test built assets resolve to hashed copies served with immutable caching"""
+        manifest = build_manifest(self.static_dir)
+        self.assertNotIn('js/app_backup.js', manifest['assets'])
+
+        url = self.render("{{ static_url('js/app.js') }}")
+        self.assertRegex(url, r'^/static/dist/js/app\.[0-9a-f]{10}\.js$')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        response.close()
+
+        self.write('js/app.js', 'console.log("v2");')
+        second = build_manifest(self.static_dir)
+        self.assertNotEqual(second['version'], manifest['version'])
+        self.assertNotEqual(self.render("{{ static_url('js/app.js') }}"), url)
+        self.assertFalse(os.path.exists(os.path.join(self.static_dir, manifest['assets']['js/app.js'])))
+
+    def test_service_worker_precache_from_manifest(self):
+        """Test the sw.js PRECACHE line is replaced with the hashed list"""
+        manifest = build_manifest(self.static_dir)
+        source = 'const PRECACHE = {"version": "dev", "files": []};\nconst CACHE_FILES = PRECACHE.files;\n'
+        with self.app.test_request_context():
+            rendered = self.assets.render_service_worker(source)
+        self.assertIn(f'"version": "{manifest["version"]}"', rendered)
+        self.assertIn(f'/static/{manifest["assets"]["js/app.js"]}', rendered)
+        self.assertIn('"/offline"', rendered)
+        self.assertTrue(rendered.endswith('const CACHE_FILES = PRECACHE.files;\n'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+# Mock APScheduler before importing app
+import unittest.mock as mock
+sys.modules['apscheduler'] = mock.MagicMock()
+sys.modules['apscheduler.schedulers'] = mock.MagicMock()
+sys.modules['apscheduler.schedulers.background'] = mock.MagicMock()
+
+# Set testing environment
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import app, dm, data_versions, calendar_feed_service
+from calendar_feed import CalendarFeed
+
+
+class CalendarFeedTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        dm.data_dir = Path(self.test_dir)
+        dm._ensure_data_files()
+        dm.save_data('users', {'u1': {'email': 'kari@example.com', 'username': 'kari'}})
+        dm.save_data('reminders', [
+            {'id': f"r{i}", 'user_id': 'kari@example.com', 'title': f"Påminnelse {i}",
+             'datetime': f"2026-11-{i % 28 + 1:02d} 09:00", 'priority': 'Medium', 'category': 'Annet'}
+            for i in range(250)
+        ] + [{'id': 'other', 'user_id': 'ola@example.com', 'title': 'Ikke min', 'datetime': '2026-11-01 09:00'}])
+        dm.save_data('shared_reminders', [
+            {'id': 's1', 'original_id': 'x', 'shared_by': 'ola@example.com', 'shared_with': 'kari@example.com',
+             'title': 'Felles', 'datetime': '2026-11-02 10:00', 'priority': 'Høy'}
+        ])
+        self.token = calendar_feed_service.token_for('kari@example.com')
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_feed_contains_own_and_shared_reminders(self):
+        """Test the feed streams the user's reminders and shares only"""
+        response = self.client.get(f"/calendar/{self.token}.ics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/calendar')
+        self.assertTrue(response.is_streamed)
+        body = response.get_data(as_text=True)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 251)
+        self.assertIn('SUMMARY:[Delt] Felles', body)
+        self.assertNotIn('Ikke min', body)
+        self.assertIsNotNone(response.headers.get('ETag'))
+
+    def test_unknown_token_is_404(self):
+        """Test feeds are only served for issued tokens"""
+        self.assertEqual(self.client.get('/calendar/ugyldig.ics').status_code, 404)
+
+    def test_unchanged_feed_returns_304_without_loading_reminders(self):
+        """Test polling with If-None-Match is answered from the version counter"""
+        data_versions.bump('kari@example.com')
+        first = self.client.get(f"/calendar/{self.token}.ics")
+        etag = first.headers['ETag']
+
+        with mock.patch.object(dm, 'load_data', wraps=dm.load_data) as load_mock:
+            response = self.client.get(f"/calendar/{self.token}.ics", headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        loaded = [call.args[0] for call in load_mock.call_args_list]
+        self.assertNotIn('reminders', loaded)
+        self.assertNotIn('shared_reminders', loaded)
+
+        response = self.client.get(
+            f"/calendar/{self.token}.ics", headers={'If-Modified-Since': first.headers['Last-Modified']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        """Test a data change gives a new ETag and a full response"""
+        etag = self.client.get(f"/calendar/{self.token}.ics").headers['ETag']
+        data_versions.bump('kari@example.com')
+        response = self.client.get(f"/calendar/{self.token}.ics", headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_reset_token_revokes_old_url(self):
+        """Test issuing a new token stops the old feed URL"""
+        new_token = calendar_feed_service.token_for('kari@example.com', reset=True)
+        self.assertNotEqual(new_token, self.token)
+        self.assertEqual(self.client.get(f"/calendar/{self.token}.ics").status_code, 404)
+        self.assertEqual(self.client.get(f"/calendar/{new_token}.ics").status_code, 200)
+
+    def test_reset_in_another_worker_revokes_old_url(self):
+        """Test a token rotated by another process is rejected here too"""
+        self.assertEqual(self.client.get(f"/calendar/{self.token}.ics").status_code, 200)
+
+        other_worker = CalendarFeed(dm, data_versions)
+        new_token = other_worker.token_for('kari@example.com', reset=True)
+        users_file = os.path.join(self.test_dir, 'users.json')
+        mtime = os.stat(users_file).st_mtime_ns + 10**9
+        os.utime(users_file, ns=(mtime, mtime))
+
+        self.assertEqual(self.client.get(f"/calendar/{self.token}.ics").status_code, 404)
+        self.assertEqual(self.client.get(f"/calendar/{new_token}.ics").status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,142 @@
+import unittest
+import tempfile
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from tests.helpers import JsonDataManager
+from reminder_manager import ReminderManager
+from calendar_index import CalendarIndex, parse_window_bound, decode_cursor
+from data_versions import UserDataVersions
+
+
+class CalendarIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dm = JsonDataManager(self.test_dir)
+        self.dm.save_data('reminders', [
+            {'id': f"r{i}", 'user_id': 'kari@example.com', 'title': f"Påminnelse {i}",
+             'datetime': f"{2020 + i // 12}-{i % 12 + 1:02d}-15 09:00"}
+            for i in range(72)
+        ] + [
+            {'id': 'other', 'user_id': 'ola@example.com', 'title': 'Ikke min', 'datetime': '2026-11-15 09:00'},
+            {'id': 'src', 'user_id': 'ola@example.com', 'title': 'Felles', 'datetime': '2025-03-01 10:00'},
+            {'id': 'bad', 'user_id': 'kari@example.com', 'title': 'Ugyldig', 'datetime': 'snart'}
+        ])
+        self.dm.save_data('shared_reminders', [
+            {'id': 's1', 'original_id': 'src', 'shared_by': 'ola@example.com', 'shared_with': 'kari@example.com'}
+        ])
+        self.index = CalendarIndex(self.dm, ReminderManager(self.dm))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_window_returns_only_events_in_range(self):
+        """Test a month view gets that month's reminders, own and shared"""
+        events = self.index.between(
+            'kari@example.com', datetime(2025, 2, 23), datetime(2025, 4, 6)
+        )
+        self.assertEqual(
+            [(kind, reminder['id']) for kind, reminder in events],
+            [('shared', 's1'), ('my', 'r62')]
+        )
+
+    def test_end_is_exclusive_and_bounds_optional(self):
+        """Test end is exclusive and no bounds means everything parseable"""
+        events = self.index.between('kari@example.com', datetime(2020, 1, 1), datetime(2020, 1, 15, 9, 0))
+        self.assertEqual(events, [])
+        self.assertEqual(len(self.index.between('kari@example.com')), 73)
+
+    def test_index_rebuilt_after_write(self):
+        """Test a new reminder shows up once reminders.json changes"""
+        window = (datetime(2030, 1, 1), datetime(2030, 2, 1))
+        self.assertEqual(self.index.between('kari@example.com', *window), [])
+        reminders = self.dm.load_data('reminders')
+        reminders.append({'id': 'ny', 'user_id': 'kari@example.com', 'title': 'Ny', 'datetime': '2030-01-10 08:00'})
+        self.dm.save_data('reminders', reminders)
+        self.assertEqual([r['id'] for _, r in self.index.between('kari@example.com', *window)], ['ny'])
+
+    def test_pages_follow_cursor_without_gaps(self):
+        """Test walking the cursor returns every open reminder once, in order"""
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = self.index.page('kari@example.com', 'my', cursor=cursor, limit=10)
+            seen.extend(reminder['id'] for reminder in page)
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 72)
+        self.assertEqual(len(set(seen)), 72)
+        self.assertEqual(seen[:2], ['r0', 'r1'])
+
+    def test_page_filters_and_same_time_ties(self):
+        """Test filters, and that reminders at the same minute are split by id"""
+        reminders = self.dm.load_data('reminders')
+        for i, reminder in enumerate(reminders[:3]):
+            reminder.update(datetime='2019-06-01 12:00', category='Jobb', priority='Høy')
+        reminders[1]['completed'] = True
+        self.dm.save_data('reminders', reminders)
+
+        page, cursor = self.index.page('kari@example.com', 'my', limit=1, category='Jobb')
+        self.assertEqual([r['id'] for r in page], ['r0'])
+        self.assertEqual(decode_cursor(cursor)[1], 'r0')
+        page, cursor = self.index.page('kari@example.com', 'my', cursor=cursor, limit=5, category='Jobb')
+        self.assertEqual([r['id'] for r in page], ['r2'])
+
+        page, _ = self.index.page('kari@example.com', 'my', completed=True, priority='Høy')
+        self.assertEqual([r['id'] for r in page], ['r1'])
+        page, _ = self.index.page('kari@example.com', 'shared')
+        self.assertEqual([r['title'] for r in page], ['Felles'])
+        self.assertIsNone(decode_cursor('ikke-en-markør'))
+
+    def test_versions_rebuild_only_the_changed_user(self):
+        """Test with data versions a write rebuilds only the users it touched"""
+        versions = UserDataVersions(self.dm)
+        index = CalendarIndex(self.dm, ReminderManager(self.dm), versions=versions)
+        index.between('kari@example.com')
+        index.between('ola@example.com')
+
+        reminders = self.dm.load_data('reminders')
+        reminders.append({'id': 'ny', 'user_id': 'ola@example.com', 'title': 'Ny', 'datetime': '2030-01-10 08:00'})
+        self.dm.save_data('reminders', reminders)
+        versions.bump('ola@example.com')
+
+        builds = []
+        original_build = index._build
+        index._build = lambda email: builds.append(email) or original_build(email)
+        self.assertEqual(len(index.between('kari@example.com')), 73)
+        self.assertIn('ny', [r['id'] for _, r in index.between('ola@example.com')])
+        self.assertEqual(builds, ['ola@example.com'])
+
+    def test_open_pages_do_not_scan_completed(self):
+        """Test open and completed reminders are kept in separate sorted lists"""
+        reminders = self.dm.load_data('reminders')
+        for reminder in reminders[:60]:
+            reminder['completed'] = True
+        self.dm.save_data('reminders', reminders)
+
+        keys, items = self.index._index_for('kari@example.com', 'my', False)
+        self.assertEqual(len(keys), 12)
+        self.assertFalse(any(reminder.get('completed') for _, reminder in items))
+        page, _ = self.index.page('kari@example.com', 'my', limit=5)
+        self.assertEqual([r['id'] for r in page], ['r60', 'r61', 'r62', 'r63', 'r64'])
+        page, _ = self.index.page('kari@example.com', 'my', completed=None, limit=100)
+        self.assertEqual(len(page), 72)
+
+    def test_parse_window_bound(self):
+        """Test FullCalendar's ISO bounds with offsets and plain dates"""
+        self.assertEqual(parse_window_bound('2026-10-26T00:00:00+01:00'), datetime(2026, 10, 26))
+        self.assertEqual(parse_window_bound('2026-10-26T00:00:00 01:00'), datetime(2026, 10, 26))
+        self.assertEqual(parse_window_bound('2026-10-26'), datetime(2026, 10, 26))
+        self.assertIsNone(parse_window_bound('i morgen'))
+        self.assertIsNone(parse_window_bound(None))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import unittest
+import tempfile
+import shutil
+import gzip
+import os
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from flask import Flask, Response, jsonify
+
+from compression import Compression, precompress_static
+
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.static_dir, 'app.js'), 'w') as f:
+            f.write('console.log("SmartReminder");\n' * 100)
+
+        app = Flask(__name__, static_folder=self.static_dir, static_url_path='/static')
+        self.compression = Compression(app, min_size=200)
+
+        @app.route('/big')
+        def big():
+            response = jsonify({'events': [{'title': 'Påminnelse', 'start': '2026-11-01 09:00'}] * 50})
+            response.set_etag('v1')
+            return response
+
+        @app.route('/small')
+        def small():
+            return jsonify({'ok': True})
+
+        @app.route('/stream')
+        def stream():
+            return Response((f"data: {i}\n\n" * 100 for i in range(3)), mimetype='text/event-stream')
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir, ignore_errors=True)
+
+    def test_gzip_negotiated(self):
+        """Test large JSON is gzipped only when the client accepts it"""
+        plain = self.client.get('/big')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.get_data()), plain.get_data())
+        self.assertLess(len(response.get_data()), len(plain.get_data()))
+        self.assertEqual(response.headers['ETag'], 'W/"v1"')
+
+        refused = self.client.get('/big', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        self.assertNotIn('Content-Encoding', refused.headers)
+
+    def test_small_and_streamed_responses_untouched(self):
+        """Test the size threshold and that streams (SSE) are never buffered"""
+        for url in ('/small', '/stream'):
+            response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(self.compression.get_statistics()['compressed'], 0)
+
+    def test_precompressed_static_served_directly(self):
+        """Test static files use the .gz sibling written by precompress_static()"""
+        self.assertEqual(precompress_static(self.static_dir, min_size=200), len(self.compression.get_statistics()['encodings']))
+        self.assertEqual(precompress_static(self.static_dir, min_size=200), 0)
+
+        response = self.client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/javascript')
+        response.direct_passthrough = False
+        self.assertIn(b'SmartReminder', gzip.decompress(response.get_data()))
+        response.close()
+
+        plain = self.client.get('/static/app.js')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        plain.close()
+        self.assertEqual(self.compression.get_statistics()['precompressed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
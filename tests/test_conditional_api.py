@@ -0,0 +1,137 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+# Mock APScheduler before importing app
+import unittest.mock as mock
+sys.modules['apscheduler'] = mock.MagicMock()
+sys.modules['apscheduler.schedulers'] = mock.MagicMock()
+sys.modules['apscheduler.schedulers.background'] = mock.MagicMock()
+
+# Set testing environment
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import app, dm
+
+
+class ApiTestBase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        dm.data_dir = Path(self.test_dir)
+        dm._ensure_data_files()
+        dm.save_data('users', {'u1': {'email': 'kari@example.com', 'username': 'kari'}})
+        dm.save_data('reminders', [
+            {'id': 'r1', 'user_id': 'kari@example.com', 'title': 'Tannlege',
+             'datetime': '2026-11-03 09:00', 'priority': 'Høy', 'category': 'Helse'}
+        ])
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'u1'
+            sess['_fresh'] = True
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class ConditionalApiTestCase(ApiTestBase):
+
+    def test_unchanged_data_returns_304_without_loading(self):
+        """Test polling with If-None-Match is answered before storage is read"""
+        for url in ('/api/reminder-count', '/api/calendar-events?start=2026-11-01&end=2026-12-01'):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            etag = first.headers['ETag']
+            self.assertTrue(etag.startswith('W/'))
+
+            with mock.patch.object(dm, 'load_data', wraps=dm.load_data) as load_mock:
+                response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            loaded = [call.args[0] for call in load_mock.call_args_list]
+            self.assertNotIn('reminders', loaded)
+            self.assertNotIn('shared_reminders', loaded)
+
+    def test_etag_is_not_shared_between_users(self):
+        """Test another user at the same version does not get a 304 for the first user's ETag"""
+        dm.save_data('users', {
+            'u1': {'email': 'kari@example.com', 'username': 'kari'},
+            'u2': {'email': 'ola@example.com', 'username': 'ola'}
+        })
+        urls = ('/api/reminder-count', '/api/calendar-events?start=2026-11-01&end=2026-12-01',
+                '/api/reminders?list=my')
+        etags = {url: self.client.get(url).headers['ETag'] for url in urls}
+
+        other = app.test_client()
+        with other.session_transaction() as sess:
+            sess['_user_id'] = 'u2'
+            sess['_fresh'] = True
+        for url in urls:
+            response = other.get(url, headers={'If-None-Match': etags[url]})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etags[url])
+
+    def test_write_invalidates_etag(self):
+        """Test completing a reminder gives a new ETag and fresh counts"""
+        etag = self.client.get('/api/reminder-count').headers['ETag']
+        self.client.get('/complete_reminder/r1')
+        response = self.client.get('/api/reminder-count', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_json()['completed_count'], 1)
+
+
+class ReminderListingApiTestCase(ApiTestBase):
+
+    def setUp(self):
+        super().setUp()
+        dm.save_data('reminders', [
+            {'id': f"r{i:02d}", 'user_id': 'kari@example.com', 'title': f"Påminnelse {i}",
+             'datetime': f"2026-11-{i % 28 + 1:02d} 09:00", 'priority': 'Medium', 'category': 'Annet'}
+            for i in range(45)
+        ])
+
+    def test_dashboard_renders_first_page_only(self):
+        """Test the dashboard renders one page and a cursor for the rest"""
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        self.assertEqual(body.count('class="reminder-item card'), 20)
+        self.assertIn('data-list="my" data-next-cursor="WyI', body)
+
+    def test_listing_api_pages(self):
+        """Test the listing API walks all pages with rendered cards"""
+        seen = []
+        cursor = ''
+        while True:
+            data = self.client.get(f"/api/reminders?list=my&limit=20&cursor={cursor}").get_json()
+            self.assertTrue(data['success'])
+            self.assertEqual(data['html'].count('class="reminder-item card'), len(data['reminders']))
+            seen.extend(reminder['id'] for reminder in data['reminders'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(f"r{i:02d}" for i in range(45)))
+        self.assertEqual(self.client.get('/api/reminders?list=andre').status_code, 400)
+
+
+    def test_listing_etag_changes_with_focus_mode(self):
+        """Test the rendered cards are not served from a 304 after a focus mode change"""
+        url = '/api/reminders?list=my&limit=5'
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        dm.save_data('users', {'u1': {'email': 'kari@example.com', 'username': 'kari', 'focus_mode': 'adhd'}})
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code, 304)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,367 @@
+import unittest
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+import unittest.mock as mock
+
+from flask_mail import Message
+from jinja2 import ChoiceLoader, DictLoader
+
+from email_service import EmailService
+from email_outbox import message_to_dict
+from email_digest import next_digest_time
+from email_rate_limit import EmailRateLimiter, parse_domain_rates
+from email_stats import EmailStatistics
+from tests.helpers import SMTPSink, NullDataManager, make_app
+
+
+class EmailServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink().start()
+        self.app, self.mail = make_app(self.sink.port)
+        self.dm = NullDataManager()
+        self.service = EmailService(self.mail, self.dm, app=self.app)
+
+    def tearDown(self):
+        self.service.pool.close_all()
+        self.sink.stop()
+
+    def _message(self, i=0):
+        return Message(
+            subject=f"Test {i}", recipients=[f"user{i}@example.com"], html='<p>Hei</p>',
+            sender='test@example.com'
+        )
+
+    def test_connection_reused_between_messages(self):
+        """Test consecutive sends share one SMTP session"""
+        for i in range(5):
+            self.service.send_message(self._message(i))
+        self.assertEqual(self.sink.messages, 5)
+        self.assertEqual(self.sink.sessions, 1)
+
+    def test_reconnects_when_connection_dropped(self):
+        """Test a dropped pooled connection is replaced and the send retried"""
+        self.service.send_message(self._message(1))
+        connection, _ = self.service.pool._idle[-1]
+        connection.host.close()  # Server-side timeout leaves the session unusable
+
+        self.service.send_message(self._message(2))
+        self.assertEqual(self.sink.messages, 2)
+        self.assertEqual(self.sink.sessions, 2)
+
+    def test_idle_connections_expire(self):
+        """Test connections idle past the timeout are not reused"""
+        self.service.pool.idle_timeout = 0
+        self.service.send_message(self._message(1))
+        self.service.send_message(self._message(2))
+        self.assertEqual(self.sink.sessions, 2)
+
+    def test_smtp_session_pins_one_connection(self):
+        """Test multi-recipient loops inside smtp_session use one connection"""
+        self.service.pool.max_size = 0
+        with self.service.smtp_session():
+            for i in range(3):
+                self.service.send_message(self._message(i))
+        self.assertEqual(self.sink.messages, 3)
+        self.assertEqual(self.sink.sessions, 1)
+
+    def test_board_update_rendered_once_for_all_members(self):
+        """Test the shared body is rendered once and reused per recipient"""
+        board = SimpleNamespace(board_id='b1', title='Familie')
+        sent = self.service.send_noteboard_update(
+            board, 'Nytt notat lagt til', 'kari@example.com',
+            ['ola@example.com', 'per@example.com', 'lise@example.com'], note='Melk'
+        )
+        self.assertEqual(sent, 3)
+        stats = self.service.get_render_statistics()['emails/noteboard_update.html']
+        self.assertEqual(stats['renders'], 1)
+        self.assertEqual(stats['cache_hits'], 2)
+        self.assertIn('render', self.service.get_email_statistics())
+
+    def test_board_update_email_shows_note_and_summary(self):
+        """Test the email renders the note preview, the delete notice and batch summaries"""
+        board = SimpleNamespace(board_id='b1', title='Familie')
+        bodies = []
+        with mock.patch.object(self.service, 'dispatch', side_effect=lambda msg, template: bodies.append(msg.html) or True):
+            self.service.send_noteboard_update(
+                board, 'Nytt notat lagt til', 'kari@example.com', ['ola@example.com'], note='Kjøp melk'
+            )
+            self.service.send_noteboard_update(board, 'Notat slettet', 'kari@example.com', ['ola@example.com'])
+            self.service.send_noteboard_update(
+                board, 'Notat slettet', 'ola@example.com', ['per@example.com'],
+                summary='3 notater lagt til, 1 notat slettet', update_count=4,
+                authors=['kari@example.com', 'ola@example.com']
+            )
+
+        single, deleted, batch = bodies
+        self.assertIn('📝 Nytt notat:', single)
+        self.assertIn('Kjøp melk', single)
+        self.assertIn('>Nytt notat lagt til</h3>', single)
+        self.assertIn('🗑️ Slettet:', deleted)
+        self.assertIn('>3 notater lagt til, 1 notat slettet</h3>', batch)
+        self.assertIn('<strong>👤 Oppdatert av:</strong> kari, ola', batch)
+        self.assertNotIn('🗑️ Slettet:', batch)
+
+    def test_recipient_fields_filled_per_recipient(self):
+        """Test per-recipient fields are escaped into the cached body"""
+        self.app.jinja_loader = ChoiceLoader([
+            DictLoader({'emails/greeting.html': '<p>{{ title }} til {{ recipient }}</p>'}),
+            self.app.jinja_loader
+        ])
+        with self.app.app_context():
+            first = self.service.render('emails/greeting.html', 'k', title='Hei', recipient='a@example.com')
+            second = self.service.render('emails/greeting.html', 'k', title='Hei', recipient='<b>@example.com')
+        self.assertEqual(first, '<p>Hei til a@example.com</p>')
+        self.assertEqual(second, '<p>Hei til &lt;b&gt;@example.com</p>')
+        self.assertEqual(self.service.get_render_statistics()['emails/greeting.html']['renders'], 1)
+
+
+class EmailDigestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink().start()
+        self.app, self.mail = make_app(self.sink.port)
+        self.dm = NullDataManager()
+        self.dm.data['users'] = {
+            'u1': {'email': 'travel@example.com', 'username': 'travel', 'email_digest': 'hourly'},
+            'u2': {'email': 'rolig@example.com', 'username': 'rolig'}
+        }
+        self.service = EmailService(self.mail, self.dm, app=self.app)
+        self.reminder = {
+            'title': 'Tannlege', 'description': '', 'datetime': '2026-10-20 09:00',
+            'priority': 'Høy', 'category': 'Helse'
+        }
+
+    def tearDown(self):
+        self.service.pool.close_all()
+        self.sink.stop()
+
+    def test_events_buffered_and_sent_as_one_digest(self):
+        """Test hourly users get one email for many events"""
+        board = SimpleNamespace(board_id='b1', title='Familie')
+        for _ in range(3):
+            self.assertTrue(self.service.send_reminder_notification(self.reminder, 'travel@example.com'))
+        self.service.send_noteboard_update(
+            board, '2 notater lagt til', 'kari@example.com', ['travel@example.com', 'rolig@example.com']
+        )
+        self.assertEqual(self.sink.messages, 1)  # Only the immediate user
+        self.assertEqual(self.service.digest.pending('travel@example.com'), 4)
+
+        self.assertEqual(self.service.digest.flush_due(), 0)  # Hour not over yet
+        sent = self.service.digest.flush_due(now=datetime.now() + timedelta(hours=1))
+        self.assertEqual(sent, 1)
+        self.assertEqual(self.sink.messages, 2)
+        self.assertEqual(self.service.digest.pending(), 0)
+        self.assertEqual(self.dm.data['email_log'][-1]['template'], 'emails/digest.html')
+
+    def test_preference_change_applies(self):
+        """Test switching to daily buffers, and back to immediate flushes"""
+        self.service.digest.set_mode('rolig@example.com', 'daily')
+        self.service.send_reminder_notification(self.reminder, 'rolig@example.com')
+        self.assertEqual(self.sink.messages, 0)
+
+        self.service.digest.set_mode('rolig@example.com', 'immediate')
+        self.assertEqual(self.service.digest.flush_due(), 1)
+        self.assertEqual(self.sink.messages, 1)
+
+    def test_next_digest_time(self):
+        """Test hourly digests go at the top of the hour and daily at the set hour"""
+        since = datetime(2026, 10, 19, 8, 20)
+        self.assertEqual(next_digest_time('hourly', since), datetime(2026, 10, 19, 9, 0))
+        self.assertEqual(next_digest_time('daily', since, daily_hour=7), datetime(2026, 10, 20, 7, 0))
+        self.assertEqual(next_digest_time('daily', since, daily_hour=18), datetime(2026, 10, 19, 18, 0))
+
+
+class FakeClock:
+    """Deterministic clock; sleep() advances time"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class EmailRateLimiterTestCase(unittest.TestCase):
+
+    def test_global_bucket_paces_bursts(self):
+        """Test a burst beyond the bucket waits instead of failing"""
+        clock = FakeClock()
+        limiter = EmailRateLimiter(per_minute=60, burst=2, clock=clock, sleep=clock.sleep)
+        waits = [limiter.acquire(['a@example.com']) for _ in range(5)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(sum(waits), 3.0)
+        stats = limiter.get_statistics()
+        self.assertEqual(stats['acquired'], 5)
+        self.assertEqual(stats['waited'], 3)
+        self.assertAlmostEqual(stats['max_wait'], 1.0)
+
+    def test_domain_buckets_are_separate(self):
+        """Test one throttled domain does not slow down others"""
+        clock = FakeClock()
+        limiter = EmailRateLimiter(
+            per_minute=0, domain_per_minute=60, domain_burst=1,
+            domain_overrides=parse_domain_rates('gmail.com:30'), clock=clock, sleep=clock.sleep
+        )
+        limiter.acquire(['kari@gmail.com'])
+        self.assertAlmostEqual(limiter.acquire(['ola@gmail.com']), 2.0)
+        self.assertEqual(limiter.acquire(['per@example.com']), 0.0)
+        self.assertEqual(limiter.get_statistics()['throttled_domains'], {'gmail.com': 1})
+
+    def test_disabled_by_default(self):
+        """Test a limiter with all rates at 0 never waits"""
+        limiter = EmailRateLimiter(per_minute=0, domain_per_minute=0)
+        self.assertEqual(sum(limiter.acquire(['a@example.com']) for _ in range(100)), 0.0)
+
+
+class CountingDataManager(NullDataManager):
+    """NullDataManager that counts loads per collection"""
+
+    def __init__(self):
+        super().__init__()
+        self.loads = {}
+
+    def load_data(self, filename, default=None):
+        self.loads[filename] = self.loads.get(filename, 0) + 1
+        return super().load_data(filename, default)
+
+
+class EmailStatisticsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dm = CountingDataManager()
+        self.dm.data['email_log'] = [
+            {'recipient': f"user{i}@example.com", 'subject': 'Hei', 'template': 'emails/shared_reminder.html',
+             'status': 'sent' if i % 4 else 'failed', 'timestamp': f"2026-10-1{i % 3}T09:00:00", 'error': None}
+            for i in range(100)
+        ]
+        self.stats = EmailStatistics(self.dm, recent_size=5, keep_days=3650)
+
+    def test_rebuilt_once_from_existing_log(self):
+        """Test counters are built from email_log on first use only"""
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot['totals'], {'sent': 75, 'failed': 25})
+        self.assertEqual(snapshot['by_template']['emails/shared_reminder.html']['sent'], 75)
+        self.assertEqual(sum(day.get('sent', 0) for day in snapshot['by_day'].values()), 75)
+        self.assertEqual(len(snapshot['recent']), 5)
+
+        self.stats.snapshot()
+        self.assertEqual(self.dm.loads['email_log'], 1)
+
+    def test_record_and_transition(self):
+        """Test queued mail moves to sent in counters and recent entries"""
+        self.stats.snapshot()
+        entry = {'recipient': 'kari@example.com', 'subject': 'Ny', 'template': 'emails/digest.html',
+                 'status': 'queued', 'timestamp': '2026-10-19T10:00:00', 'outbox_id': 'o1'}
+        self.stats.record(entry)
+        self.assertEqual(self.stats.snapshot()['totals']['queued'], 1)
+
+        entry['status'] = 'sent'
+        self.stats.transition(entry, 'queued')
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot['totals'], {'sent': 76, 'failed': 25, 'queued': 0})
+        self.assertEqual(snapshot['recent'][0]['status'], 'sent')
+        self.assertEqual(len(snapshot['recent']), 5)
+
+    def test_service_statistics_do_not_read_log(self):
+        """Test get_email_statistics reads counters, not email_log"""
+        service = EmailService(None, self.dm)
+        service.stats.snapshot()
+        loads = self.dm.loads['email_log']
+        for _ in range(3):
+            stats = service.get_email_statistics()
+        self.assertEqual(self.dm.loads['email_log'], loads)
+        self.assertEqual(stats['total_sent'], 75)
+        self.assertEqual(stats['success_rate'], 75.0)
+
+
+class EmailOutboxTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink(message_latency_ms=50).start()
+        self.app, self.mail = make_app(self.sink.port)
+        self.app.config.update(MAIL_OUTBOX_WORKERS=2, MAIL_OUTBOX_RETRY_DELAY=0)
+        self.dm = NullDataManager()
+        self.service = EmailService(self.mail, self.dm, app=self.app)
+
+    def tearDown(self):
+        self.service.outbox.wait_idle()
+        self.service.pool.close_all()
+        self.sink.stop()
+
+    def test_send_returns_before_smtp(self):
+        """Test handlers only enqueue; workers deliver and update the log"""
+        reminder = {
+            'title': 'Tannlege', 'description': '', 'datetime': '2026-10-20 09:00',
+            'priority': 'Høy', 'category': 'Helse'
+        }
+        with self.app.app_context():
+            for i in range(4):
+                self.assertTrue(self.service.send_shared_reminder_notification(
+                    reminder, 'kari@example.com', f"user{i}@example.com"
+                ))
+        self.assertEqual(self.sink.messages, 0)
+        self.assertEqual(
+            [entry['status'] for entry in self.dm.data['email_log']], ['queued'] * 4
+        )
+
+        self.assertTrue(self.service.outbox.wait_idle())
+        self.assertEqual(self.sink.messages, 4)
+        self.assertEqual(
+            [entry['status'] for entry in self.dm.data['email_log']], ['sent'] * 4
+        )
+        self.assertEqual(self.dm.data['email_outbox'], [])
+
+    def test_entries_from_dead_process_are_resent(self):
+        """Test mail persisted before a restart is sent when the outbox starts"""
+        with self.app.app_context():
+            message = message_to_dict(Message(
+                subject='Etter omstart', recipients=['user@example.com'],
+                html='<p>Hei</p>', sender='test@example.com'
+            ))
+        self.dm.data['email_outbox'] = [{
+            'id': 'left-over', 'message': message, 'template': None, 'meta': {},
+            'status': 'sending', 'attempts': 1, 'owner': {'pid': 2 ** 22 + 1, 'token': 'old'}
+        }]
+
+        self.service.outbox.ensure_started()
+        self.assertTrue(self.service.outbox.wait_idle())
+        self.assertEqual(self.sink.messages, 1)
+        self.assertEqual(self.dm.data['email_outbox'], [])
+
+    def test_failed_delivery_retried_then_logged(self):
+        """Test a failing message is retried and finally logged as failed"""
+        self.service.outbox.max_attempts = 2
+        attempts = []
+
+        def failing_deliver(entry):
+            attempts.append(entry['id'])
+            raise ConnectionError('SMTP nede')
+
+        self.service.outbox.deliver = failing_deliver
+        with self.app.app_context():
+            self.service.dispatch(Message(
+                subject='Feil', recipients=['user@example.com'], html='x', sender='test@example.com'
+            ))
+        self.service.outbox.wait_idle()
+        time.sleep(0.1)  # Retry is re-queued from a timer
+        self.service.outbox.wait_idle()
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.dm.data['email_log'][-1]['status'], 'failed')
+        self.assertEqual(self.dm.data['email_outbox'], [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+import unittest
+import threading
+import time
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from event_stream import EventBus
+
+
+class EventBusTestCase(unittest.TestCase):
+
+    def test_replay_after_last_event_id(self):
+        """Test a reconnecting client gets only the events it missed"""
+        bus = EventBus(heartbeat=0.01, max_stream_seconds=0.05)
+        first = bus.publish('kari@example.com', 'counts')
+        bus.publish('kari@example.com', 'notification', {'title': 'Tannlege'})
+        bus.publish('ola@example.com', 'counts')
+        bus.publish('kari@example.com', 'board', {'board_id': 'b1'})
+
+        body = ''.join(bus.stream('kari@example.com', first))
+        self.assertTrue(body.startswith('retry: 5000\n\n'))
+        self.assertNotIn(f"id: {first}\n", body)
+        self.assertIn('event: notification\ndata: {"title":"Tannlege"}', body)
+        self.assertIn('event: board', body)
+        self.assertEqual(body.count('event: '), 2)
+        self.assertIn(': ping', body)
+        self.assertEqual(bus.get_statistics()['open_streams'], 0)
+
+    def test_unknown_or_expired_id_asks_for_resync(self):
+        """Test ids from another process or beyond the history trigger a resync"""
+        bus = EventBus(history=2, heartbeat=0.01, max_stream_seconds=0.03)
+        for _ in range(5):
+            bus.publish('kari@example.com', 'counts')
+        self.assertIn('event: resync', ''.join(bus.stream('kari@example.com', 'gammel-3')))
+
+        body = ''.join(bus.stream('kari@example.com', f"{bus.epoch}-1"))
+        self.assertIn('event: resync', body)
+        self.assertNotIn('event: counts', body)
+
+    def test_new_connection_does_not_replay_history(self):
+        """Test a stream without Last-Event-ID starts at the current event"""
+        bus = EventBus(heartbeat=0.01, max_stream_seconds=0.03)
+        bus.publish('kari@example.com', 'board', {'board_id': 'b1'})
+        last = bus.publish('kari@example.com', 'notification', {'title': 'Tannlege'})
+
+        body = ''.join(bus.stream('kari@example.com'))
+        self.assertTrue(body.startswith(f"retry: 5000\nid: {last}\n\n"))
+        self.assertNotIn('event: ', body)
+
+        # Also after more events than the history holds: no resync either
+        for _ in range(60):
+            last = bus.publish('kari@example.com', 'counts')
+        body = ''.join(bus.stream('kari@example.com', ''))
+        self.assertNotIn('event: ', body)
+
+        # Reconnecting with the id it was given gets only what came after
+        stream = bus.stream('ola@example.com')
+        first_chunk = next(stream)
+        stream.close()
+        resume_id = first_chunk.split('id: ')[1].strip()
+        bus.publish('ola@example.com', 'counts')
+        body = ''.join(bus.stream('ola@example.com', resume_id))
+        self.assertEqual(body.count('event: counts'), 1)
+
+    def test_publish_wakes_waiting_stream(self):
+        """Test an idle stream delivers a new event without waiting for the heartbeat"""
+        bus = EventBus(heartbeat=5, max_stream_seconds=10)
+        stream = bus.stream('kari@example.com')
+        next(stream)  # retry line
+        timer = threading.Timer(0.05, bus.publish, args=('kari@example.com', 'counts'))
+        timer.start()
+        started = time.monotonic()
+        chunk = next(stream)
+        self.assertIn('event: counts', chunk)
+        self.assertLess(time.monotonic() - started, 2)
+        stream.close()
+        self.assertEqual(bus.get_statistics()['open_streams'], 0)
+
+
+
+class DeployCommandTestCase(unittest.TestCase):
+
+    def test_streams_are_served_by_one_gevent_worker(self):
+        """Test every start command uses gevent without --preload (scheduler runs in the worker)"""
+        for name in ('Procfile', 'railway.json', 'nixpacks.toml'):
+            command = (project_dir / name).read_text()
+            self.assertIn('--worker-class gevent', command, name)
+            self.assertIn('--workers 1 ', command, name)
+            self.assertNotIn('--preload', command, name)
+        self.assertIn('gevent', (project_dir / 'requirements.txt').read_text())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from flask import Flask, render_template_string
+
+from fragment_cache import FragmentCache, record_version
+
+PAGE = "{% for reminder in reminders %}{{ render_card('card.html', reminder) }}{% endfor %}"
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.template_dir, 'card.html'), 'w') as f:
+            f.write('<div id="{{ reminder.id }}" data-mode="{{ current_focus_mode }}">{{ reminder.title }}</div>')
+
+        self.app = Flask(__name__, template_folder=self.template_dir)
+        self.cache = FragmentCache(self.app, max_entries=10)
+        self.reminders = [{'id': str(i), 'title': f'Påminnelse <{i}>'} for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir, ignore_errors=True)
+
+    def render(self, mode='normal'):
+        with self.app.test_request_context():
+            return render_template_string(PAGE, reminders=self.reminders, current_focus_mode=mode)
+
+    def test_cards_rendered_once(self):
+        """Test unchanged cards come from the cache, escaped exactly once"""
+        first = self.render()
+        self.assertIn('Påminnelse &lt;0&gt;', first)
+        self.assertEqual(self.render(), first)
+        stats = self.cache.get_statistics()
+        self.assertEqual((stats['misses'], stats['hits']), (3, 3))
+
+    def test_only_changed_card_rerendered(self):
+        """Test a change to one record re-renders only its card"""
+        self.render()
+        self.reminders[1]['title'] = 'Endret'
+        html = self.render()
+        self.assertIn('>Endret</div>', html)
+        stats = self.cache.get_statistics()
+        self.assertEqual((stats['misses'], stats['hits']), (4, 2))
+        self.assertNotEqual(record_version(self.reminders[1]), record_version(self.reminders[0]))
+
+    def test_focus_mode_in_key(self):
+        """Test a different focus mode renders its own cards"""
+        self.render('normal')
+        self.assertIn('data-mode="adhd"', self.render('adhd'))
+        self.assertEqual(self.cache.get_statistics()['misses'], 6)
+
+    def test_lru_eviction(self):
+        """Test entry and byte limits evict the least recently used cards"""
+        self.cache.max_entries = 2
+        self.render()
+        stats = self.cache.get_statistics()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+        self.cache.clear()
+        self.cache.max_entries = 10
+        self.cache.max_bytes = 100
+        self.render()
+        stats = self.cache.get_statistics()
+        self.assertLessEqual(stats['bytes'], 100)
+        self.assertLess(stats['entries'], 3)
+
+    def test_render_metrics(self):
+        """Test render time is reported per template"""
+        with self.app.test_request_context():
+            from flask import render_template
+            render_template('card.html', reminder=self.reminders[0])
+            render_template('card.html', reminder=self.reminders[1])
+        templates = self.cache.get_statistics()['templates']
+        self.assertEqual(templates['card.html']['count'], 2)
+        self.assertGreaterEqual(templates['card.html']['avg_ms'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+import ical
+
+
+class ICalendarTestCase(unittest.TestCase):
+
+    def setUp(self):
+        ical.ics_cache.clear()
+        self.reminder = {
+            'id': 'r1',
+            'title': 'Møte; budsjett, Q3',
+            'description': 'Linje 1\nLinje 2 med \\ tegn',
+            'datetime': '2026-06-01 10:00',
+            'category': 'Jobb',
+            'priority': 'Høy'
+        }
+
+    def unfold(self, ics):
+        return ics.replace('\r\n ', '')
+
+    def test_text_is_escaped(self):
+        """Test commas, semicolons, backslashes and newlines are escaped"""
+        ics = self.unfold(ical.build_invitation(self.reminder).decode('utf-8'))
+        self.assertIn('SUMMARY:Møte\\; budsjett\\, Q3\r\n', ics)
+        self.assertIn('DESCRIPTION:Linje 1\\nLinje 2 med \\\\ tegn\r\n', ics)
+        self.assertIn('PRIORITY:1\r\n', ics)
+
+    def test_local_time_converted_to_utc(self):
+        """Test Oslo wall-clock times are converted, not stamped as Z"""
+        ics = ical.build_invitation(self.reminder, 'Europe/Oslo').decode('utf-8')
+        self.assertIn('DTSTART:20260601T080000Z', ics)  # CEST is UTC+2
+        self.assertIn('DTEND:20260601T083000Z', ics)
+        self.reminder['datetime'] = '2026-12-01 10:00'
+        self.assertIn('DTSTART:20261201T090000Z', ical.build_invitation(self.reminder).decode('utf-8'))
+
+    def test_long_lines_folded(self):
+        """Test lines are folded at 75 octets without splitting characters"""
+        self.reminder['description'] = 'æøå ' * 60
+        ics = ical.build_invitation(self.reminder)
+        for line in ics.split(b'\r\n'):
+            self.assertLessEqual(len(line), 75)
+            line.decode('utf-8')
+        self.assertIn('DESCRIPTION:' + ical.escape_text(self.reminder['description']),
+                      self.unfold(ics.decode('utf-8')))
+
+    def test_event_cached_per_version(self):
+        """Test the VEVENT is built once and rebuilt when the reminder changes"""
+        first = ical.build_invitation(self.reminder)
+        for _ in range(5):
+            self.assertEqual(ical.build_invitation(self.reminder), first)
+        self.assertEqual(ical.ics_cache.misses, 1)
+
+        self.reminder['datetime'] = '2026-06-02 10:00'
+        self.assertIn(b'DTSTART:20260602T080000Z', ical.build_invitation(self.reminder))
+        self.assertEqual(ical.ics_cache.misses, 2)
+
+    def test_bulk_calendar(self):
+        """Test a calendar export holds one VEVENT per valid reminder"""
+        reminders = [dict(self.reminder, id=f"r{i}") for i in range(3)] + [{'id': 'bad', 'datetime': 'snart'}]
+        ics = ical.build_calendar(reminders, name='Mine påminnelser').decode('utf-8')
+        self.assertEqual(ics.count('BEGIN:VEVENT'), 3)
+        self.assertTrue(ics.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(ics.endswith('END:VCALENDAR\r\n'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+import unittest.mock as mock
+
+import push_service
+from shared_noteboard import NoteboardManager, summarize_board_updates
+
+
+class MemoryDataManager:
+    """In-memory data manager for noteboard tests"""
+
+    def __init__(self):
+        self.data = {}
+
+    def load_data(self, filename, default=None):
+        return self.data.get(filename, default if default is not None else {})
+
+    def save_data(self, filename, data):
+        self.data[filename] = data
+
+
+class NoteboardNotificationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dm = MemoryDataManager()
+        self.email_service = mock.Mock()
+        self.manager = NoteboardManager(self.dm, email_service=self.email_service, notify_window=60)
+        self.board = self.manager.create_board('Familie', '', 'kari@example.com')
+        for member in ['ola@example.com', 'per@example.com']:
+            self.board.add_member(member)
+        self.manager.save_board(self.board)
+
+    def tearDown(self):
+        self.manager._coalescer.window = 0
+        self.manager.flush_board_updates()
+
+    def test_updates_within_window_are_coalesced(self):
+        """Test ten note additions produce one summary per recipient"""
+        with mock.patch.object(push_service, 'send_push_batch') as push_mock:
+            for i in range(10):
+                self.manager.notify_board_update(
+                    self.board.board_id, 'Nytt notat lagt til', 'kari@example.com', note_content=f'Notat {i}'
+                )
+            self.assertEqual(push_mock.call_count, 0)
+            self.assertEqual(self.manager._coalescer.pending_count(self.board.board_id), 10)
+
+            self.manager.flush_board_updates()
+
+        self.assertEqual(push_mock.call_count, 1)
+        recipients = push_mock.call_args.args[0]
+        self.assertEqual(sorted(recipients), ['ola@example.com', 'per@example.com'])
+        self.assertEqual(push_mock.call_args.kwargs['body'], '10 notater lagt til av kari')
+        self.assertEqual(self.email_service.send_noteboard_update.call_count, 1)
+        email_call = self.email_service.send_noteboard_update.call_args
+        self.assertEqual(email_call.args[1], 'Nytt notat lagt til')
+        self.assertEqual(email_call.kwargs['summary'], '10 notater lagt til')
+        self.assertEqual(email_call.kwargs['update_count'], 10)
+        self.assertEqual(email_call.kwargs['authors'], ['kari@example.com'])
+
+    def test_members_do_not_get_their_own_updates(self):
+        """Test each member's summary excludes their own changes"""
+        with mock.patch.object(push_service, 'send_push_batch') as push_mock:
+            self.manager.notify_board_update(self.board.board_id, 'Nytt notat lagt til', 'kari@example.com')
+            self.manager.notify_board_update(self.board.board_id, 'Notat slettet', 'ola@example.com')
+            self.manager.flush_board_updates()
+
+        bodies = {tuple(sorted(call.args[0])): call.kwargs['body'] for call in push_mock.call_args_list}
+        self.assertEqual(bodies[('ola@example.com',)], 'Nytt notat lagt til av kari')
+        self.assertEqual(bodies[('kari@example.com',)], 'Notat slettet av ola')
+        self.assertEqual(
+            bodies[('per@example.com',)], '1 notat lagt til av kari, 1 notat slettet av ola'
+        )
+
+    def test_zero_window_delivers_immediately(self):
+        """Test a window of 0 keeps the old immediate behaviour"""
+        self.manager._coalescer.window = 0
+        with mock.patch.object(push_service, 'send_push_batch') as push_mock:
+            self.manager.notify_board_update(self.board.board_id, 'Notat oppdatert', 'kari@example.com')
+        self.assertEqual(push_mock.call_count, 1)
+
+    def test_summary_text(self):
+        """Test summary wording for repeated updates"""
+        events = [{'update_type': 'Notat oppdatert', 'updated_by': 'kari@example.com'}] * 3
+        self.assertEqual(summarize_board_updates(events), '3 notater oppdatert av kari')
+        events.append({'update_type': 'Notat slettet', 'updated_by': 'ola@example.com'})
+        self.assertEqual(
+            summarize_board_updates(events, with_authors=False), '3 notater oppdatert, 1 notat slettet'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,251 @@
+import unittest
+import threading
+import tempfile
+import shutil
+import json
+import os
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+import unittest.mock as mock
+
+import push_service
+
+
+class FakeDataManager:
+    """Minimal JSON-file data manager that counts reads"""
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self.loads = 0
+        self.saves = 0
+
+    def load_data(self, filename, default=None):
+        self.loads += 1
+        try:
+            with open(self.data_dir / f"{filename}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default if default is not None else {}
+
+    def save_data(self, filename, data):
+        self.saves += 1
+        with open(self.data_dir / f"{filename}.json", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+
+def make_subscription(endpoint):
+    return {
+        'endpoint': endpoint,
+        'keys': {'p256dh': 'key', 'auth': 'auth'},
+        'last_seen': datetime.now().isoformat()
+    }
+
+
+class PushServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dm = FakeDataManager(self.test_dir)
+        self.members = [f"member{i}@example.com" for i in range(50)]
+        self.dm.save_data('push_subscriptions', {
+            email: [make_subscription(f"https://push.example.com/{i}")]
+            for i, email in enumerate(self.members)
+        })
+        self.dm.save_data('users', {
+            'user-1': {'email': self.members[0], 'notification_sound': 'ding.mp3'}
+        })
+        push_service.subscription_registry.invalidate()
+
+    def tearDown(self):
+        push_service.subscription_registry.invalidate()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_batch_does_not_read_files_per_recipient(self):
+        """Test a 50-member fan-out reads storage once, not per recipient"""
+        self.dm.loads = 0
+        with mock.patch.object(push_service, 'webpush') as webpush_mock, \
+                mock.patch.object(push_service.json, 'dumps', wraps=json.dumps) as dumps_mock:
+            delivered = push_service.send_push_batch(self.members, 'Tittel', 'Tekst', {}, self.dm)
+
+        self.assertEqual(delivered, 50)
+        self.assertEqual(webpush_mock.call_count, 50)
+        self.assertEqual(self.dm.loads, 2)  # push_subscriptions + users snapshot
+        # One payload for the default sound, one for the member with a preference
+        self.assertEqual(dumps_mock.call_count, 2)
+
+    def test_registry_reused_until_invalidated(self):
+        """Test cached subscriptions are reused across calls until invalidated"""
+        with mock.patch.object(push_service, 'webpush'):
+            push_service.send_push_notification(self.members[1], 'A', 'B', dm=self.dm)
+            loads_after_first = self.dm.loads
+            push_service.send_push_notification(self.members[1], 'A', 'B', dm=self.dm)
+            self.assertEqual(self.dm.loads, loads_after_first)
+
+            push_service.unsubscribe_user_from_push(
+                self.members[1], 'https://push.example.com/1', dm=self.dm
+            )
+            self.assertFalse(push_service.send_push_notification(self.members[1], 'A', 'B', dm=self.dm))
+
+    def test_user_sound_preference_used(self):
+        """Test the user's notification sound is used when none is given"""
+        with mock.patch.object(push_service, 'webpush') as webpush_mock:
+            push_service.send_push_notification(self.members[0], 'A', 'B', dm=self.dm)
+
+        payload = json.loads(webpush_mock.call_args.kwargs['data'])
+        self.assertEqual(payload['sound'], 'ding.mp3')
+        self.assertEqual(payload['data']['sound'], 'ding.mp3')
+
+    def test_invalid_subscriptions_pruned_in_one_write(self):
+        """Test 410 responses across a batch are removed with a single save"""
+        gone = mock.Mock(status_code=410)
+
+        def fake_webpush(subscription_info, **kwargs):
+            if int(subscription_info['endpoint'].rsplit('/', 1)[1]) % 2:
+                raise push_service.WebPushException('gone', response=gone)
+
+        self.dm.saves = 0
+        with mock.patch.object(push_service, 'webpush', side_effect=fake_webpush):
+            delivered = push_service.send_push_batch(self.members, 'A', 'B', dm=self.dm)
+
+        self.assertEqual(delivered, 25)
+        self.assertEqual(self.dm.saves, 1)
+        remaining = self.dm.load_data('push_subscriptions')
+        self.assertEqual(sum(len(subs) for subs in remaining.values()), 25)
+
+    def test_sweeper_ages_out_in_bounded_batches(self):
+        """Test the sweeper removes subscriptions not seen for long, a batch at a time"""
+        old = (datetime.now() - timedelta(days=400)).isoformat()
+        recent = datetime.now().isoformat()
+        subscriptions = self.dm.load_data('push_subscriptions')
+        for i, email in enumerate(self.members):
+            # Creation time does not matter, only when it last worked
+            subscriptions[email][0]['created_at'] = old
+            subscriptions[email][0]['last_seen'] = old if i < 10 else recent
+        subscriptions[self.members[-1]][0].pop('last_seen')
+        self.dm.save_data('push_subscriptions', subscriptions)
+        push_service._sweep_cursor['after'] = None
+
+        first = push_service.sweep_stale_subscriptions(self.dm, max_age_days=180, batch_size=20)
+        self.assertEqual(first['examined'], 20)
+
+        totals = dict(first)
+        while totals['examined'] < len(self.members):
+            result = push_service.sweep_stale_subscriptions(self.dm, max_age_days=180, batch_size=20)
+            for key in totals:
+                totals[key] += result[key]
+
+        self.assertEqual(totals['removed'], 10)
+        self.assertEqual(totals['stamped'], 1)
+        remaining = self.dm.load_data('push_subscriptions')
+        self.assertEqual(sum(len(subs) for subs in remaining.values()), 40)
+
+    def test_delivery_and_resubscribe_refresh_last_seen(self):
+        """Test working subscriptions are kept alive by deliveries and re-subscribes"""
+        old = (datetime.now() - timedelta(days=400)).isoformat()
+        subscriptions = self.dm.load_data('push_subscriptions')
+        for email in self.members[:3]:
+            subscriptions[email][0]['last_seen'] = old
+        self.dm.save_data('push_subscriptions', subscriptions)
+        push_service.subscription_registry.invalidate()
+
+        self.dm.saves = 0
+        with mock.patch.object(push_service, 'webpush'):
+            push_service.send_push_batch(self.members[:2], 'A', 'B', dm=self.dm)
+            # Fresh subscriptions are not rewritten on every send
+            push_service.send_push_batch(self.members[5:10], 'A', 'B', dm=self.dm)
+        self.assertEqual(self.dm.saves, 1)
+
+        self.assertTrue(push_service.subscribe_user_to_push(
+            self.members[2], make_subscription('https://push.example.com/2'), dm=self.dm
+        ))
+        push_service._sweep_cursor['after'] = None
+        result = push_service.sweep_stale_subscriptions(self.dm, max_age_days=180, batch_size=100)
+        self.assertEqual(result['removed'], 0)
+
+    def test_sweeper_probes_outside_the_lock(self):
+        """Test probes do not hold the registry lock and refreshed subscriptions survive"""
+        old = (datetime.now() - timedelta(days=400)).isoformat()
+        subscriptions = self.dm.load_data('push_subscriptions')
+        for email in self.members[:2]:
+            subscriptions[email][0]['last_seen'] = old
+        self.dm.save_data('push_subscriptions', subscriptions)
+        gone = mock.Mock(status_code=410)
+
+        def fake_probe(subscription_info, **kwargs):
+            # Another thread can take the lock while the sweep is on the network
+            acquired = []
+
+            def sender():
+                lock = push_service.subscription_registry.lock
+                acquired.append(lock.acquire(timeout=1))
+                if acquired[-1]:
+                    lock.release()
+
+            thread = threading.Thread(target=sender)
+            thread.start()
+            thread.join()
+            self.assertEqual(acquired, [True])
+            # Meanwhile member0 re-subscribes, so its subscription is no longer stale
+            if subscription_info['endpoint'].endswith('/0'):
+                push_service.subscribe_user_to_push(
+                    self.members[0], make_subscription('https://push.example.com/0'), dm=self.dm
+                )
+            raise push_service.WebPushException('gone', response=gone)
+
+        push_service._sweep_cursor['after'] = None
+        with mock.patch.object(push_service, 'webpush', side_effect=fake_probe) as webpush_mock:
+            result = push_service.sweep_stale_subscriptions(self.dm, max_age_days=180, batch_size=100, probe=True)
+
+        self.assertEqual(webpush_mock.call_count, 2)
+        self.assertEqual(result['removed'], 1)
+        remaining = self.dm.load_data('push_subscriptions')
+        self.assertEqual(len(remaining[self.members[0]]), 1)
+        self.assertEqual(remaining[self.members[1]], [])
+
+    def test_reminder_push_headers(self):
+        """Test reminder pushes carry Urgency, Topic and a TTL tied to the reminder time"""
+        due = (datetime.now() + timedelta(hours=2)).strftime('%Y-%m-%d %H:%M')
+        with mock.patch.object(push_service, 'webpush') as webpush_mock:
+            push_service.send_reminder_notification(
+                self.members[1], 'Tannlege', due, dm=self.dm,
+                priority='Høy', reminder_id='abc'
+            )
+
+        kwargs = webpush_mock.call_args.kwargs
+        self.assertEqual(kwargs['headers']['Urgency'], 'high')
+        self.assertEqual(kwargs['headers']['Topic'], push_service.make_topic('reminder', 'abc'))
+        self.assertLessEqual(len(kwargs['headers']['Topic']), 32)
+        self.assertTrue(2 * 3600 < kwargs['ttl'] <= 3 * 3600 + 60)
+
+    def test_batch_headers_overridable(self):
+        """Test ttl, urgency and topic can be set per call"""
+        with mock.patch.object(push_service, 'webpush') as webpush_mock:
+            push_service.send_push_batch(
+                self.members[:2], 'A', 'B', dm=self.dm,
+                ttl=120, urgency='low', topic='board1'
+            )
+
+        for call in webpush_mock.call_args_list:
+            self.assertEqual(call.kwargs['ttl'], 120)
+            self.assertEqual(call.kwargs['headers'], {'Urgency': 'low', 'Topic': 'board1'})
+
+    def test_delivery_benchmark_against_mock_push_service(self):
+        """Test the load-test harness end to end with a small run"""
+        from benchmarks import push_delivery
+
+        with mock.patch('sys.stdout'):
+            exit_code = push_delivery.main([
+                '--subscriptions', '12', '--board-size', '5', '--latency-ms', '0',
+                '--jitter-ms', '0', '--gone-rate', '0.25', '--concurrency', '2'
+            ])
+        self.assertEqual(exit_code, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+import unittest
+import tempfile
+import threading
+import shutil
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from tests.helpers import JsonDataManager
+from reminder_counters import ReminderCounters
+from reminder_manager import ReminderManager
+
+
+class ReminderCountersTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dm = JsonDataManager(self.test_dir)
+        self.dm.save_data('reminders', [
+            {'id': 'r1', 'user_id': 'kari@example.com', 'title': 'Tannlege', 'datetime': '2026-11-03 09:00'},
+            {'id': 'r2', 'user_id': 'kari@example.com', 'title': 'Frisør', 'datetime': '2026-11-04 09:00', 'completed': True},
+            {'id': 'r3', 'user_id': 'ola@example.com', 'title': 'Dugnad', 'datetime': '2026-11-05 09:00'}
+        ])
+        self.dm.save_data('shared_reminders', [
+            {'id': 's1', 'original_id': 'r3', 'shared_by': 'ola@example.com', 'shared_with': 'kari@example.com'},
+            {'id': 's2', 'original_id': 'borte', 'shared_by': 'ola@example.com', 'shared_with': 'kari@example.com'}
+        ])
+        self.counters = ReminderCounters(self.dm)
+        self.manager = ReminderManager(self.dm, counters=self.counters)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_counts_built_from_storage(self):
+        """Test counts match storage, ignoring shares whose source is gone"""
+        self.assertEqual(self.counters.get('kari@example.com'), {'open': 1, 'completed': 1, 'shared_open': 1})
+        self.assertEqual(self.counters.get('ukjent@example.com'), {'open': 0, 'completed': 0, 'shared_open': 0})
+
+    def test_share_flows_adjust_without_rescan(self):
+        """Test share/complete/unshare adjust counts in place"""
+        self.counters.get('kari@example.com')
+        reminder = self.dm.load_data('reminders')[2]
+        self.counters._count_all = None  # A rescan would now fail
+
+        created, _ = self.manager.share(reminder, ['per@example.com', 'kari@example.com'], 'ola@example.com')
+        self.assertEqual(self.counters.get('per@example.com')['shared_open'], 1)
+        self.manager.complete(created[0]['id'], 'per@example.com')
+        self.manager.complete(created[0]['id'], 'per@example.com')
+        self.assertEqual(self.counters.get('per@example.com')['shared_open'], 0)
+        self.manager.unshare_all('r3')
+        self.assertEqual(self.counters.get('kari@example.com')['shared_open'], 0)
+
+    def test_external_write_triggers_rebuild(self):
+        """Test a write that skipped adjust() is picked up from the file change"""
+        self.counters.get('kari@example.com')
+        reminders = self.dm.load_data('reminders')
+        reminders.append({'id': 'r4', 'user_id': 'kari@example.com', 'title': 'Ny', 'datetime': '2026-11-06 09:00'})
+        self.dm.save_data('reminders', reminders)
+        self.assertEqual(self.counters.get('kari@example.com')['open'], 2)
+
+    def test_read_between_save_and_adjust_counts_once(self):
+        """Test a get() racing a share waits for adjust() instead of rebuilding"""
+        self.counters.get('per@example.com')
+        reminder = self.dm.load_data('reminders')[2]
+        seen, readers = [], []
+        save_data = self.dm.save_data
+
+        def save_then_read(name, data):
+            save_data(name, data)
+            reader = threading.Thread(target=lambda: seen.append(self.counters.get('per@example.com')))
+            reader.start()
+            reader.join(0.1)
+            self.assertTrue(reader.is_alive())  # Blocked until the counts are adjusted
+            readers.append(reader)
+
+        self.dm.save_data = save_then_read
+        self.manager.share(reminder, ['per@example.com'], 'ola@example.com')
+        for reader in readers:
+            reader.join(2)
+        self.assertEqual(seen[0]['shared_open'], 1)
+        self.assertEqual(self.counters.get('per@example.com')['shared_open'], 1)
+
+    def test_verify_reports_drift(self):
+        """Test verify() recounts and names users whose counts were wrong"""
+        self.counters.get('kari@example.com')
+        self.counters.adjust('kari@example.com', open=5)
+        self.assertEqual(self.counters.verify(), ['kari@example.com'])
+        self.assertEqual(self.counters.get('kari@example.com')['open'], 1)
+        self.assertEqual(self.counters.verify(), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
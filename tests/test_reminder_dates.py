@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from tests.helpers import JsonDataManager
+from reminder_dates import (
+    canonical_datetime, normalize_reminder, due_iso, reminder_datetime, migrate_reminder_datetimes
+)
+
+
+class ReminderDatesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dm = JsonDataManager(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_canonical_datetime(self):
+        """Test stored formats map to one fixed-width ISO value"""
+        self.assertEqual(canonical_datetime('2026-11-03 09:00'), '2026-11-03T09:00:00')
+        self.assertEqual(canonical_datetime('2026-11-03T09:00:30'), '2026-11-03T09:00:30')
+        self.assertEqual(canonical_datetime('2026-11-03T09:00:00+01:00'), '2026-11-03T09:00:00')
+        self.assertIsNone(canonical_datetime('i morgen'))
+        self.assertIsNone(canonical_datetime(None))
+
+    def test_normalize_and_read(self):
+        """Test writes store the canonical value and readers use it"""
+        reminder = normalize_reminder({'id': 'r1', 'datetime': '2026-11-03 09:00'})
+        self.assertEqual(reminder['datetime_iso'], '2026-11-03T09:00:00')
+        self.assertEqual(reminder_datetime(reminder), datetime(2026, 11, 3, 9, 0))
+
+        reminder['datetime'] = 'ugyldig'
+        self.assertNotIn('datetime_iso', normalize_reminder(reminder))
+        self.assertIsNone(reminder_datetime(reminder))
+
+        # Records written before the migration are still parsed
+        self.assertEqual(due_iso({'datetime': '2026-11-03 09:00'}), '2026-11-03T09:00:00')
+
+    def test_canonical_values_sort_as_strings(self):
+        """Test canonical values order the same as the datetimes"""
+        values = ['2026-11-03 9:05', '2026-11-03 10:00', '2026-01-15 23:59']
+        reminders = [normalize_reminder({'datetime': value}) for value in values]
+        by_string = sorted(reminders, key=due_iso)
+        by_datetime = sorted(reminders, key=reminder_datetime)
+        self.assertEqual(by_string, by_datetime)
+
+    def test_migration_is_idempotent(self):
+        """Test the migration fills missing values and only writes when needed"""
+        self.dm.save_data('reminders', [
+            {'id': 'r1', 'datetime': '2026-11-03 09:00'},
+            {'id': 'r2', 'datetime': '2026-11-04 10:00', 'datetime_iso': '2026-11-01T08:00:00'},
+            {'id': 'r3', 'datetime': 'ukjent'}
+        ])
+        self.assertEqual(migrate_reminder_datetimes(self.dm), 2)
+        reminders = self.dm.load_data('reminders', [])
+        self.assertEqual(reminders[0]['datetime_iso'], '2026-11-03T09:00:00')
+        self.assertEqual(reminders[1]['datetime_iso'], '2026-11-04T10:00:00')
+        self.assertNotIn('datetime_iso', reminders[2])
+
+        mtime = os.stat(os.path.join(self.test_dir, 'reminders.json')).st_mtime_ns
+        self.assertEqual(migrate_reminder_datetimes(self.dm), 0)
+        self.assertEqual(os.stat(os.path.join(self.test_dir, 'reminders.json')).st_mtime_ns, mtime)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,158 @@
+import unittest
+import tempfile
+import shutil
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+from tests.helpers import JsonDataManager
+from data_versions import UserDataVersions
+from email_service import fingerprint
+from reminder_manager import ReminderManager
+
+
+class CountingDataManager(JsonDataManager):
+    """JSON data manager that counts saves per collection"""
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.saves = {}
+
+    def save_data(self, filename, data):
+        self.saves[filename] = self.saves.get(filename, 0) + 1
+        super().save_data(filename, data)
+
+
+class ReminderManagerTestBase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dm = CountingDataManager(self.test_dir)
+        self.dm.save_data('shared_reminders', [])
+        self.dm.saves.clear()
+        self.versions = UserDataVersions(self.dm)
+        self.manager = ReminderManager(self.dm, versions=self.versions)
+        self.reminder = {
+            'id': 'r1', 'user_id': 'kari@example.com', 'title': 'Dugnad',
+            'description': '', 'datetime': '2026-11-01 10:00', 'priority': 'Medium', 'category': 'Annet'
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class ReminderShareTestCase(ReminderManagerTestBase):
+
+    def test_bulk_share_is_one_write(self):
+        """Test sharing with 200 recipients writes shared_reminders once"""
+        recipients = [f"user{i}@example.com" for i in range(200)]
+        notified = []
+        created, already = self.manager.share(
+            self.reminder, recipients, 'kari@example.com',
+            notify=lambda shared, recipient: notified.append(recipient)
+        )
+        self.assertEqual(len(created), 200)
+        self.assertEqual(already, [])
+        self.assertEqual(self.dm.saves['shared_reminders'], 1)
+        self.assertEqual(len(self.dm.load_data('shared_reminders')), 200)
+        self.assertEqual(notified, recipients)
+        self.assertEqual(self.versions.get('user7@example.com')[0], 1)
+
+    def test_notify_view_is_the_same_for_every_recipient(self):
+        """Test notifications get one recipient-neutral view, so email renders are shared"""
+        views = []
+        self.manager.share(
+            self.reminder, ['a@example.com', 'b@example.com'], 'kari@example.com',
+            personal_message='Ikke glem!',
+            notify=lambda view, recipient: views.append(view)
+        )
+        self.assertEqual(len(views), 2)
+        self.assertEqual(fingerprint(views[0], 'kari@example.com'), fingerprint(views[1], 'kari@example.com'))
+        self.assertEqual(views[0]['title'], self.reminder['title'])
+        self.assertEqual(views[0]['personal_message'], 'Ikke glem!')
+        self.assertNotIn('shared_with', views[0])
+        self.assertNotIn('id', views[0])
+
+    def test_already_shared_recipients_skipped(self):
+        """Test the index dedupes against earlier shares and within the list"""
+        self.manager.share(self.reminder, ['a@example.com', 'b@example.com'], 'kari@example.com')
+        created, already = self.manager.share(
+            self.reminder, ['b@example.com', 'c@example.com', 'c@example.com'], 'kari@example.com'
+        )
+        self.assertEqual([shared['shared_with'] for shared in created], ['c@example.com'])
+        self.assertEqual(already, ['b@example.com'])
+        self.assertEqual(len(self.dm.load_data('shared_reminders')), 3)
+        self.assertTrue(self.manager.is_shared_with('r1', 'a@example.com'))
+
+    def test_index_follows_external_changes(self):
+        """Test shares removed from storage by another writer can be shared again"""
+        self.manager.share(self.reminder, ['a@example.com'], 'kari@example.com')
+        self.dm.save_data('shared_reminders', [])
+        created, _ = self.manager.share(self.reminder, ['a@example.com'], 'kari@example.com')
+        self.assertEqual(len(created), 1)
+
+    def test_nothing_new_means_no_write(self):
+        """Test re-sharing with existing recipients does not rewrite storage"""
+        self.manager.share(self.reminder, ['a@example.com'], 'kari@example.com')
+        self.manager.share(self.reminder, ['a@example.com'], 'kari@example.com')
+        self.assertEqual(self.dm.saves['shared_reminders'], 1)
+
+
+class ShareLinkTestCase(ReminderManagerTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.dm.save_data('reminders', [self.reminder])
+
+    def test_shares_are_links_joined_to_source(self):
+        """Test shares store no reminder fields and reads see source edits"""
+        self.manager.share(self.reminder, ['a@example.com', 'b@example.com'], 'kari@example.com')
+        link = self.dm.load_data('shared_reminders')[0]
+        self.assertNotIn('title', link)
+        self.assertNotIn('datetime', link)
+
+        self.dm.save_data('reminders', [dict(self.reminder, datetime='2026-11-02 12:00')])
+        for email in ('a@example.com', 'b@example.com'):
+            view, = self.manager.shared_with(email)
+            self.assertEqual(view['title'], 'Dugnad')
+            self.assertEqual(view['datetime'], '2026-11-02 12:00')
+            self.assertEqual(view['shared_by'], 'kari@example.com')
+
+    def test_completed_is_per_recipient(self):
+        """Test one recipient completing a share leaves the others open"""
+        created, _ = self.manager.share(self.reminder, ['a@example.com', 'b@example.com'], 'kari@example.com')
+        self.assertTrue(self.manager.complete(created[0]['id'], 'a@example.com'))
+        self.assertFalse(self.manager.complete(created[1]['id'], 'a@example.com'))
+        self.assertEqual(self.manager.shared_with('a@example.com'), [])
+        self.assertEqual(len(self.manager.shared_with('a@example.com', include_completed=True)), 1)
+        self.assertEqual(len(self.manager.shared_with('b@example.com')), 1)
+
+    def test_unshare_all_on_delete(self):
+        """Test deleting the source removes its links"""
+        self.manager.share(self.reminder, ['a@example.com'], 'kari@example.com')
+        self.assertEqual(self.manager.unshare_all('r1'), ['a@example.com'])
+        self.assertEqual(self.dm.load_data('shared_reminders'), [])
+
+    def test_migrate_copied_records(self):
+        """Test copied records become links and orphaned copies are kept"""
+        self.dm.save_data('shared_reminders', [
+            {'id': 's1', 'original_id': 'r1', 'shared_with': 'a@example.com', 'shared_by': 'kari@example.com',
+             'title': 'Gammel tittel', 'datetime': '2026-01-01 08:00', 'completed': False},
+            {'id': 's2', 'original_id': 'borte', 'shared_with': 'a@example.com', 'shared_by': 'kari@example.com',
+             'title': 'Foreldreløs', 'datetime': '2026-01-01 08:00', 'completed': False}
+        ])
+        titles = sorted(view['title'] for view in self.manager.shared_with('a@example.com'))
+        self.assertEqual(titles, ['Dugnad', 'Foreldreløs'])
+
+        self.assertEqual(self.manager.migrate_to_links(), 1)
+        links = {link['id']: link for link in self.dm.load_data('shared_reminders')}
+        self.assertNotIn('title', links['s1'])
+        self.assertEqual(links['s2']['title'], 'Foreldreløs')
+        self.assertEqual(self.manager.migrate_to_links(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
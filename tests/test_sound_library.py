@@ -0,0 +1,119 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+# Add project directory to path
+project_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(project_dir))
+
+# Mock APScheduler before importing app
+import unittest.mock as mock
+sys.modules['apscheduler'] = mock.MagicMock()
+sys.modules['apscheduler.schedulers'] = mock.MagicMock()
+sys.modules['apscheduler.schedulers.background'] = mock.MagicMock()
+
+# Set testing environment
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import app
+from sound_library import SoundLibrary, detect_mimetype
+
+WAV_HEADER = b'RIFF\x24\x00\x00\x00WAVEfmt '
+MP3_HEADER = b'ID3\x03\x00\x00\x00\x00\x00\x00'
+
+
+class SoundLibraryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.write('ding.mp3', WAV_HEADER + b'\x00' * 100)
+        self.write('chime.mp3', MP3_HEADER + b'\x01' * 100)
+        self.write('README.md', b'# Lyder')
+        self.library = SoundLibrary(self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def write(self, name, content):
+        with open(os.path.join(self.folder, name), 'wb') as f:
+            f.write(content)
+
+    def test_detect_mimetype(self):
+        """Test MIME type comes from the content, not the extension"""
+        self.assertEqual(detect_mimetype(WAV_HEADER, 'ding.mp3'), 'audio/wav')
+        self.assertEqual(detect_mimetype(MP3_HEADER, 'ding.mp3'), 'audio/mpeg')
+        self.assertEqual(detect_mimetype(b'\xff\xfb\x90\x00', 'ding.mp3'), 'audio/mpeg')
+        self.assertEqual(detect_mimetype(b'', 'ding.wav'), 'audio/wav')
+
+    def test_table_built_at_startup(self):
+        """Test only sound files are in the table, with type and size"""
+        self.assertIsNone(self.library.get('README.md'))
+        self.assertIsNone(self.library.get('missing.mp3'))
+        ding = self.library.get('ding.mp3')
+        self.assertEqual(ding.mimetype, 'audio/wav')
+        self.assertEqual(ding.size, len(WAV_HEADER) + 100)
+        self.assertEqual(self.library.get('chime.mp3').mimetype, 'audio/mpeg')
+        self.assertEqual(self.library.get_statistics()['files'], 2)
+
+    def test_lookups_do_not_read_files(self):
+        """Test an unchanged file is answered from the table"""
+        with mock.patch('sound_library.read_sound_file') as read:
+            self.library.get('ding.mp3')
+            self.library.get('chime.mp3')
+        read.assert_not_called()
+
+    def test_changed_file_is_reread(self):
+        """Test a rewritten file gets a new ETag and MIME type"""
+        before = self.library.get('ding.mp3')
+        self.write('ding.mp3', MP3_HEADER + b'\x02' * 50)
+        os.utime(os.path.join(self.folder, 'ding.mp3'), ns=(before.mtime_ns + 10**9, before.mtime_ns + 10**9))
+        after = self.library.get('ding.mp3')
+        self.assertNotEqual(after.etag, before.etag)
+        self.assertEqual(after.mimetype, 'audio/mpeg')
+
+    def test_added_and_removed_files(self):
+        """Test the table follows files added to or removed from the folder"""
+        dir_mtime = os.stat(self.folder).st_mtime_ns
+        self.write('alert.wav', WAV_HEADER)
+        os.remove(os.path.join(self.folder, 'chime.mp3'))
+        os.utime(self.folder, ns=(dir_mtime + 10**9, dir_mtime + 10**9))
+        self.assertIsNotNone(self.library.get('alert.wav'))
+        self.assertIsNone(self.library.get('chime.mp3'))
+
+
+class SoundRouteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_etag_and_range(self):
+        """Test sounds are served with a strong ETag, 304 and 206 responses"""
+        response = self.client.get('/static/sounds/ding.mp3')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('audio/'))
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=604800', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        size = len(response.data)
+
+        response = self.client.get('/static/sounds/ding.mp3', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/static/sounds/ding.mp3', headers={'Range': 'bytes=0-9'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers['Content-Range'], f'bytes 0-9/{size}')
+        self.assertEqual(len(response.data), 10)
+
+    def test_unknown_sound(self):
+        """Test files outside the sound table return 404"""
+        self.assertEqual(self.client.get('/static/sounds/README.md').status_code, 404)
+        self.assertEqual(self.client.get('/static/sounds/missing.mp3').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)